@@ -0,0 +1,48 @@
+"""cart_items: un producto por carrito
+
+Revision ID: 3f1c2a9d7b10
+Revises: d3a9c5e1f7b2
+Create Date: 2026-10-19 16:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c2a9d7b10'
+down_revision: Union[str, None] = 'd3a9c5e1f7b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Fusiona los items duplicados (mismo producto en el mismo carrito) antes de crear el índice
+    op.execute("""
+        WITH duplicated AS (
+            SELECT cart_id, product_id, min(id) AS keep_id, sum(quantity) AS quantity
+            FROM cart_items
+            GROUP BY cart_id, product_id
+            HAVING count(*) > 1
+        )
+        UPDATE cart_items
+        SET quantity = duplicated.quantity
+        FROM duplicated
+        WHERE cart_items.id = duplicated.keep_id
+    """)
+    op.execute("""
+        DELETE FROM cart_items
+        USING cart_items AS kept
+        WHERE cart_items.cart_id = kept.cart_id
+          AND cart_items.product_id = kept.product_id
+          AND cart_items.id > kept.id
+    """)
+    op.create_index(
+        "uq_cart_items_cart_product", "cart_items", ["cart_id", "product_id"], unique=True, if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("uq_cart_items_cart_product", table_name="cart_items", if_exists=True)
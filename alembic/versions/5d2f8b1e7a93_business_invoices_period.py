@@ -0,0 +1,37 @@
+"""business_invoices: periodo facturado y unicidad por negocio y periodo
+
+Revision ID: 5d2f8b1e7a93
+Revises: 0b7d3e9a4c21
+Create Date: 2026-10-19 19:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2f8b1e7a93'
+down_revision: Union[str, None] = '0b7d3e9a4c21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("business_invoices", sa.Column("period_start", sa.DateTime(), nullable=True))
+    op.add_column("business_invoices", sa.Column("period_end", sa.DateTime(), nullable=True))
+    op.add_column("business_invoices", sa.Column("order_count", sa.Integer(), server_default="0", nullable=False))
+    # Las facturas anteriores no tienen periodo (NULL): no chocan con la restricción
+    op.create_unique_constraint(
+        "uq_business_invoices_business_period", "business_invoices", ["business_id", "period_start", "period_end"]
+    )
+    op.create_index("ix_business_invoices_period_start", "business_invoices", ["period_start"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_business_invoices_period_start", table_name="business_invoices")
+    op.drop_constraint("uq_business_invoices_business_period", "business_invoices", type_="unique")
+    op.drop_column("business_invoices", "order_count")
+    op.drop_column("business_invoices", "period_end")
+    op.drop_column("business_invoices", "period_start")
@@ -0,0 +1,75 @@
+"""auth.users: correo único sin distinguir mayúsculas
+
+Revision ID: 7e3a1f6c2b94
+Revises: 9c4e2a7f1d58
+Create Date: 2026-10-19 22:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7e3a1f6c2b94'
+down_revision: Union[str, None] = '9c4e2a7f1d58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Cuentas que solo difieren en mayúsculas del correo: se conserva la más antigua y las
+    # demás se desactivan con un correo de marcador. Sus pedidos, direcciones y perfiles no
+    # se tocan; la tabla user_email_duplicates permite revisarlas y fusionarlas a mano.
+    op.create_table(
+        "user_email_duplicates",
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("kept_user_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("user_id"),
+        schema="auth",
+    )
+    op.execute("""
+        INSERT INTO auth.user_email_duplicates (user_id, email, kept_user_id)
+        SELECT id, email, kept_user_id
+        FROM (
+            SELECT id, email, first_value(id) OVER (
+                PARTITION BY lower(email) ORDER BY start_date NULLS LAST, id
+            ) AS kept_user_id
+            FROM auth.users
+        ) AS ranked
+        WHERE id <> kept_user_id
+    """)
+    op.execute("""
+        UPDATE auth.users
+        SET email = 'duplicate+' || users.id || '@email.invalid', is_active = false
+        FROM auth.user_email_duplicates AS duplicated
+        WHERE users.id = duplicated.user_id
+    """)
+    # A partir de aquí los correos se guardan normalizados
+    op.execute("UPDATE auth.users SET email = lower(email) WHERE email <> lower(email)")
+    # El índice se construye sin bloquear las escrituras en auth.users (fuera de la
+    # transacción: autocommit_block confirma antes las actualizaciones anteriores)
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "uq_users_email_lower", "users", [sa.text("lower(email)")],
+            unique=True, schema="auth", postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "uq_users_email_lower", table_name="users", schema="auth", postgresql_concurrently=True, if_exists=True
+        )
+    # Las cuentas duplicadas recuperan su correo (siguen desactivadas); el resto queda en minúsculas
+    op.execute("""
+        UPDATE auth.users
+        SET email = duplicated.email
+        FROM auth.user_email_duplicates AS duplicated
+        WHERE users.id = duplicated.user_id
+    """)
+    op.drop_table("user_email_duplicates", schema="auth")
@@ -0,0 +1,43 @@
+"""cart_items: precio registrado e índice por producto
+
+Revision ID: 8a4e61c0d2f5
+Revises: 3f1c2a9d7b10
+Create Date: 2026-10-19 17:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8a4e61c0d2f5'
+down_revision: Union[str, None] = '3f1c2a9d7b10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE cart_items ADD COLUMN IF NOT EXISTS unit_price NUMERIC(10, 2)")
+    op.execute("ALTER TABLE cart_items ADD COLUMN IF NOT EXISTS unit_discount NUMERIC(10, 2)")
+    # Las líneas existentes toman el precio actual del producto
+    op.execute("""
+        UPDATE cart_items
+        SET unit_price = products.price, unit_discount = COALESCE(products.discount, 0)
+        FROM products
+        WHERE products.id = cart_items.product_id AND cart_items.unit_price IS NULL
+    """)
+    # Sin bloquear las escrituras de la tabla mientras se construye el índice
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_cart_items_product_id", "cart_items", ["product_id"],
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_cart_items_product_id", table_name="cart_items", postgresql_concurrently=True, if_exists=True)
+    op.drop_column("cart_items", "unit_discount")
+    op.drop_column("cart_items", "unit_price")
@@ -0,0 +1,63 @@
+"""sales rollups: agregados de ventas por hora, día y producto
+
+Revision ID: 9c4e2a7f1d58
+Revises: 5d2f8b1e7a93
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c4e2a7f1d58'
+down_revision: Union[str, None] = '5d2f8b1e7a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _counters() -> list:
+    return [
+        sa.Column("delivered_orders", sa.Integer(), nullable=False),
+        sa.Column("canceled_orders", sa.Integer(), nullable=False),
+        sa.Column("revenue", sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.Column("items_sold", sa.Integer(), nullable=False),
+    ]
+
+
+def upgrade() -> None:
+    op.create_table(
+        "business_sales_hourly",
+        sa.Column("business_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("hour", sa.DateTime(), nullable=False),
+        *_counters(),
+        sa.ForeignKeyConstraint(["business_id"], ["businesses.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("business_id", "hour"),
+    )
+    op.create_table(
+        "business_sales_daily",
+        sa.Column("business_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        *_counters(),
+        sa.ForeignKeyConstraint(["business_id"], ["businesses.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("business_id", "day"),
+    )
+    op.create_table(
+        "business_product_sales_daily",
+        sa.Column("business_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("product_name", sa.String(), nullable=False),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column("revenue", sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.ForeignKeyConstraint(["business_id"], ["businesses.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("business_id", "day", "product_name"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("business_product_sales_daily")
+    op.drop_table("business_sales_daily")
+    op.drop_table("business_sales_hourly")
@@ -0,0 +1,56 @@
+"""addresses y payment_methods: como mucho una fila principal por propietario
+
+Revision ID: b8d4f2a6e1c3
+Revises: 7e3a1f6c2b94
+Create Date: 2026-10-19 23:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8d4f2a6e1c3'
+down_revision: Union[str, None] = '7e3a1f6c2b94'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Si algún propietario quedó con varias principales, se conserva la de menor id
+    op.execute("""
+        UPDATE addresses
+        SET is_main_address = false
+        FROM addresses AS kept
+        WHERE addresses.is_main_address AND kept.is_main_address
+          AND addresses.entity_type = kept.entity_type
+          AND addresses.entity_id = kept.entity_id
+          AND addresses.id > kept.id
+    """)
+    op.execute("""
+        UPDATE payment_methods
+        SET is_main_payment_method = false
+        WHERE is_main_payment_method AND id NOT IN (
+            SELECT DISTINCT ON (user_id) id
+            FROM payment_methods
+            WHERE is_main_payment_method
+            ORDER BY user_id, id
+        )
+    """)
+    # Un índice único parcial no puede ser diferible y rechazaría el UPDATE que cambia la
+    # principal según el orden en que recorra las filas; la restricción EXCLUDE equivalente
+    # (con su índice btree parcial) sí se comprueba al final de la sentencia
+    op.execute("""
+        ALTER TABLE addresses ADD CONSTRAINT ex_addresses_one_main
+        EXCLUDE USING btree (entity_type WITH =, entity_id WITH =) WHERE (is_main_address) DEFERRABLE
+    """)
+    op.execute("""
+        ALTER TABLE payment_methods ADD CONSTRAINT ex_payment_methods_one_main
+        EXCLUDE USING btree (user_id WITH =) WHERE (is_main_payment_method) DEFERRABLE
+    """)
+
+
+def downgrade() -> None:
+    op.drop_constraint("ex_payment_methods_one_main", "payment_methods")
+    op.drop_constraint("ex_addresses_one_main", "addresses")
@@ -0,0 +1,31 @@
+"""carts: índice por updated_at para el reaper
+
+Revision ID: c71b9e3f5a28
+Revises: 8a4e61c0d2f5
+Create Date: 2026-10-19 17:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c71b9e3f5a28'
+down_revision: Union[str, None] = '8a4e61c0d2f5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_carts_updated_at", "carts", ["updated_at"],
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_carts_updated_at", table_name="carts", postgresql_concurrently=True, if_exists=True)
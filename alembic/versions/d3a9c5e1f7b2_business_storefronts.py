@@ -0,0 +1,36 @@
+"""business_storefronts: snapshot desnormalizado de la tienda de cada negocio
+
+Revision ID: d3a9c5e1f7b2
+Revises: 
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3a9c5e1f7b2'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "business_storefronts",
+        sa.Column("business_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("payload", postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.text("now()"), nullable=False),
+        sa.ForeignKeyConstraint(["business_id"], ["businesses.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("business_id"),
+    )
+    # Los snapshots se llenan al primer acceso o con: python -m jobs.storefront rebuild
+
+
+def downgrade() -> None:
+    op.drop_table("business_storefronts")
@@ -0,0 +1,38 @@
+"""orders: índices compuestos para los listados por usuario, negocio y repartidor
+
+Revision ID: e25d7a1c9b46
+Revises: c71b9e3f5a28
+Create Date: 2026-10-19 17:50:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e25d7a1c9b46'
+down_revision: Union[str, None] = 'c71b9e3f5a28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = (
+    ("ix_orders_user_id_created_at", ["user_id", sa.text("created_at DESC")]),
+    ("ix_orders_business_id_created_at", ["business_id", sa.text("created_at DESC")]),
+    ("ix_orders_business_id_status_created_at", ["business_id", "status", sa.text("created_at DESC")]),
+    ("ix_orders_driver_id_status", ["driver_id", "status"]),
+)
+
+
+def upgrade() -> None:
+    # CONCURRENTLY no puede ejecutarse dentro de una transacción
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES:
+            op.create_index(name, "orders", columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _ in INDEXES:
+            op.drop_index(name, table_name="orders", postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,31 @@
+"""order_items: índice por order_id
+
+Revision ID: f4a0b8d3e617
+Revises: e25d7a1c9b46
+Create Date: 2026-10-19 18:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4a0b8d3e617'
+down_revision: Union[str, None] = 'e25d7a1c9b46'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_order_items_order_id", "order_items", ["order_id"],
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_order_items_order_id", table_name="order_items", postgresql_concurrently=True, if_exists=True)
@@ -1,13 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
+from core.config import get_setting
+from core.reference_data import reference_data
 from database.session import get_db
-from database.models.address_model import Address
+from database.models.address_model import Address, EntityTypeEnum
+from repositories import primary_selection
 from schemas.auth_schemas import TokenData
 from schemas.address_schemas import AddressCreateSchema, AddressUpdateSchema, AddressResponseSchema, AddressListResponseSchema
 from core.security import get_current_active_user
 
 router = APIRouter(prefix="/addresses", tags=["Addresses"])
 
+# Municipio que se asigna cuando el cliente envía 0 (sin seleccionar)
+DEFAULT_MUNICIPALITY_ID = get_setting("DEFAULT_MUNICIPALITY_ID", 1)
+
 # Obtener todas las direcciones del usuario autenticado
 @router.get("/", response_model=AddressListResponseSchema)
 def get_user_addresses(
@@ -41,13 +47,9 @@ def create_address(
     current_user: TokenData = Depends(get_current_active_user)
 ):
     if address_data.municipality_id == 0:
-        address_data.municipality_id = 1
-
-    # Verificar si el usuario ya tiene direcciones registradas
-    existing_addresses = db.query(Address).filter(
-        Address.entity_id == str(current_user.local_id),
-        Address.entity_type == "USER"
-    ).count()
+        address_data.municipality_id = DEFAULT_MUNICIPALITY_ID
+    if reference_data.municipality(address_data.municipality_id) is None:
+        raise HTTPException(status_code=400, detail="Municipio no válido")
 
     address_dict = address_data.model_dump()
 
@@ -55,13 +57,9 @@ def create_address(
     address_dict["entity_id"] = str(current_user.local_id)
     address_dict["entity_type"] = "USER"  # Solo clientes pueden tener varias direcciones
 
-    # Si no tiene direcciones previas, establecer is_main_address en True
-    if existing_addresses == 0:
-        address_dict["is_main_address"] = True
-
-    # Crear la dirección
+    # Crear la dirección; es la principal si se pidió o si es la primera del usuario
     new_address = Address(**address_dict)
-    db.add(new_address)
+    primary_selection.addresses.add(db, new_address, EntityTypeEnum.USER, current_user.local_id)
     db.commit()
     db.refresh(new_address)
 
@@ -80,14 +78,16 @@ def update_address(update_data: AddressUpdateSchema, db: Session = Depends(get_d
     if not address:
         raise HTTPException(status_code=404, detail="Direccón no encontrada")
 
-    # Si la nueva dirección es marcado como principal, desactivar los demás
-    if update_data.is_main_address:
-        db.query(Address).filter(
-            Address.entity_id == user_id, Address.entity_type == "USER", Address.id != update_data.id
-        ).update({"is_main_address": False})
+    # Si la dirección se marca como principal, se desmarca la anterior en el mismo UPDATE
+    changes = update_data.model_dump(exclude_unset=True)
+    if changes.pop("is_main_address", None):
+        if not primary_selection.addresses.select(db, address.id, EntityTypeEnum.USER, user_id):
+            raise HTTPException(status_code=409, detail="La dirección principal cambió al mismo tiempo; intente de nuevo")
+    elif "is_main_address" in update_data.model_fields_set:
+        address.is_main_address = False
 
     # Actualizar los campos de la dirección
-    for key, value in update_data.model_dump(exclude_unset=True).items():
+    for key, value in changes.items():
         setattr(address, key, value)
 
     db.commit()
@@ -1,5 +1,6 @@
 import requests
 from datetime import timedelta
+from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, status, Request, Form
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.responses import HTMLResponse
@@ -7,8 +8,11 @@ from fastapi.templating import Jinja2Templates
 from schemas.auth_schemas import GoogleSignInRequest, GoogleSignInResponse, SignInRequest, RefreshToken, Token, PasswordResetRequest
 from schemas.user_schemas import UserSchemaCreate
 from core.config import get_secret
+from core.principal_cache import principal_cache
 from database.models.users_model import AuthProviderEnum, User
 from database.session import get_db  # Para interactuar con la base de datos
+from repositories.user import get_user_by_email, is_duplicate_email, normalize_email
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from utils.email_utils import send_email
 from core.auth import (create_access_token, create_refresh_token, decode_refresh_token, hash_password, 
@@ -26,7 +30,7 @@ templates = Jinja2Templates(directory="templates")
 # Endpoint para iniciar sesión en Swagger UI con OAuth2PasswordRequestForm
 @router.post("/oauth2-signIn", response_model=Token)
 def oauth2_sign_in(data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == data.username).first()
+    user = get_user_by_email(db, data.username)
     
     if not user or not verify_password(data.password, user.hashed_password):
         raise HTTPException(
@@ -35,6 +39,9 @@ def oauth2_sign_in(data: OAuth2PasswordRequestForm = Depends(), db: Session = De
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    # Las peticiones siguientes con este token no necesitan volver a leer el usuario
+    principal_cache.put(user)
+
     # Convertir los roles a sus valores (o nombres) antes de crear el token
     roles = [role.value for role in user.roles]
 
@@ -52,7 +59,7 @@ def oauth2_sign_in(data: OAuth2PasswordRequestForm = Depends(), db: Session = De
 # Endpoint para iniciar sesión
 @router.post("/signIn", response_model=Token)
 def sign_in(data: SignInRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == data.email).first()
+    user = get_user_by_email(db, data.email)
     
     if not user or not verify_password(data.password, user.hashed_password):
         raise HTTPException(
@@ -61,6 +68,9 @@ def sign_in(data: SignInRequest, db: Session = Depends(get_db)):
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    # Las peticiones siguientes con este token no necesitan volver a leer el usuario
+    principal_cache.put(user)
+
     # Convertir los roles a sus valores (o nombres) antes de crear el token
     roles = [role.value for role in user.roles]
 
@@ -78,12 +88,6 @@ def sign_in(data: SignInRequest, db: Session = Depends(get_db)):
 # Endpoint para registrar un nuevo usuario
 @router.post("/signUp", response_model=Token)
 def sign_up(user_data: UserSchemaCreate, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == user_data.email).first()
-    if user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="El usuario ya está registrado"
-        )
     # Validación del telefono
     validate_phone_number(user_data.phone_number)
 
@@ -96,7 +100,7 @@ def sign_up(user_data: UserSchemaCreate, db: Session = Depends(get_db)):
 
     hashed_password = hash_password(user_data.password)
     new_user = User(
-        email=user_data.email,
+        email=normalize_email(user_data.email),
         phone_number=user_data.phone_number,
         full_name=user_data.full_name,
         municipality_id=user_data.municipality_id,
@@ -104,12 +108,23 @@ def sign_up(user_data: UserSchemaCreate, db: Session = Depends(get_db)):
         providers=['EMAIL'],
         roles=["USER"]
     )
+    # Un solo INSERT: si el correo ya existe (en cualquier combinación de mayúsculas) lo
+    # rechaza el índice único uq_users_email_lower, también entre registros simultáneos
     db.add(new_user)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        if not is_duplicate_email(e):
+            raise
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El usuario ya está registrado"
+        )
     db.refresh(new_user)
 
     # Obtener todos los roles del usuario desde la relación con UserRoleAssociation y Role
-    roles = [role.value for role in user.roles]
+    roles = [role.value for role in new_user.roles]
 
     access_token = create_access_token(data={"id": str(new_user.id), "roles": roles})
     refresh_token = create_refresh_token(data={"id": str(new_user.id), "roles": roles})
@@ -119,39 +134,41 @@ def sign_up(user_data: UserSchemaCreate, db: Session = Depends(get_db)):
         "access_token": access_token,
         "token_type": "bearer",
         "refresh_token": refresh_token,
-        "roles": user.roles
+        "roles": new_user.roles
     }
 
 # Endpoint para renovar el access token usando el refresh token
 @router.post("/refreshToken", response_model=Token)
 def refresh_token(refresh_token: RefreshToken, db: Session = Depends(get_db)):
     token_data = decode_refresh_token(refresh_token.refresh_token)
-    user = db.query(User).filter(User.id == token_data.local_id).first()
+    # Roles y estado actuales desde la caché de usuarios (no los del refresh token)
+    principal = principal_cache.get(db, UUID(token_data.local_id))
 
-    if not user:
+    if not principal:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Usuario no encontrado"
         )
+    if not principal.is_active:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Usuario inactivo o inválido")
 
-    # Obtener todos los roles del usuario desde la relación con UserRoleAssociation y Role
-    roles = [role.value for role in user.roles]
+    roles = list(principal.roles)
 
-    access_token = create_access_token(data={"id": str(user.id), "roles": roles})
-    new_refresh_token = create_refresh_token(data={"id": str(user.id), "roles": roles})
+    access_token = create_access_token(data={"id": str(principal.user_id), "roles": roles})
+    new_refresh_token = create_refresh_token(data={"id": str(principal.user_id), "roles": roles})
 
     return {
-        "local_id": str(user.id),
+        "local_id": str(principal.user_id),
         "access_token": access_token,
         "token_type": "bearer",
         "refresh_token": new_refresh_token,
-        "roles": user.roles
+        "roles": roles
     }
 
 # Endpoint para solicitar recuperación de contraseña
 @router.post("/request-password-reset")
 def request_password_reset(request: PasswordResetRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == request.email).first()
+    user = get_user_by_email(db, request.email)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Email no encontrado")
 
@@ -208,6 +225,7 @@ async def reset_password(
     # Actualiza la contraseña del usuario
     user.hashed_password = hash_password(new_password)
     db.commit()
+    principal_cache.invalidate(user.id)
 
     return templates.TemplateResponse("password_updated.html", {"request": request, "msg": "Contraseña actualizada exitosamente"})
 
@@ -235,27 +253,37 @@ def google_sign_in(request: GoogleSignInRequest, db: Session = Depends(get_db)):
     name = user_info.get("name", "Usuario de Google")
 
     # Verificar si el usuario ya existe en la base de datos
-    user = db.query(User).filter(User.email == email).first()
+    user = get_user_by_email(db, email)
     if user:
         # Agregar GOOGLE al array de providers si no está presente
         if AuthProviderEnum.GOOGLE not in user.providers:
-            user.providers.append(AuthProviderEnum.GOOGLE)
+            # Se asigna una lista nueva: append sobre la columna ARRAY no se detecta como cambio
+            user.providers = [*user.providers, AuthProviderEnum.GOOGLE]
             db.commit()
+            principal_cache.invalidate(user.id)
             db.refresh(user)
     else:
         # Si no existe, registrar el usuario
         user = User(
-            email=email,
+            email=normalize_email(email),
             full_name=name,
             phone_number="",
-            department_id=1,
             municipality_id=1,
             is_active=True,
             providers=['GOOGLE'],
             roles=["USER"]
         )
         db.add(user)
-        db.commit()
+        try:
+            db.commit()
+        except IntegrityError as e:
+            db.rollback()
+            if not is_duplicate_email(e):
+                raise
+            # Otra petición registró el mismo correo al mismo tiempo
+            user = get_user_by_email(db, email)
+            if not user:
+                raise
         db.refresh(user)
 
     # Obtener todos los roles del usuario desde la relación con UserRoleAssociation y Role
@@ -0,0 +1,80 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from core.config import get_setting
+from core.security import get_owned_business
+from database.session import get_db
+from database.models.business_model import Business
+from repositories.sales_rollups import daily_sales, hourly_sales, top_products
+from schemas.business_admin_schemas import (
+    DailySalesResponse, HourlySalesResponse, SalesDashboardResponse, TopProductResponse,
+)
+
+router = APIRouter(prefix="/business-admin", tags=["Business Admin"])
+
+# Días que se muestran por defecto y rango máximo que se puede consultar
+DEFAULT_RANGE_DAYS = 30
+MAX_RANGE_DAYS = get_setting("SALES_MAX_RANGE_DAYS", 366)
+
+
+def date_range(
+    date_from: Optional[date] = Query(None, description="Primer día (incluido); por defecto hace 30 días"),
+    date_to: Optional[date] = Query(None, description="Último día (incluido); por defecto hoy"),
+) -> tuple[date, date]:
+    """Rango de días de la consulta como [inicio, fin) para los agregados."""
+    date_to = date_to or date.today()
+    date_from = date_from or date_to - timedelta(days=DEFAULT_RANGE_DAYS - 1)
+    if date_from > date_to:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="date_from debe ser anterior a date_to")
+    if (date_to - date_from).days >= MAX_RANGE_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=f"El rango no puede superar {MAX_RANGE_DAYS} días"
+        )
+    return date_from, date_to + timedelta(days=1)
+
+# Ventas por día del negocio (leídas de los agregados, no de orders)
+@router.get("/{business_id}/sales/daily", response_model=List[DailySalesResponse])
+def get_daily_sales(
+    days: tuple[date, date] = Depends(date_range),
+    db: Session = Depends(get_db),
+    business: Business = Depends(get_owned_business),
+):
+    return daily_sales(db, business.id, *days)
+
+# Ventas por hora de un día
+@router.get("/{business_id}/sales/hourly", response_model=List[HourlySalesResponse])
+def get_hourly_sales(
+    day: Optional[date] = Query(None, description="Día a consultar; por defecto hoy"),
+    db: Session = Depends(get_db),
+    business: Business = Depends(get_owned_business),
+):
+    return hourly_sales(db, business.id, day or date.today())
+
+# Productos más vendidos del rango
+@router.get("/{business_id}/sales/top-products", response_model=List[TopProductResponse])
+def get_top_products(
+    days: tuple[date, date] = Depends(date_range),
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db),
+    business: Business = Depends(get_owned_business),
+):
+    return top_products(db, business.id, *days, limit=limit)
+
+# Resumen del tablero: totales del rango, serie diaria y productos más vendidos
+@router.get("/{business_id}/sales/dashboard", response_model=SalesDashboardResponse)
+def get_sales_dashboard(
+    days: tuple[date, date] = Depends(date_range),
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db),
+    business: Business = Depends(get_owned_business),
+):
+    rows = daily_sales(db, business.id, *days)
+    totals = {
+        "delivered_orders": sum(row.delivered_orders for row in rows),
+        "canceled_orders": sum(row.canceled_orders for row in rows),
+        "revenue": sum((row.revenue for row in rows), Decimal("0.00")),
+        "items_sold": sum(row.items_sold for row in rows),
+    }
+    return {"totals": totals, "days": rows, "top_products": top_products(db, business.id, *days, limit=limit)}
@@ -1,8 +1,12 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from uuid import UUID
+from core.http_cache import build_validators, not_modified_response, set_cache_headers
+from core.reference_data import reference_data
 from database.session import get_db
 from database.models.business_model import Business, BusinessImage, TypeBusiness
+from repositories.storefront import get_storefront_version
 from schemas.business_schemas import (
     BusinessCreate,
     BusinessResponse,
@@ -35,10 +39,17 @@ def create_business(business_data: BusinessCreate, db: Session = Depends(get_db)
 
 # Endpoint para obtener un negocio por ID
 @router.get("/{business_id}", response_model=BusinessResponse)
-def get_business_by_id(business_id: UUID, db: Session = Depends(get_db)):
+def get_business_by_id(business_id: UUID, request: Request, response: Response, db: Session = Depends(get_db)):
+    # Validadores derivados de la versión del snapshot, antes de cargar el negocio
+    validators = build_validators(get_storefront_version(db, business_id), "business", business_id)
+    not_modified = not_modified_response(request, validators)
+    if not_modified:
+        return not_modified
+
     business = db.query(Business).filter(Business.id == business_id).first()
     if not business:
         raise HTTPException(status_code=404, detail="Business not found")
+    set_cache_headers(response, validators)
     return business
 
 # Endpoint para actualizar un negocio
@@ -83,12 +94,10 @@ def add_business_image(business_id: UUID, image_data: BusinessImageCreate, db: S
 # Endpoint para obtener los tipos de negocio
 @router.get("/types_business/", response_model=TypeBusinessListResponse)
 def get_all_type_businesses(db: Session = Depends(get_db)):
-    types_business = db.query(TypeBusiness).all()
-    types_business_filtered = []
-    for type_business in types_business:
-        if type_business.businesses:
-            types_business_filtered.append(type_business)
-    return {"type_business_list": types_business_filtered}
+    # Solo los tipos con algún negocio: una consulta de ids en lugar de cargar los negocios de cada tipo
+    used = set(db.execute(select(Business.type_business_id).distinct()).scalars())
+    types_business = reference_data.snapshot.types_business
+    return {"type_business_list": [types_business[type_id] for type_id in sorted(used) if type_id in types_business]}
 
 
 # Endpoint para crear un tipo de negocio
@@ -98,4 +107,6 @@ def create_type_business(type_data: TypeBusinessCreate, db: Session = Depends(ge
     db.add(new_type)
     db.commit()
     db.refresh(new_type)
+    # Los demás workers recargan los datos de referencia sin esperar a la revisión periódica
+    reference_data.notify_changed()
     return new_type
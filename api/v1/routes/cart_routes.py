@@ -1,81 +1,42 @@
-from datetime import datetime, timezone
-from decimal import Decimal
 from fastapi import APIRouter, HTTPException, Depends
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from typing import List
 from uuid import UUID
 from database.models.product_model import Product
 from database.session import get_db
-from database.models.cart_model import Cart, CartItem
-from schemas.product_schemas import ProductResponse
+from database.models.cart_model import Cart
+from repositories.cart_store import (
+    cart_store,
+    find_item,
+    add_item,
+    set_item_quantity,
+    allocate_item_id,
+    allocate_item_ids,
+)
 from schemas.cart_schemas import (
-    CartCreate,
     CartResponse,
     CartItemCreate,
     CartItemUpdate,
-    CartItemResponse,
+    CartBatchRequest,
 )
 
 router = APIRouter(prefix="/carts", tags=["Carts"])
 
+# Los carritos se leen y modifican en el almacén (repositories/cart_store.py); la escritura
+# en la base de datos es diferida y se fuerza en el checkout.
+
+def _cart_response(state: dict) -> CartResponse:
+    return CartResponse.model_validate({**state, "cart_items": state["items"]})
+
 # Endpoints para "Cart"
 
 @router.get("/carts/{user_id}", response_model=List[CartResponse])
 def get_carts_for_user(user_id: UUID, db: Session = Depends(get_db)):
     """Obtiene todos los carritos de un usuario con productos completos."""
-    carts = db.query(Cart).filter(Cart.user_id == user_id).all()
-    
-    tax_rate = Decimal("0.15")
-    delivery_fee = Decimal("50.00")
-    
-    cart_responses = []
-    for cart in carts:
-        # Recalcula totales dinámicamente
-        subtotal = sum(
-            item.quantity * (item.product.price or Decimal('0.00')) for item in cart.cart_items
-        )
-        discount_total = sum(
-            item.quantity * (item.product.discount or Decimal('0.00')) for item in cart.cart_items
-        )
-        effective_subtotal = subtotal - discount_total
-        taxes = effective_subtotal * tax_rate
-        total = effective_subtotal + delivery_fee
-
-        # Construye la respuesta del carrito
-        cart_responses.append(CartResponse(
-            id=cart.id,
-            user_id=cart.user_id,
-            business_id=cart.business_id,
-            created_at=cart.created_at,
-            updated_at=cart.updated_at,
-            subtotal=subtotal,
-            discount_total=discount_total,
-            taxes=taxes,
-            delivery_fee=delivery_fee,
-            total=total,
-            cart_items=[
-                CartItemResponse(
-                    id=item.id,
-                    product_id=item.product.id,
-                    product=ProductResponse(
-                        id=item.product.id,
-                        name=item.product.name,
-                        price=item.product.price,
-                        product_image_url=item.product.product_image_url,
-                        discount=item.product.discount,
-                        available=item.product.available,
-                        business_id=item.product.business_id,
-                        is_active=item.product.is_active
-                    ),
-                    quantity=item.quantity,
-                    created_at=item.created_at,
-                    updated_at=item.updated_at
-                )
-                for item in cart.cart_items
-            ]
-        ))
-    
-    return cart_responses
+    # La creación de carritos se escribe de inmediato, así que la tabla tiene todos los ids
+    cart_ids = db.execute(select(Cart.id).where(Cart.user_id == user_id).order_by(Cart.id)).scalars().all()
+    return [_cart_response(state) for state in cart_store.load_many(db, cart_ids)]
 
 
 @router.delete("/carts/{cart_id}")
@@ -84,57 +45,32 @@ def delete_cart(cart_id: int, db: Session = Depends(get_db)):
     cart = db.query(Cart).filter(Cart.id == cart_id).first()
     if not cart:
         raise HTTPException(status_code=404, detail="Cart not found")
-    
-    db.delete(cart)
-    db.commit()
+
+    user_id, business_id = cart.user_id, cart.business_id
+    with cart_store.lock(cart_id):
+        db.delete(cart)
+        db.commit()
+        cart_store.evict(cart_id, user_id, business_id)
     return {"detail": "Cart deleted successfully"}
 
 # Endpoints para "CartItem"
 
 @router.post("/carts/{business_id}/items", response_model=CartResponse)
 def add_item_to_cart(business_id: UUID, user_id: UUID, item: CartItemCreate, db: Session = Depends(get_db)):
-    """Añade un producto al carrito o actualiza su cantidad, recalculando totales."""
-    # Parámetros constantes para cálculos
-    tax_rate = Decimal("0.15")  # Tasa de impuestos
-    delivery_fee = Decimal("50.00")  # Tarifa fija de envío
-
-    # Buscar el carrito del usuario para el negocio
-    cart = db.query(Cart).filter(
-        Cart.user_id == user_id,
-        Cart.business_id == business_id
-    ).first()
-
-    # Crear el carrito si no existe
-    if not cart:
-        cart = Cart(
-            user_id=user_id,
-            business_id=business_id,
-            created_at=datetime.now(timezone.utc),
-            updated_at=datetime.now(timezone.utc),
-            subtotal=Decimal("0.00"),
-            discount_total=Decimal("0.00"),
-            taxes=Decimal("0.00"),
-            delivery_fee=delivery_fee,
-            total=Decimal("0.00"),
-        )
-        db.add(cart)
-        db.commit()
-        db.refresh(cart)
-
+    """Añade un producto al carrito o actualiza su cantidad, ajustando los totales."""
     # Verificar si el producto existe
     product = db.query(Product).filter(Product.id == item.product_id).first()
     if not product:
         raise HTTPException(status_code=404, detail="Producto no encontrado.")
 
-    # Verificar si el producto ya está en el carrito
-    cart_item = db.query(CartItem).filter(
-        CartItem.cart_id == cart.id,
-        CartItem.product_id == item.product_id
-    ).first()
+    cart = cart_store.get_or_create(db, user_id, business_id)
+    with cart_store.editing(db, cart["id"]) as state:
+        if state is None:
+            raise HTTPException(status_code=404, detail="Cart not found")
 
-    if cart_item:
-        # Actualizar la cantidad del producto
-        new_quantity = cart_item.quantity + item.quantity
+        # Verificar si el producto ya está en el carrito
+        cart_item = find_item(state, product_id=product.id)
+        new_quantity = item.quantity + (cart_item["quantity"] if cart_item else 0)
 
         # Verificar disponibilidad y stock
         if product.stock < new_quantity or not product.available:
@@ -143,180 +79,109 @@ def add_item_to_cart(business_id: UUID, user_id: UUID, item: CartItemCreate, db:
                 detail=f"Actualmente solo quedan {product.stock} unidades."
             )
 
-        cart_item.quantity = new_quantity
-        cart_item.updated_at = datetime.now(timezone.utc)
-    else:
-        # Verificar disponibilidad y stock al agregar el producto
-        if product.stock < item.quantity or not product.available:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Actualmente solo quedan {product.stock} unidades."
-            )
-
-        # Añadir un nuevo producto al carrito
-        cart_item = CartItem(
-            product_id=item.product_id,
-            quantity=item.quantity,
-            created_at=datetime.now(timezone.utc),
-            updated_at=datetime.now(timezone.utc),
-            cart_id=cart.id
-        )
-        db.add(cart_item)
-
-    # Calcular valores dinámicos para el carrito
-    cart_items = db.query(CartItem).filter(CartItem.cart_id == cart.id).all()
-    subtotal = sum(
-        ci.quantity * (product.price or Decimal('0.00')) for ci in cart_items
-    )
-    discount_total = sum(
-        ci.quantity * (product.discount or Decimal('0.00')) for ci in cart_items
-    )
-    effective_subtotal = subtotal - discount_total
-    taxes = effective_subtotal * tax_rate
-    total = effective_subtotal + delivery_fee
-
-    # Actualizar el carrito
-    cart.updated_at = datetime.now(timezone.utc)
-    cart.subtotal = subtotal
-    cart.discount_total = discount_total
-    cart.taxes = taxes
-    cart.delivery_fee = delivery_fee
-    cart.total = total
-
-    db.commit()
-    db.refresh(cart)
-
-    # Preparar la respuesta del carrito
-    return CartResponse(
-        id=cart.id,
-        user_id=cart.user_id,
-        business_id=cart.business_id,
-        created_at=cart.created_at,
-        updated_at=cart.updated_at,
-        subtotal=subtotal,
-        discount_total=discount_total,
-        taxes=taxes,
-        delivery_fee=delivery_fee,
-        total=total,
-        items=[
-            CartItemResponse(
-                id=ci.id,
-                product_id=product.id,
-                product=ProductResponse(
-                    id=product.id,
-                    name=product.name,
-                    price=product.price,
-                    discount=product.discount,
-                    available=product.available,
-                    business_id=product.business_id,
-                    status=product.status,
-                ),
-                quantity=ci.quantity,
-                created_at=ci.created_at,
-                updated_at=ci.updated_at,
-            )
-            for ci in cart_items
+        if cart_item:
+            set_item_quantity(state, cart_item, new_quantity, product)
+        else:
+            add_item(state, allocate_item_id(db), product, new_quantity)
+
+    return _cart_response(state)
+
+
+@router.post("/carts/{business_id}/items/batch", response_model=CartResponse)
+def apply_cart_operations(business_id: UUID, user_id: UUID, batch: CartBatchRequest, db: Session = Depends(get_db)):
+    """
+    Aplica en orden varias operaciones (add, set, remove) al carrito del usuario para el
+    negocio. Se validan todas antes de modificar nada: o se aplican todas o ninguna.
+    """
+    # Una sola consulta de productos (stock, disponibilidad y precio) para todo el lote
+    product_ids = {operation.product_id for operation in batch.operations if operation.op != "remove"}
+    products = {
+        product.id: product
+        for product in db.query(Product).filter(Product.id.in_(product_ids)).all()
+    } if product_ids else {}
+    missing = [str(product_id) for product_id in product_ids if product_id not in products]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Productos no encontrados: {', '.join(missing)}")
+    foreign = [str(product.id) for product in products.values() if product.business_id != business_id]
+    if foreign:
+        raise HTTPException(status_code=400, detail=f"Los productos no pertenecen al negocio: {', '.join(foreign)}")
+
+    cart = cart_store.get_or_create(db, user_id, business_id)
+    with cart_store.editing(db, cart["id"]) as state:
+        if state is None:
+            raise HTTPException(status_code=404, detail="Cart not found")
+
+        # Cantidades finales por producto tras aplicar las operaciones en orden
+        quantities = {}
+        for operation in batch.operations:
+            key = operation.product_id
+            if key not in quantities:
+                current = find_item(state, product_id=key)
+                quantities[key] = current["quantity"] if current else 0
+            if operation.op == "add":
+                quantities[key] += operation.quantity
+            elif operation.op == "set":
+                quantities[key] = operation.quantity
+            else:
+                quantities[key] = 0
+
+        # Verificar disponibilidad y stock de las cantidades finales
+        errors = []
+        for product_id, quantity in quantities.items():
+            product = products.get(product_id)
+            if quantity > 0 and (product.stock < quantity or not product.available):
+                errors.append(f"{product.name}: actualmente solo quedan {product.stock} unidades.")
+        if errors:
+            raise HTTPException(status_code=400, detail=errors)
+
+        new_products = [
+            product_id for product_id, quantity in quantities.items()
+            if quantity > 0 and find_item(state, product_id=product_id) is None
         ]
-    )
+        item_ids = iter(allocate_item_ids(db, len(new_products)))
+        for product_id, quantity in quantities.items():
+            cart_item = find_item(state, product_id=product_id)
+            if cart_item:
+                set_item_quantity(state, cart_item, quantity, products.get(product_id))
+            elif quantity > 0:
+                add_item(state, next(item_ids), products[product_id], quantity)
+
+    return _cart_response(state)
 
 
 @router.put("/carts/{cart_id}/items/{item_id}", response_model=CartResponse)
 def update_cart_item(cart_id: int, item_id: int, item: CartItemUpdate, db: Session = Depends(get_db)):
-    """Actualiza la cantidad de un elemento del carrito, recalcula los totales y retorna el carrito completo."""
-    # Buscar el item existente
-    existing_item = db.query(CartItem).filter(CartItem.id == item_id, CartItem.cart_id == cart_id).first()
-    if not existing_item:
-        raise HTTPException(status_code=404, detail="Cart item not found")
-    
-    # Obtener producto asociado
-    product = db.query(Product).filter(Product.id == existing_item.product_id).first()
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
-    
-    # Verificar stock
-    if item.quantity > product.stock:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Stock insuficiente del producto '{product.name}'. Disponible: {product.stock}"
-        )
-    
-    # Actualizar cantidad en el item del carrito
-    existing_item.quantity = item.quantity
-    db.commit()
-    db.refresh(existing_item)
-
-    # Recalcular totales del carrito
-    cart = db.query(Cart).filter(Cart.id == cart_id).first()
-    if not cart:
-        raise HTTPException(status_code=404, detail="Cart not found")
-    
-    cart_items = db.query(CartItem).filter(CartItem.cart_id == cart.id).all()
-    subtotal = sum(
-        ci.quantity * (db.query(Product).filter(Product.id == ci.product_id).first().price or Decimal('0.00'))
-        for ci in cart_items
-    )
-    discount_total = sum(
-        ci.quantity * (db.query(Product).filter(Product.id == ci.product_id).first().discount or Decimal('0.00'))
-        for ci in cart_items
-    )
-    effective_subtotal = subtotal - discount_total
-    tax_rate = Decimal("0.15")  # Ejemplo de tasa de impuestos
-    taxes = effective_subtotal * tax_rate
-    delivery_fee = Decimal("5.00")  # Ejemplo de tarifa de entrega
-    total = effective_subtotal + taxes + delivery_fee
-
-    # Actualizar valores en el carrito
-    cart.updated_at = datetime.now(timezone.utc)
-    cart.subtotal = subtotal
-    cart.discount_total = discount_total
-    cart.taxes = taxes
-    cart.delivery_fee = delivery_fee
-    cart.total = total
+    """Actualiza la cantidad de un elemento del carrito, ajusta los totales y retorna el carrito completo."""
+    with cart_store.editing(db, cart_id) as state:
+        # Buscar el item existente
+        existing_item = find_item(state, item_id=item_id) if state else None
+        if not existing_item:
+            raise HTTPException(status_code=404, detail="Cart item not found")
+
+        # Obtener producto asociado
+        product = db.query(Product).filter(Product.id == existing_item["product_id"]).first()
+        if not product:
+            raise HTTPException(status_code=404, detail="Product not found")
+
+        # Verificar stock
+        if item.quantity > product.stock:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Stock insuficiente del producto '{product.name}'. Disponible: {product.stock}"
+            )
 
-    db.commit()
-    db.refresh(cart)
+        set_item_quantity(state, existing_item, item.quantity, product)
 
-    # Preparar y retornar la respuesta del carrito completo
-    return CartResponse(
-        id=cart.id,
-        user_id=cart.user_id,
-        business_id=cart.business_id,
-        created_at=cart.created_at,
-        updated_at=cart.updated_at,
-        subtotal=subtotal,
-        discount_total=discount_total,
-        taxes=taxes,
-        delivery_fee=delivery_fee,
-        total=total,
-        items=[
-            CartItemResponse(
-                id=ci.id,
-                product_id=ci.product_id,
-                product=ProductResponse(
-                    id=ci.product_id,
-                    name=(product := db.query(Product).filter(Product.id == ci.product_id).first()).name,
-                    price=product.price,
-                    discount=product.discount,
-                    available=product.available,
-                    business_id=product.business_id,
-                    status=product.status,
-                ),
-                quantity=ci.quantity,
-                created_at=ci.created_at,
-                updated_at=ci.updated_at,
-            )
-            for ci in cart_items
-        ]
-    )
+    return _cart_response(state)
 
 
 @router.delete("/carts/{cart_id}/items/{item_id}")
 def delete_cart_item(cart_id: int, item_id: int, db: Session = Depends(get_db)):
     """Elimina un elemento de un carrito."""
-    item = db.query(CartItem).filter(CartItem.id == item_id, CartItem.cart_id == cart_id).first()
-    if not item:
-        raise HTTPException(status_code=404, detail="Cart item not found")
-    
-    db.delete(item)
-    db.commit()
+    with cart_store.editing(db, cart_id) as state:
+        item = find_item(state, item_id=item_id) if state else None
+        if not item:
+            raise HTTPException(status_code=404, detail="Cart item not found")
+
+        set_item_quantity(state, item, 0)
     return {"detail": f"Artículo del carrito eliminado exitosamente"}
@@ -1,12 +1,14 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
 from sqlalchemy import func
 from sqlalchemy.orm import Session
 from uuid import UUID
+from core.http_cache import build_validators, not_modified_response, set_cache_headers
 from core.security import get_current_active_user
 from database.session import get_db
-from database.models.product_model import CategoryProductAssociation, Product, Category
-from database.models.business_model import Business
+from database.models.product_model import Product, Category
 from database.models.favourite_model import Favourite
+from repositories.storefront import (get_storefront, apply_user_favourites, get_storefront_version,
+                                    get_user_favourites_stamp)
 from schemas.auth_schemas import TokenData
 from schemas.product_schemas import (BusinessWithCategoriesResponse, CategoryCreate, CategoryUpdate, CategoryResponse)
 
@@ -70,196 +72,49 @@ def get_category(
 
 
 @router.get("/restaurant/{business_id}/", response_model=BusinessWithCategoriesResponse)
-def get_restaurant_categories(business_id: UUID, db: Session = Depends(get_db), current_user: TokenData = Depends(get_current_active_user)):
-    # Consultar negocio y si es favorito
-    business_query = (
-        db.query(
-            Business,
-            func.coalesce(Favourite.business_id.isnot(None), False).label("is_favorite")
-        )
-        .outerjoin(Favourite, 
-                   (Favourite.business_id == Business.id) & 
-                   (Favourite.user_id == current_user.local_id))
-        .filter(Business.id == business_id)
+def get_restaurant_categories(business_id: UUID, request: Request, response: Response, db: Session = Depends(get_db), current_user: TokenData = Depends(get_current_active_user)):
+    # Validadores: versión del snapshot + sello de favoritos del usuario
+    validators = build_validators(
+        get_storefront_version(db, business_id), "restaurant", business_id,
+        current_user.local_id, get_user_favourites_stamp(db, current_user.local_id), private=True
     )
+    not_modified = not_modified_response(request, validators)
+    if not_modified:
+        return not_modified
 
-    result = business_query.first()
-    if not result:
+    # Leer el snapshot de la tienda (una lectura por clave primaria)
+    storefront = get_storefront(db, business_id)
+    if not storefront:
         raise HTTPException(status_code=404, detail="No existe este negocio.")
 
-    business, is_favorite = result
-
-    # Obtener las categorías del negocio
-    categories = db.query(Category).filter(Category.business_id == business_id).all()
-
-    if not categories:
+    if not storefront["business_categories"]:
         raise HTTPException(status_code=404, detail="Este negocio no tiene categorías.")
 
-    categories_response = []
-    for category in categories:
-        products_query = (
-            db.query(
-                Product,
-                func.coalesce(Favourite.product_id.isnot(None), False).label("is_favorite")
-            )
-            .join(CategoryProductAssociation)
-            .outerjoin(Favourite, 
-                       (Favourite.product_id == Product.id) & 
-                       (Favourite.user_id == current_user.local_id))
-            .filter(CategoryProductAssociation.category_id == category.id).all()
-        )
-
-        category_dict = {
-            "id": category.id,
-            "name": category.name,
-            "business_id": category.business_id,
-            "products": [
-                {
-                    "id": product.id,
-                    "name": product.name,
-                    "description": product.description,
-                    "price": product.price,
-                    "product_image_url": product.product_image_url,
-                    "stock": product.stock,
-                    "available": product.available,
-                    "business_id": product.business_id,
-                    "discount": product.discount,
-                    "is_active": product.is_active,
-                    "options": product.options,
-                    "is_favorite": is_favorite
-                }
-                for product, is_favorite in products_query
-            ]
-        }
-        
-        categories_response.append(category_dict)
-
-    return {
-        "business": {
-            "id": business.id,
-            "address": business.address,
-            "admin_id": business.admin_id,
-            "business_name": business.business_name,
-            "municipality_id": business.municipality_id,
-            "country": business.country,
-            "description": business.description,
-            "email": business.email,
-            "lat": business.lat,
-            "long": business.long,
-            "phone_number": business.phone_number,
-            "zip_code": business.zip_code,
-            "is_active": business.is_active,
-            "is_popular_this_week": business.is_popular_this_week,
-            "is_novelty": business.is_novelty,
-            "has_free_delivery": business.has_free_delivery,
-            "has_alcohol": business.has_alcohol,
-            "is_open_now": business.is_open_now,
-            "average_price": business.average_price,
-            "average_delivery": business.average_delivery,
-            "type_business": business.type_business,
-            "business_images": business.business_images,
-            "is_favorite": is_favorite
-        },
-        "business_categories": categories_response
-    }
+    set_cache_headers(response, validators)
+    return apply_user_favourites(db, storefront, current_user.local_id)
 
 
 @router.get("/business/{business_id}/", response_model=BusinessWithCategoriesResponse)
-def get_business_categories(business_id: UUID, db: Session = Depends(get_db), current_user: TokenData = Depends(get_current_active_user)
+def get_business_categories(business_id: UUID, request: Request, response: Response, db: Session = Depends(get_db), current_user: TokenData = Depends(get_current_active_user)
 ):
     limit = 5  # Limitar la cantidad de productos por categoría
 
-    # Consultar negocio y si es favorito
-    business_query = (
-        db.query(
-            Business,
-            func.coalesce(Favourite.business_id.isnot(None), False).label("is_favorite")
-        )
-        .outerjoin(Favourite, 
-                   (Favourite.business_id == Business.id) & 
-                   (Favourite.user_id == current_user.local_id))
-        .filter(Business.id == business_id)
+    # Validadores: versión del snapshot + sello de favoritos del usuario
+    validators = build_validators(
+        get_storefront_version(db, business_id), "business", business_id, limit,
+        current_user.local_id, get_user_favourites_stamp(db, current_user.local_id), private=True
     )
+    not_modified = not_modified_response(request, validators)
+    if not_modified:
+        return not_modified
 
-    result = business_query.first()
-    if not result:
+    # Leer el snapshot de la tienda (una lectura por clave primaria)
+    storefront = get_storefront(db, business_id)
+    if not storefront:
         raise HTTPException(status_code=404, detail="No existe este negocio.")
 
-    business, is_favorite = result
-
-    # Obtener las categorías del negocio
-    categories = db.query(Category).filter(Category.business_id == business_id).all()
-
-    categories_response = []
-    for category in categories:
-        products_query = (
-            db.query(
-                Product,
-                func.coalesce(Favourite.product_id.isnot(None), False).label("is_favorite")
-            )
-            .join(CategoryProductAssociation)
-            .outerjoin(Favourite, 
-                       (Favourite.product_id == Product.id) & 
-                       (Favourite.user_id == current_user.local_id))
-            .filter(CategoryProductAssociation.category_id == category.id)
-            .limit(limit)
-            .all()
-        )
-
-        # Crear una estructura serializable sin modificar la relación ORM
-        category_dict = {
-            "id": category.id,
-            "name": category.name,
-            "business_id": category.business_id,
-            "products": [
-                {
-                    "id": product.id,
-                    "name": product.name,
-                    "description": product.description,
-                    "price": product.price,
-                    "product_image_url": product.product_image_url,
-                    "stock": product.stock,
-                    "available": product.available,
-                    "business_id": product.business_id,
-                    "discount": product.discount,
-                    "is_active": product.is_active,
-                    "options": product.options,
-                    "is_favorite": is_favorite
-                }
-                for product, is_favorite in products_query
-            ]
-        }
-        
-        categories_response.append(category_dict)
-
-    return {
-        "business": {
-            "id": business.id,
-            "address": business.address,
-            "admin_id": business.admin_id,
-            "business_name": business.business_name,
-            "municipality_id": business.municipality_id,
-            "country": business.country,
-            "description": business.description,
-            "email": business.email,
-            "lat": business.lat,
-            "long": business.long,
-            "phone_number": business.phone_number,
-            "zip_code": business.zip_code,
-            "is_active": business.is_active,
-            "is_popular_this_week": business.is_popular_this_week,
-            "is_novelty": business.is_novelty,
-            "has_free_delivery": business.has_free_delivery,
-            "has_alcohol": business.has_alcohol,
-            "is_open_now": business.is_open_now,
-            "average_price": business.average_price,
-            "average_delivery": business.average_delivery,
-            "type_business": business.type_business,
-            "business_images": business.business_images,
-            "is_favorite": is_favorite
-        },
-        "business_categories": categories_response
-    }
+    set_cache_headers(response, validators)
+    return apply_user_favourites(db, storefront, current_user.local_id, products_limit=limit)
 
 
 @router.put("/{category_id}/", response_model=CategoryResponse)
@@ -0,0 +1,77 @@
+from uuid import UUID
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, WebSocketException, status
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+from core.principal_cache import Principal
+from core.security import get_current_driver_user, get_current_principal, get_websocket_principal
+from database.session import get_db
+from database.models.driver_location_model import DriverLocation
+from database.models.users_model import RoleEnum
+from repositories.location_ingest import location_buffer
+from repositories.order import can_track_driver
+from schemas.auth_schemas import TokenData
+from schemas.driver_schemas import DriverLocationResponse, LocationBatch, LocationBatchResponse
+
+router = APIRouter(prefix="/drivers", tags=["Drivers"])
+
+
+def current_driver(current_user: TokenData = Depends(get_current_driver_user)) -> UUID:
+    return UUID(current_user.local_id)
+
+# Recibir las posiciones GPS del repartidor autenticado (se escriben por lotes en segundo plano)
+@router.post("/me/locations", response_model=LocationBatchResponse, status_code=status.HTTP_202_ACCEPTED)
+async def report_locations(batch: LocationBatch, driver_id: UUID = Depends(current_driver)):
+    if not location_buffer.offer(driver_id, [point.model_dump() for point in batch.points]):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="El servidor está saturado; reintente más tarde.",
+            headers={"Retry-After": str(location_buffer.retry_after())},
+        )
+    return {"accepted": len(batch.points)}
+
+# Las mismas posiciones por WebSocket (el token va en la URL: el navegador no permite cabeceras).
+# Cada mensaje es un punto o {"points": [...]}; solo se responde si hay un error o hay que esperar.
+@router.websocket("/me/locations/ws")
+async def report_locations_ws(websocket: WebSocket, principal: Principal = Depends(get_websocket_principal)):
+    # Los roles salen de la caché de usuarios, no del token (ver get_current_principal)
+    if not principal.has_role(RoleEnum.DRIVER):
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason="El usuario no tiene privilegios de repartidor")
+    driver_id = principal.user_id
+
+    await websocket.accept()
+    try:
+        while True:
+            try:
+                message = await websocket.receive_json()
+            except (ValueError, KeyError):
+                # Un mensaje que no es JSON (o binario) no cierra la conexión
+                await websocket.send_json({"type": "error", "detail": "El mensaje no es JSON válido"})
+                continue
+            try:
+                batch = LocationBatch.model_validate(message if "points" in message else {"points": [message]})
+            except (ValidationError, TypeError):
+                await websocket.send_json({"type": "error", "detail": "Punto de ubicación inválido"})
+                continue
+            if not location_buffer.offer(driver_id, [point.model_dump() for point in batch.points]):
+                await websocket.send_json({"type": "retry_after", "seconds": location_buffer.retry_after()})
+    except WebSocketDisconnect:
+        pass
+
+# Última posición conocida de un repartidor (seguimiento del pedido). Solo la ven el propio
+# repartidor y el cliente o el negocio de un pedido en curso que tenga asignado.
+@router.get("/{driver_id}/location", response_model=DriverLocationResponse)
+def get_driver_location(
+    driver_id: UUID,
+    db: Session = Depends(get_db),
+    principal: Principal = Depends(get_current_principal),
+):
+    if not can_track_driver(db, driver_id, principal.user_id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No tiene acceso a este repartidor")
+    # La posición en memoria es más reciente que la guardada si el repartidor reporta a este worker
+    point = location_buffer.latest(driver_id)
+    if point is not None:
+        return {"driver_id": driver_id, **point}
+    location = db.get(DriverLocation, driver_id)
+    if not location:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Location not found")
+    return location
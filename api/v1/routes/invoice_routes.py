@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from typing import Optional
+from uuid import UUID
+from core.security import check_business_admin, get_current_active_user, get_owned_business
+from database.session import get_db
+from database.models.business_model import Business
+from database.models.invoice_model import BusinessInvoice
+from schemas.auth_schemas import TokenData
+from schemas.invoice_schemas import InvoicePageResponse, InvoiceResponse, InvoiceStatus
+
+router = APIRouter(prefix="/invoices", tags=["Invoices"])
+
+# Obtener las facturas de un negocio (más recientes primero)
+@router.get("/business/{business_id}", response_model=InvoicePageResponse)
+def get_business_invoices(
+    business_id: UUID,
+    status_filter: Optional[InvoiceStatus] = Query(None, alias="status"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+    business: Business = Depends(get_owned_business),
+):
+    stmt = select(BusinessInvoice).where(BusinessInvoice.business_id == business_id)
+    if status_filter is not None:
+        stmt = stmt.where(BusinessInvoice.status == status_filter)
+    # Se pide una fila de más para saber si hay otra página sin contar el total
+    invoices = db.execute(
+        stmt.order_by(BusinessInvoice.period_start.desc().nulls_last(), BusinessInvoice.id.desc()).limit(limit + 1).offset(offset)
+    ).scalars().all()
+    return {"items": invoices[:limit], "limit": limit, "offset": offset, "has_more": len(invoices) > limit}
+
+# Obtener una factura por su ID
+@router.get("/{invoice_id}", response_model=InvoiceResponse)
+def get_invoice(
+    invoice_id: int,
+    db: Session = Depends(get_db),
+    current_user: TokenData = Depends(get_current_active_user),
+):
+    invoice = db.get(BusinessInvoice, invoice_id)
+    if not invoice:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Invoice not found")
+    check_business_admin(db, invoice.business_id, current_user)
+    return invoice
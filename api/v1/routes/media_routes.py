@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from core.config import get_setting
+from core.media import MEDIA_PATH, MediaError, media_store, original_url, variant_urls
+from core.security import get_current_admin_user_detached
+from schemas.media_schemas import UploadedImageResponse
+from schemas.auth_schemas import TokenData
+
+router = APIRouter(prefix="/uploads", tags=["Uploads"])
+
+# URL pública de MEDIA_ROOT (p. ej. un CDN); por defecto /media en este mismo servidor
+MEDIA_BASE_URL = get_setting("MEDIA_BASE_URL", None)
+
+
+# Subir una imagen (campo de archivo de un multipart/form-data). El cuerpo no se carga en
+# memoria: por eso se lee request.stream() directamente en lugar de usar UploadFile. La
+# autenticación usa una sesión breve: con get_db la conexión seguiría tomada del pool
+# mientras llega la subida, que puede tardar decenas de segundos desde un móvil.
+@router.post("/images", response_model=UploadedImageResponse, status_code=status.HTTP_201_CREATED)
+async def upload_image(request: Request, current_user: TokenData = Depends(get_current_admin_user_detached)):
+    try:
+        stored = await media_store.save_upload(request)
+    except MediaError as error:
+        raise HTTPException(status_code=error.status_code, detail=error.detail)
+
+    base_url = MEDIA_BASE_URL or str(request.base_url).rstrip("/") + MEDIA_PATH
+    url = original_url(base_url, stored["digest"], stored["extension"])
+    return {
+        "sha256": stored["digest"],
+        "size": stored["size"],
+        "url": url,
+        "urls": variant_urls(url),
+        "thumbnails_ready": stored["thumbnails_ready"],
+        "deduplicated": stored["deduplicated"],
+    }
@@ -1,44 +1,207 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from datetime import datetime
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Request, WebSocket, WebSocketException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from uuid import UUID
-from typing import List
-from database.models.order_model import Order, OrderItem  # Modelos de SQLAlchemy
-from database.models.users_model import Driver, BusinessAdmin
+from typing import List, Literal, Optional, Union
+from core.principal_cache import Principal
+from core.security import get_current_principal, get_websocket_principal
+from database.models.business_model import Business
+from database.models.order_model import Order, OrderItem, OrderStatus, PaymentStatus  # Modelos de SQLAlchemy
+from database.models.users_model import Driver
 from schemas.order_schemas import (
     OrderCreate,
     OrderUpdate,
-    OrderResponse
+    OrderResponse,
+    OrderPageResponse,
+    OrderSummaryPageResponse,
+    OrderStatusEnum,
+    PaymentStatusEnum,
 )
-from database.session import get_db
+from core.pubsub import sse_stream, websocket_stream
+from database.session import SessionLocal, get_db
+from repositories.cart_pricing import price_drift
+from repositories.cart_store import cart_store
+from repositories.dispatch import DispatchError, dispatch_order, release_driver
+from repositories.order import can_track_driver, get_order_detail, list_orders, publish_order_event
+from repositories.sales_rollups import apply_order_transition, remove_order_contribution
 
 router = APIRouter(prefix="/orders", tags=["Orders"])
 
-# Obtener todos los pedidos de un usuario
-@router.get("/{user_id}", response_model=List[OrderResponse])
-def get_orders(user_id: UUID, db: Session = Depends(get_db)):
-    orders = db.query(Order).filter(Order.user_id == user_id).all()
-    return orders
-
-# Obtener todos los pedidos asignados al repartidor
-@router.get("/{driver_id}", response_model=List[OrderResponse])
-def get_orders(driver_id: UUID, db: Session = Depends(get_db)):
-      
-    orders = db.query(Order).filter(Order.driver_id == driver_id).all()
-    return orders
-
-# Obtener todos los pedidos de un negocio
-@router.get("/{business_id}", response_model=List[OrderResponse])
-def get_orders(business_id: UUID, db: Session = Depends(get_db)):
-    business = db.query(BusinessAdmin).filter(BusinessAdmin.id == business_id).first()
-    if not business:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Este Usuario no tiene autorización o no existe.")
-    orders = db.query(Order).filter(Order.business_id == business.id).all()
-    return orders
+# Estados de entrega finales (PaymentStatus guarda el estado de la entrega)
+TERMINAL_STATUSES = (PaymentStatus.DELIVERED, PaymentStatus.CANCELED)
+
+
+def order_filters(
+    status_filter: Optional[List[OrderStatusEnum]] = Query(None, alias="status"),
+    payment_status: Optional[List[PaymentStatusEnum]] = Query(None),
+    date_from: Optional[datetime] = Query(None, description="Creados desde (inclusive)"),
+    date_to: Optional[datetime] = Query(None, description="Creados antes de (exclusive)"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    view: Literal["full", "summary"] = Query("full", description="summary: sin items, con su número"),
+) -> dict:
+    """Filtros, paginación y vista comunes de los listados de pedidos."""
+    return {
+        "status": [OrderStatus(value.value) for value in status_filter or []],
+        "payment_status": [PaymentStatus(value.value) for value in payment_status or []],
+        "date_from": date_from,
+        "date_to": date_to,
+        "limit": limit,
+        "offset": offset,
+        "view": view,
+    }
+
+
+def _order_page(db: Session, filters: dict, **owner) -> Union[OrderPageResponse, OrderSummaryPageResponse]:
+    orders, has_more = list_orders(db, **owner, **filters)
+    page = OrderSummaryPageResponse if filters["view"] == "summary" else OrderPageResponse
+    return page(items=orders, limit=filters["limit"], offset=filters["offset"], has_more=has_more)
+
+# Obtener los pedidos de un usuario
+@router.get("/user/{user_id}", response_model=Union[OrderPageResponse, OrderSummaryPageResponse])
+def get_user_orders(user_id: UUID, filters: dict = Depends(order_filters), db: Session = Depends(get_db)):
+    return _order_page(db, filters, user_id=user_id)
+
+# Obtener los pedidos asignados al repartidor
+@router.get("/driver/{driver_id}", response_model=Union[OrderPageResponse, OrderSummaryPageResponse])
+def get_driver_orders(driver_id: UUID, filters: dict = Depends(order_filters), db: Session = Depends(get_db)):
+    return _order_page(db, filters, driver_id=driver_id)
+
+# Obtener los pedidos de un negocio
+@router.get("/business/{business_id}", response_model=Union[OrderPageResponse, OrderSummaryPageResponse])
+def get_business_orders(business_id: UUID, filters: dict = Depends(order_filters), db: Session = Depends(get_db)):
+    if db.get(Business, business_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Business not found")
+    return _order_page(db, filters, business_id=business_id)
+
+def _event_stream(request: Request, topic: str, last_event_id: Optional[int]) -> StreamingResponse:
+    return StreamingResponse(
+        sse_stream(request, [topic], last_event_id),
+        media_type="text/event-stream",
+        # Evita que proxies como nginx acumulen los eventos
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _last_event_id(
+    last_event_id: Optional[int] = Query(None, description="Reanudar después de este evento"),
+    header: Optional[int] = Header(None, alias="Last-Event-ID"),
+) -> Optional[int]:
+    # EventSource envía la cabecera al reconectarse; el parámetro sirve para la primera conexión
+    return header if header is not None else last_event_id
+
+
+def existing_order(order_id: UUID, db: Session = Depends(get_db)) -> UUID:
+    if db.get(Order, order_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
+    return order_id
+
+
+def existing_business(business_id: UUID, db: Session = Depends(get_db)) -> UUID:
+    if db.get(Business, business_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Business not found")
+    return business_id
+
+
+# Los eventos de un repartidor incluyen su posición: solo para quien puede seguirlo
+def trackable_driver(
+    driver_id: UUID,
+    db: Session = Depends(get_db),
+    principal: Principal = Depends(get_current_principal),
+) -> UUID:
+    if db.get(Driver, driver_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Driver not found")
+    if not can_track_driver(db, driver_id, principal.user_id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No tiene acceso a este repartidor")
+    return driver_id
+
+
+# Eventos en tiempo real (Server-Sent Events) de un pedido, un negocio o un repartidor
+@router.get("/{order_id}/events", response_class=StreamingResponse)
+async def order_events(
+    request: Request,
+    order_id: UUID = Depends(existing_order),
+    last_event_id: Optional[int] = Depends(_last_event_id),
+):
+    return _event_stream(request, f"order:{order_id}", last_event_id)
+
+@router.get("/business/{business_id}/events", response_class=StreamingResponse)
+async def business_order_events(
+    request: Request,
+    business_id: UUID = Depends(existing_business),
+    last_event_id: Optional[int] = Depends(_last_event_id),
+):
+    return _event_stream(request, f"business:{business_id}", last_event_id)
+
+@router.get("/driver/{driver_id}/events", response_class=StreamingResponse)
+async def driver_order_events(
+    request: Request,
+    driver_id: UUID = Depends(trackable_driver),
+    last_event_id: Optional[int] = Depends(_last_event_id),
+):
+    return _event_stream(request, f"driver:{driver_id}", last_event_id)
+
+
+# Las dependencias de un WebSocket siguen abiertas mientras dure la conexión: con get_db cada
+# suscriptor retendría una conexión del pool. La comprobación usa una sesión propia y breve.
+def existing_order_ws(order_id: UUID) -> UUID:
+    with SessionLocal() as db:
+        found = db.get(Order, order_id) is not None
+    if not found:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason="Order not found")
+    return order_id
+
+
+def existing_business_ws(business_id: UUID) -> UUID:
+    with SessionLocal() as db:
+        found = db.get(Business, business_id) is not None
+    if not found:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason="Business not found")
+    return business_id
+
+
+def trackable_driver_ws(driver_id: UUID, principal: Principal = Depends(get_websocket_principal)) -> UUID:
+    with SessionLocal() as db:
+        found = db.get(Driver, driver_id) is not None
+        allowed = found and can_track_driver(db, driver_id, principal.user_id)
+    if not found:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason="Driver not found")
+    if not allowed:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason="No tiene acceso a este repartidor")
+    return driver_id
+
+
+# Los mismos eventos por WebSocket (el navegador no permite cabeceras: last_event_id va en la URL)
+@router.websocket("/{order_id}/ws")
+async def order_events_ws(
+    websocket: WebSocket,
+    order_id: UUID = Depends(existing_order_ws),
+    last_event_id: Optional[int] = None,
+):
+    await websocket_stream(websocket, [f"order:{order_id}"], last_event_id)
+
+@router.websocket("/business/{business_id}/ws")
+async def business_order_events_ws(
+    websocket: WebSocket,
+    business_id: UUID = Depends(existing_business_ws),
+    last_event_id: Optional[int] = None,
+):
+    await websocket_stream(websocket, [f"business:{business_id}"], last_event_id)
+
+@router.websocket("/driver/{driver_id}/ws")
+async def driver_order_events_ws(
+    websocket: WebSocket,
+    driver_id: UUID = Depends(trackable_driver_ws),
+    last_event_id: Optional[int] = None,
+):
+    await websocket_stream(websocket, [f"driver:{driver_id}"], last_event_id)
 
 # Obtener un pedido por su ID
 @router.get("/{order_id}", response_model=OrderResponse)
 def get_order(order_id: UUID, db: Session = Depends(get_db)):
-    order = db.query(Order).filter(Order.id == order_id).first()
+    order = get_order_detail(db, order_id)
     if not order:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Order not found"
@@ -48,14 +211,24 @@ def get_order(order_id: UUID, db: Session = Depends(get_db)):
 # Crear un nuevo pedido
 @router.post("/", response_model=OrderResponse, status_code=status.HTTP_201_CREATED)
 def create_order(order_data: OrderCreate, db: Session = Depends(get_db)):
+    # El carrito vive en el almacén: se escribe en la base antes de crear el pedido
+    cart_store.flush_owner(db, order_data.user_id, order_data.business_id)
+    # El precio de algún producto cambió desde que el cliente vio el carrito
+    drift = price_drift(db, order_data.user_id, order_data.business_id, order_data.order_items)
+    if drift:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={"message": "El precio de algunos productos cambió.", "items": drift},
+        )
+
     # Crear el pedido principal
     new_order = Order(
         user_id=order_data.user_id,
         driver_id=order_data.driver_id,
         business_id=order_data.business_id,
         delivery_time=order_data.delivery_time,
-        status=order_data.status,
-        payment_status=order_data.payment_status,
+        status=OrderStatus(order_data.status.value),
+        payment_status=PaymentStatus(order_data.payment_status.value),
         subtotal=order_data.subtotal,
         discount=order_data.discount,
         taxes=order_data.taxes,
@@ -82,36 +255,85 @@ def create_order(order_data: OrderCreate, db: Session = Depends(get_db)):
             total_price=item.total_price,
         )
         db.add(new_item)
+    # La sesión no hace autoflush: los agregados leen los items de la base de datos
+    db.flush()
+
+    # Un pedido registrado ya entregado o cancelado cuenta en los agregados de ventas
+    apply_order_transition(db, new_order, None)
 
+    order_id = new_order.id
     db.commit()
-    db.refresh(new_order)  # Refrescar para incluir los items creados
-    return new_order
+    # Releer el pedido con sus items en una sola consulta
+    order = get_order_detail(db, order_id)
+    publish_order_event(order, "order.created")
+    return order
 
 # Actualizar un pedido
 @router.put("/{order_id}", response_model=OrderResponse)
 def update_order(order_id: UUID, order_data: OrderUpdate, db: Session = Depends(get_db)):
-    order = db.query(Order).filter(Order.id == order_id).first()
+    # Bloqueo de la fila: dos transiciones simultáneas no deben contarse dos veces en los agregados
+    order = db.query(Order).filter(Order.id == order_id).with_for_update().first()
     if not order:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Order not found"
         )
 
-    # Actualizar los campos permitidos
-    for key, value in order_data.dict(exclude_unset=True).items():
+    previous = (order.status, order.payment_status, order.driver_id)
+
+    # Actualizar los campos permitidos (los enums del esquema se convierten a los del modelo)
+    values = order_data.dict(exclude_unset=True)
+    if values.get("status") is not None:
+        values["status"] = OrderStatus(values["status"].value)
+    if values.get("payment_status") is not None:
+        values["payment_status"] = PaymentStatus(values["payment_status"].value)
+    for key, value in values.items():
         setattr(order, key, value)
 
+    if order.payment_status != previous[1]:
+        if order.payment_status == PaymentStatus.DELIVERED:
+            order.completed_at = func.now()
+        elif order.payment_status == PaymentStatus.CANCELED:
+            order.canceled_at = func.now()
+        # Agregados de ventas de los tableros, en la misma transacción
+        apply_order_transition(db, order, previous[1])
+
     db.commit()
-    db.refresh(order)
+    order = get_order_detail(db, order_id)
+    # Al entregarse o cancelarse el pedido el repartidor vuelve a estar disponible
+    if order.driver_id is not None and order.payment_status in TERMINAL_STATUSES and previous[1] not in TERMINAL_STATUSES:
+        release_driver(db, order.driver_id)
+    # Los suscriptores distinguen los cambios de estado del resto de modificaciones
+    changed_status = (order.status, order.payment_status) != previous[:2]
+    publish_order_event(order, "order.status_changed" if changed_status else "order.updated", previous_driver_id=previous[2])
+    return order
+
+# Asignar el repartidor disponible más cercano al negocio
+@router.post("/{order_id}/dispatch", response_model=OrderResponse)
+def dispatch(order_id: UUID = Depends(existing_order), db: Session = Depends(get_db)):
+    try:
+        driver_id = dispatch_order(db, order_id)
+    except DispatchError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    if driver_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="No hay repartidores disponibles cerca del negocio.",
+            headers={"Retry-After": "30"},
+        )
+    order = get_order_detail(db, order_id)
+    publish_order_event(order, "order.dispatched")
     return order
 
 # Eliminar un pedido
 @router.delete("/{order_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_order(order_id: UUID, db: Session = Depends(get_db)):
-    order = db.query(Order).filter(Order.id == order_id).first()
+    order = db.query(Order).filter(Order.id == order_id).with_for_update().first()
     if not order:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Order not found"
         )
 
+    # Un pedido entregado o cancelado deja de contar en los agregados de ventas
+    remove_order_contribution(db, order)
     db.delete(order)
     db.commit()
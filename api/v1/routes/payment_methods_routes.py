@@ -4,6 +4,7 @@ from uuid import UUID
 from core.security import get_current_active_user
 from database.session import get_db
 from database.models.payment_method_model import PaymentMethod
+from repositories import primary_selection
 from schemas.auth_schemas import TokenData
 from schemas.payment_method_schemas import PaymentMethodCreate, PaymentMethodUpdate, PaymentMethodResponse, PaymentMethodListResponse
 
@@ -18,19 +19,11 @@ def add_payment_method(
 ):
     user_id = current_user.local_id
 
-    # Verificar si el usuario ya tiene métodos de pago registrados
-    existing_payments = db.query(PaymentMethod).filter(
-        PaymentMethod.user_id == user_id
-    ).count()
-
     payment_dict = payment_data.model_dump()
 
-    # Si no tiene métodos de pago previos, establecer is_main en True
-    if existing_payments == 0:
-        payment_dict["is_main_payment_method"] = True
-
+    # Es el principal si se pidió o si es el primero del usuario
     new_payment = PaymentMethod(**payment_dict, user_id=user_id)
-    db.add(new_payment)
+    primary_selection.payment_methods.add(db, new_payment, user_id)
     db.commit()
     db.refresh(new_payment)
 
@@ -73,14 +66,16 @@ def update_payment(update_data: PaymentMethodUpdate, db: Session = Depends(get_d
     if not payment:
         raise HTTPException(status_code=404, detail="Método de pago no encontrado")
 
-    # Si el nuevo método es marcado como principal, desactivar los demás
-    if update_data.is_main_payment_method:
-        db.query(PaymentMethod).filter(
-            PaymentMethod.user_id == user_id, PaymentMethod.id != update_data.id
-        ).update({"is_main_payment_method": False})
+    # Si el método se marca como principal, se desmarca el anterior en el mismo UPDATE
+    changes = update_data.model_dump(exclude_unset=True)
+    if changes.pop("is_main_payment_method", None):
+        if not primary_selection.payment_methods.select(db, payment.id, user_id):
+            raise HTTPException(status_code=409, detail="El método de pago principal cambió al mismo tiempo; intente de nuevo")
+    elif "is_main_payment_method" in update_data.model_fields_set:
+        payment.is_main_payment_method = False
 
     # Actualizar los campos del método de pago
-    for key, value in update_data.model_dump(exclude_unset=True).items():
+    for key, value in changes.items():
         setattr(payment, key, value)
 
     db.commit()
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends, Query, Request, Response
+from core.http_cache import build_validators, not_modified_response, set_cache_headers
 from core.security import get_current_active_user
+from repositories.cart_pricing import affected_cart_ids, remove_product_from_carts, reprice_product_carts
 from repositories.product import get_products_by_ids, search_products
+from repositories.storefront import get_product_storefront_version
 from sqlalchemy.orm import Session
 from uuid import UUID
-from database.session import get_db
+from database.session import get_db, SessionLocal
 from database.models.product_model import Product, Option, Extra
 from schemas.auth_schemas import TokenData
 from schemas.product_schemas import (
@@ -51,35 +54,55 @@ def get_products_by_ids_endpoint(
 
 
 @router.get("/{product_id}/", response_model=ProductResponse)
-def get_product(product_id: UUID, db: Session = Depends(get_db)):
+def get_product(product_id: UUID, request: Request, response: Response, db: Session = Depends(get_db)):
+    # Validadores derivados de la versión del snapshot del negocio, antes de cargar el producto
+    validators = build_validators(get_product_storefront_version(db, product_id), "product", product_id)
+    not_modified = not_modified_response(request, validators)
+    if not_modified:
+        return not_modified
+
     product = db.query(Product).filter(Product.id == product_id).first()
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
+    set_cache_headers(response, validators)
     return product
 
 
 @router.put("/{product_id}/", response_model=ProductResponse)
-def update_product(product_id: UUID, product_update: ProductUpdate, db: Session = Depends(get_db)):
+def update_product(
+    product_id: UUID,
+    product_update: ProductUpdate,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+):
     product = db.query(Product).filter(Product.id == product_id).first()
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
 
+    old_pricing = (product.price, product.discount)
     for key, value in product_update.dict(exclude_unset=True).items():
         setattr(product, key, value)
 
     db.commit()
     db.refresh(product)
+    # Los carritos que contienen el producto se recalculan después de responder
+    if (product.price, product.discount) != old_pricing:
+        background_tasks.add_task(reprice_product_carts, SessionLocal, product_id)
     return ProductResponse.model_validate(product)
 
 
 @router.delete("/{product_id}/", response_model=dict)
-def delete_product(product_id: UUID, db: Session = Depends(get_db)):
+def delete_product(product_id: UUID, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     product = db.query(Product).filter(Product.id == product_id).first()
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
 
+    # Las líneas se borran en cascada: los carritos afectados se buscan antes
+    cart_ids = affected_cart_ids(db, product_id)
     db.delete(product)
     db.commit()
+    if cart_ids:
+        background_tasks.add_task(remove_product_from_carts, SessionLocal, product_id, cart_ids)
     return {"detail": "Product deleted successfully"}
 
 
@@ -0,0 +1,56 @@
+from fastapi import APIRouter, HTTPException, Request, Response
+from core.config import get_setting
+from core.http_cache import CacheValidators, not_modified_response, set_cache_headers
+from core.reference_data import reference_data
+from schemas.address_schemas import DepartmentListResponseSchema, MunicipalityListResponseSchema
+
+router = APIRouter(prefix="/reference", tags=["Reference"])
+
+# Los datos de referencia casi no cambian: el cliente y el CDN pueden guardarlos un día y
+# revalidar con el ETag, que cambia con la versión cargada
+REFERENCE_CACHE_CONTROL = get_setting(
+    "CACHE_CONTROL_REFERENCE", "public, max-age=86400, stale-while-revalidate=604800"
+)
+
+
+def _validators(*parts) -> CacheValidators:
+    seed = "-".join(str(part) for part in (reference_data.snapshot.version, *parts))
+    return CacheValidators(f'W/"{seed}"', None, REFERENCE_CACHE_CONTROL)
+
+# Departamentos con sus municipios
+@router.get("/departments", response_model=DepartmentListResponseSchema)
+def get_departments(request: Request, response: Response):
+    validators = _validators("departments")
+    not_modified = not_modified_response(request, validators)
+    if not_modified:
+        return not_modified
+
+    set_cache_headers(response, validators)
+    return {"department_list": [
+        {"id": department.id, "name": department.name, "municipalities": reference_data.municipalities_of(department.id)}
+        for department in reference_data.snapshot.departments.values()
+    ]}
+
+# Municipios de un departamento
+@router.get("/departments/{department_id}/municipalities", response_model=MunicipalityListResponseSchema)
+def get_department_municipalities(department_id: int, request: Request, response: Response):
+    if reference_data.department(department_id) is None:
+        raise HTTPException(status_code=404, detail="Departamento no encontrado")
+    validators = _validators("departments", department_id)
+    not_modified = not_modified_response(request, validators)
+    if not_modified:
+        return not_modified
+
+    set_cache_headers(response, validators)
+    return {"municipality_list": reference_data.municipalities_of(department_id)}
+
+# Todos los municipios
+@router.get("/municipalities", response_model=MunicipalityListResponseSchema)
+def get_municipalities(request: Request, response: Response):
+    validators = _validators("municipalities")
+    not_modified = not_modified_response(request, validators)
+    if not_modified:
+        return not_modified
+
+    set_cache_headers(response, validators)
+    return {"municipality_list": list(reference_data.snapshot.municipalities.values())}
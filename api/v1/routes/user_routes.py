@@ -2,6 +2,7 @@ from fastapi import APIRouter, HTTPException, Depends, status
 from sqlalchemy.orm import Session
 from uuid import UUID
 
+from core.principal_cache import principal_cache
 from core.security import get_current_active_user
 from schemas.user_schemas import (UserSchemaResponse, UserSchemaUpdate)
 from database.models.users_model import User
@@ -49,6 +50,8 @@ def update_user(user: UserSchemaUpdate, db: Session = Depends(get_db), current_u
         setattr(existing_user, key, value)
     
     db.commit()
+    # Municipio y proveedores forman parte de los datos de autorización en caché
+    principal_cache.invalidate(existing_user.id)
     db.refresh(existing_user)
     
     # Retornar el usuario actualizado con los roles transformados
@@ -74,4 +77,5 @@ def delete_user(user_id: UUID, db: Session = Depends(get_db), current_user: Toke
     
     db.delete(user)
     db.commit()
+    principal_cache.invalidate(user_id)
     return
\ No newline at end of file
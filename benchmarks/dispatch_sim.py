@@ -0,0 +1,190 @@
+"""
+Simulación de la asignación de repartidores (sin base de datos).
+
+Coloca N repartidores al azar alrededor de San Salvador, mueve sus posiciones en un hilo
+aparte y lanza pedidos concurrentes desde varios hilos. Cada pedido busca los k más
+cercanos en el índice y reserva uno con una operación condicional equivalente al
+UPDATE ... WHERE is_available de la base de datos. Las entregas liberan al repartidor tras
+un tiempo simulado.
+
+Reporta la latencia de la búsqueda (p50/p95/p99), los conflictos de reserva y los pedidos
+sin repartidor. Con --verify compara cada resultado con una búsqueda lineal; en ese modo
+las posiciones no se mueven y conviene usar un solo hilo.
+
+Uso:
+    python -m benchmarks.dispatch_sim --drivers 5000 --orders 20000 --threads 8
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from benchmarks.runner import percentile
+from repositories.dispatch import DriverIndex, haversine_km
+
+# Zona metropolitana de San Salvador
+CENTER = (13.6929, -89.2182)
+SPREAD = 0.15
+
+
+def _random_point(rng: random.Random) -> tuple[float, float]:
+    return CENTER[0] + rng.uniform(-SPREAD, SPREAD), CENTER[1] + rng.uniform(-SPREAD, SPREAD)
+
+
+class SimulatedDrivers:
+    """Tabla drivers simulada: la reserva es atómica como el UPDATE condicional."""
+
+    def __init__(self, driver_ids):
+        self._lock = threading.Lock()
+        self.available = {driver_id: True for driver_id in driver_ids}
+
+    def claim(self, driver_id) -> bool:
+        with self._lock:
+            if not self.available[driver_id]:
+                return False
+            self.available[driver_id] = False
+            return True
+
+    def release(self, driver_id) -> None:
+        with self._lock:
+            self.available[driver_id] = True
+
+
+def _brute_force(positions: dict, available, lat: float, lon: float, k: int, max_distance_km: float):
+    found = sorted(
+        (haversine_km(lat, lon, driver_lat, driver_lon), driver_id)
+        for driver_id, (driver_lat, driver_lon) in positions.items()
+        if available[driver_id]
+    )
+    return [distance for distance, _ in found if distance <= max_distance_km][:k]
+
+
+def run(args) -> dict:
+    rng = random.Random(args.seed)
+    index = DriverIndex(cell_size=args.cell_size)
+    driver_ids = [uuid.UUID(int=rng.getrandbits(128), version=4) for _ in range(args.drivers)]
+    positions = {driver_id: _random_point(rng) for driver_id in driver_ids}
+    table = SimulatedDrivers(driver_ids)
+    for driver_id, (lat, lon) in positions.items():
+        index.update(driver_id, lat, lon)
+        index.set_available(driver_id, True)
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    latencies: list[float] = []
+    stats = {"assigned": 0, "conflicts": 0, "unassigned": 0, "mismatches": 0, "position_updates": 0}
+
+    def move_drivers():
+        mover = random.Random(args.seed + 1)
+        while not stop.is_set():
+            driver_id = mover.choice(driver_ids)
+            lat, lon = positions[driver_id]
+            lat += mover.uniform(-0.001, 0.001)
+            lon += mover.uniform(-0.001, 0.001)
+            positions[driver_id] = (lat, lon)
+            index.update(driver_id, lat, lon)
+            stats["position_updates"] += 1
+            if args.update_interval:
+                time.sleep(args.update_interval)
+
+    timers: list[threading.Timer] = []
+
+    def deliver(driver_id):
+        table.release(driver_id)
+        index.set_available(driver_id, True)
+
+    def place_orders(worker: int, count: int):
+        local = random.Random(args.seed + 100 + worker)
+        for _ in range(count):
+            lat, lon = _random_point(local)
+            tried = set()
+            while True:
+                started = time.perf_counter()
+                candidates = index.nearest(lat, lon, k=args.k, max_distance_km=args.max_distance, exclude=tried)
+                elapsed = time.perf_counter() - started
+                with lock:
+                    latencies.append(elapsed)
+                if args.verify and not tried:
+                    expected = _brute_force(positions, table.available, lat, lon, args.k, args.max_distance)
+                    if [round(distance, 6) for _, distance in candidates] != [round(distance, 6) for distance in expected]:
+                        with lock:
+                            stats["mismatches"] += 1
+                if not candidates:
+                    with lock:
+                        stats["unassigned"] += 1
+                    break
+                claimed = None
+                for driver_id, _ in candidates:
+                    tried.add(driver_id)
+                    if table.claim(driver_id):
+                        claimed = driver_id
+                        break
+                    with lock:
+                        stats["conflicts"] += 1
+                    index.set_available(driver_id, False)
+                if claimed is not None:
+                    index.set_available(claimed, False)
+                    with lock:
+                        stats["assigned"] += 1
+                    timer = threading.Timer(local.uniform(0, args.delivery_time), deliver, (claimed,))
+                    timer.daemon = True
+                    timer.start()
+                    with lock:
+                        timers.append(timer)
+                    break
+
+    mover = threading.Thread(target=move_drivers, daemon=True)
+    if not args.verify:
+        mover.start()
+    per_thread = args.orders // args.threads
+    workers = [threading.Thread(target=place_orders, args=(worker, per_thread)) for worker in range(args.threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    duration = time.perf_counter() - started
+    stop.set()
+    if mover.is_alive():
+        mover.join()
+    for timer in timers:
+        timer.cancel()
+
+    micros = [latency * 1e6 for latency in latencies]
+    return {
+        "drivers": args.drivers,
+        "orders": per_thread * args.threads,
+        "threads": args.threads,
+        "duration_s": round(duration, 3),
+        "orders_per_s": round(per_thread * args.threads / duration, 1),
+        "nearest_us": {
+            "p50": round(percentile(micros, 50), 1),
+            "p95": round(percentile(micros, 95), 1),
+            "p99": round(percentile(micros, 99), 1),
+        },
+        **stats,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Simulación del índice de asignación de repartidores")
+    parser.add_argument("--drivers", type=int, default=5000)
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--max-distance", type=float, default=10.0, help="Radio de búsqueda en km")
+    parser.add_argument("--cell-size", type=float, default=0.02, help="Tamaño de celda en grados")
+    parser.add_argument("--delivery-time", type=float, default=0.5, help="Segundos simulados hasta liberar al repartidor")
+    parser.add_argument("--update-interval", type=float, default=0.0, help="Pausa entre actualizaciones de posición")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--verify", action="store_true", help="Compara con una búsqueda lineal (lento)")
+    args = parser.parse_args(argv)
+
+    print(json.dumps(run(args), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""
+Recorridos de usuario para las pruebas de carga.
+
+Cada paso recibe un cliente HTTP con la interfaz de httpx (httpx.Client o el cliente de
+locust) y un objeto `request(name, method, url, **kwargs)` que mide y etiqueta la llamada
+con la plantilla de la ruta, para agrupar las métricas por endpoint y no por id.
+"""
+import random
+
+
+class Journey:
+    """Sesión de un usuario simulado: inicia sesión, navega, busca, arma un carrito y paga."""
+
+    def __init__(self, request, manifest: dict, rng: random.Random):
+        self.request = request
+        self.manifest = manifest
+        self.rng = rng
+        self.headers = {}
+        self.user_id = None
+
+    def sign_in(self):
+        response = self.request(
+            "POST /auth/signIn", "POST", "/auth/signIn",
+            json={"email": self.rng.choice(self.manifest["users"]), "password": self.manifest["password"]},
+        )
+        if response.status_code == 200:
+            data = response.json()
+            self.user_id = data["local_id"]
+            self.headers = {"Authorization": f"Bearer {data['access_token']}"}
+        return response
+
+    def browse_types(self):
+        response = self.request("GET /businesses/types_business/", "GET", "/businesses/types_business/")
+        type_id = self.rng.choice(self.manifest["type_business_ids"])
+        self.request(
+            "GET /businesses/types_business/{type_business_id}", "GET", f"/businesses/types_business/{type_id}"
+        )
+        return response
+
+    def open_menu(self, business: dict):
+        self.request(
+            "GET /categories/business/{business_id}/", "GET", f"/categories/business/{business['id']}/",
+            headers=self.headers,
+        )
+        return self.request(
+            "GET /categories/restaurant/{business_id}/", "GET", f"/categories/restaurant/{business['id']}/",
+            headers=self.headers,
+        )
+
+    def search(self, business: dict):
+        return self.request(
+            "GET /products/search", "GET", "/products/search",
+            params={"business_id": business["id"], "query": self.rng.choice(business["search_terms"] or ["a"])},
+            headers=self.headers,
+        )
+
+    def add_to_cart(self, business: dict, product_ids: list):
+        response = None
+        for product_id in product_ids:
+            response = self.request(
+                "POST /carts/carts/{business_id}/items", "POST", f"/carts/carts/{business['id']}/items",
+                params={"user_id": self.user_id},
+                json={"product_id": product_id, "quantity": 1},
+                headers=self.headers,
+            )
+        return response
+
+    def update_quantities(self, cart: dict):
+        response = None
+        for item in cart.get("cart_items", []):
+            response = self.request(
+                "PUT /carts/carts/{cart_id}/items/{item_id}", "PUT",
+                f"/carts/carts/{cart['id']}/items/{item['id']}",
+                json={"quantity": self.rng.randint(1, 4)},
+                headers=self.headers,
+            )
+        return response
+
+    def checkout(self, cart: dict):
+        items = [
+            {
+                "product_id": item["product"]["id"],
+                "product_name": item["product"]["name"],
+                "product_price": item["product"]["price"],
+                "quantity": item["quantity"],
+                "total_price": str(float(item["product"]["price"]) * item["quantity"]),
+            }
+            for item in cart.get("cart_items", [])
+        ]
+        return self.request(
+            "POST /orders/", "POST", "/orders/",
+            json={
+                "user_id": self.user_id, "driver_id": None, "business_id": cart["business_id"],
+                "delivery_time": None, "status": "Pendiente", "payment_status": "Pendiente",
+                "subtotal": cart["subtotal"], "discount": cart["discount_total"], "taxes": cart["taxes"],
+                "delivery_fee": cart["delivery_fee"], "total": cart["total"],
+                "delivery_address_type": "Casa", "delivery_street_address": "Colonia Centro",
+                "delivery_latitude": None, "delivery_longitude": None,
+                "delivery_municipality": "Bench", "notes": None, "order_items": items,
+            },
+            headers=self.headers,
+        )
+
+    def run(self):
+        """Recorrido completo: login → tipos → menú → búsqueda → carrito → cantidades → pago."""
+        if self.sign_in().status_code != 200:
+            return
+        self.browse_types()
+        business = self.rng.choice(self.manifest["businesses"])
+        menu = self.open_menu(business)
+        self.search(business)
+        if menu.status_code != 200:
+            return
+        products = [
+            product["id"]
+            for category in menu.json()["business_categories"]
+            for product in category["products"]
+        ]
+        if not products:
+            return
+        cart_response = self.add_to_cart(business, self.rng.sample(products, k=min(3, len(products))))
+        if cart_response is None or cart_response.status_code != 200:
+            return
+        cart = cart_response.json()
+        updated = self.update_quantities(cart)
+        if updated is not None and updated.status_code == 200:
+            cart = updated.json()
+        self.checkout(cart)
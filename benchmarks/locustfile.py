@@ -0,0 +1,29 @@
+"""
+Recorridos de benchmarks/journeys.py ejecutados con locust (opcional: pip install locust).
+
+Uso:
+    locust -f benchmarks/locustfile.py --host http://localhost:8000 --users 50 --spawn-rate 5
+"""
+import json
+import os
+import random
+from locust import HttpUser, task, between
+from benchmarks.journeys import Journey
+
+with open(os.environ.get("BENCH_MANIFEST", "benchmarks/manifest.json")) as f:
+    MANIFEST = json.load(f)
+
+
+class AppUser(HttpUser):
+    wait_time = between(0.5, 2)
+
+    def on_start(self):
+        self.rng = random.Random()
+
+    def request(self, name, method, url, **kwargs):
+        # name agrupa las estadísticas de locust por plantilla de ruta
+        return self.client.request(method, url, name=name, **kwargs)
+
+    @task
+    def full_journey(self):
+        Journey(self.request, MANIFEST, self.rng).run()
@@ -0,0 +1,121 @@
+import random
+import uuid
+from decimal import Decimal
+import pytest
+from core.auth import create_access_token, decode_access_token
+# Todos los modelos deben estar importados para que SQLAlchemy resuelva las relaciones
+from database.models import (address_model, business_model, cart_model, favourite_model, invoice_model,  # noqa: F401
+                             payment_method_model, storefront_model, users_model)
+from database.models.order_model import Order, OrderItem
+from database.models.product_model import Product
+from repositories.dispatch import DriverIndex
+from schemas.product_schemas import CategoryResponse, ProductResponse
+from utils.cart_totals import calculate_cart_totals
+from utils.validators import validate_phone_number
+
+BUSINESS_ID = uuid.UUID(int=1, version=4)
+
+
+def _product_payload(index: int) -> dict:
+    return {
+        "id": str(uuid.UUID(int=1000 + index, version=4)),
+        "name": f"Producto {index}",
+        "price": "125.50",
+        "description": "Descripción del producto",
+        "product_image_url": "https://example.com/product.png",
+        "stock": 40,
+        "available": True,
+        "business_id": str(BUSINESS_ID),
+        "discount": "10.00",
+        "is_active": True,
+        "is_favorite": index % 3 == 0,
+        "options": [
+            {
+                "id": option,
+                "title": f"Opción {option}",
+                "max_extras": 2,
+                "is_required": False,
+                "product_id": str(uuid.UUID(int=1000 + index, version=4)),
+                "extras": [
+                    {"id": extra, "title": f"Extra {extra}", "price": "15.00", "option_id": option}
+                    for extra in range(3)
+                ],
+            }
+            for option in range(2)
+        ],
+    }
+
+
+@pytest.fixture(scope="module")
+def cart_lines():
+    return [(index % 4 + 1, Decimal("99.90") + index, Decimal("5.00")) for index in range(25)]
+
+
+@pytest.fixture(scope="module")
+def order():
+    order = Order(discount=Decimal("20.00"))
+    order.order_items = [
+        OrderItem(product_name=f"Producto {index}", product_price=Decimal("80.00") + index, quantity=index % 3 + 1,
+                  total_price=Decimal("0.00"))
+        for index in range(25)
+    ]
+    return order
+
+
+@pytest.fixture(scope="module")
+def driver_index():
+    rng = random.Random(42)
+    index = DriverIndex()
+    for number in range(5000):
+        driver_id = uuid.UUID(int=number, version=4)
+        index.update(driver_id, 13.6929 + rng.uniform(-0.15, 0.15), -89.2182 + rng.uniform(-0.15, 0.15))
+        index.set_available(driver_id, True)
+    return index
+
+
+def bench_calculate_cart_totals(benchmark, cart_lines):
+    totals = benchmark(calculate_cart_totals, cart_lines)
+    assert totals["subtotal"] > totals["discount_total"]
+
+
+def bench_order_calculate_totals(benchmark, order):
+    benchmark(order.calculate_totals, Decimal("0.15"), Decimal("50.00"))
+    assert order.total > 0
+
+
+def bench_product_discounted_price(benchmark):
+    product = Product(price=Decimal("125.50"), discount=Decimal("10.00"))
+    assert benchmark(product.get_discounted_price) == Decimal("115.50")
+
+
+def bench_create_access_token(benchmark):
+    token = benchmark(create_access_token, {"id": str(uuid.UUID(int=7)), "roles": ["USER"]})
+    assert token.count(".") == 2
+
+
+def bench_decode_access_token(benchmark):
+    token = create_access_token({"id": str(uuid.UUID(int=7)), "roles": ["USER"]})
+    assert benchmark(decode_access_token, token).local_id == str(uuid.UUID(int=7))
+
+
+def bench_validate_phone_number(benchmark):
+    assert benchmark(validate_phone_number, "9876-5432")
+
+
+def bench_product_response_validation(benchmark):
+    payload = _product_payload(0)
+    assert benchmark(ProductResponse.model_validate, payload).name == "Producto 0"
+
+
+def bench_category_response_validation(benchmark):
+    payload = {
+        "id": 1,
+        "name": "Categoría",
+        "business_id": str(BUSINESS_ID),
+        "products": [_product_payload(index) for index in range(20)],
+    }
+    assert len(benchmark(CategoryResponse.model_validate, payload).products) == 20
+
+
+def bench_driver_index_nearest(benchmark, driver_index):
+    assert len(benchmark(driver_index.nearest, 13.70, -89.22, 5)) == 5
@@ -0,0 +1,156 @@
+"""
+Ejecutor de pruebas de carga basado en httpx.
+
+Lanza N usuarios concurrentes que repiten los recorridos de benchmarks/journeys.py contra
+una API local y genera un reporte JSON con p50/p95/p99 de latencia y sentencias SQL por
+ruta (leídas de la cabecera Server-Timing). Dos reportes se pueden comparar entre commits.
+
+Uso:
+    python -m benchmarks.runner --base-url http://localhost:8000 --users 20 --duration 60 --output report.json
+    python -m benchmarks.runner --compare baseline.json report.json
+"""
+import argparse
+import json
+import math
+import random
+import re
+import sys
+import threading
+import time
+from collections import defaultdict
+import httpx
+from benchmarks.journeys import Journey
+
+_SQL_COUNT = re.compile(r'sql;desc="(\d+)"')
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    # Método del rango más cercano
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.queries = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, name: str, elapsed: float, response: httpx.Response | None):
+        with self._lock:
+            self.latencies[name].append(elapsed * 1000)
+            if response is None or response.status_code >= 500:
+                self.errors[name] += 1
+                return
+            match = _SQL_COUNT.search(response.headers.get("server-timing", ""))
+            if match:
+                self.queries[name].append(int(match.group(1)))
+
+    def report(self, meta: dict) -> dict:
+        routes = {}
+        for name, values in sorted(self.latencies.items()):
+            queries = self.queries.get(name, [])
+            routes[name] = {
+                "count": len(values),
+                "errors": self.errors.get(name, 0),
+                "p50_ms": round(percentile(values, 50), 2),
+                "p95_ms": round(percentile(values, 95), 2),
+                "p99_ms": round(percentile(values, 99), 2),
+                "queries_avg": round(sum(queries) / len(queries), 2) if queries else None,
+                "queries_max": max(queries) if queries else None,
+            }
+        return {"meta": meta, "routes": routes}
+
+
+def _worker(base_url: str, manifest: dict, recorder: Recorder, deadline: float, seed: int):
+    rng = random.Random(seed)
+    with httpx.Client(base_url=base_url, timeout=30) as client:
+        def request(name, method, url, **kwargs):
+            started = time.perf_counter()
+            response = None
+            try:
+                response = client.request(method, url, **kwargs)
+                return response
+            except httpx.HTTPError:
+                return httpx.Response(599)
+            finally:
+                recorder.record(name, time.perf_counter() - started, response)
+
+        while time.monotonic() < deadline:
+            Journey(request, manifest, rng).run()
+
+
+def run(args) -> dict:
+    with open(args.manifest) as f:
+        manifest = json.load(f)
+    recorder = Recorder()
+    deadline = time.monotonic() + args.duration
+    threads = [
+        threading.Thread(target=_worker, args=(args.base_url, manifest, recorder, deadline, args.seed + index))
+        for index in range(args.users)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder.report({
+        "base_url": args.base_url, "users": args.users, "duration_s": args.duration,
+        "seed": args.seed, "label": args.label,
+    })
+
+
+def compare(baseline_path: str, current_path: str, tolerance: float) -> int:
+    """Imprime las diferencias por ruta y devuelve 1 si algún p95 empeoró más que la tolerancia."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)["routes"]
+    with open(current_path) as f:
+        current = json.load(f)["routes"]
+
+    regressions = 0
+    print(f"{'ruta':55} {'p95 base':>10} {'p95 actual':>10} {'Δ%':>7} {'sql base':>8} {'sql act':>8}")
+    for name in sorted(set(baseline) | set(current)):
+        old, new = baseline.get(name), current.get(name)
+        if not old or not new:
+            print(f"{name:55} {'-' if not old else old['p95_ms']:>10} {'-' if not new else new['p95_ms']:>10}")
+            continue
+        delta = (new["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100 if old["p95_ms"] else 0.0
+        flag = ""
+        if delta > tolerance:
+            regressions += 1
+            flag = "  <-- regresión"
+        print(f"{name:55} {old['p95_ms']:>10} {new['p95_ms']:>10} {delta:>6.1f}% "
+              f"{str(old['queries_avg']):>8} {str(new['queries_avg']):>8}{flag}")
+    return 1 if regressions else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Pruebas de carga de la API")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--manifest", default="benchmarks/manifest.json")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=30.0, help="Segundos")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--label", default="", help="Etiqueta del reporte, p. ej. el hash del commit")
+    parser.add_argument("--output", default="benchmarks/report.json")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "ACTUAL"))
+    parser.add_argument("--tolerance", type=float, default=10.0, help="Empeoramiento de p95 permitido (%%)")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        return compare(*args.compare, args.tolerance)
+
+    report = run(args)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    for name, route in report["routes"].items():
+        print(f"{name:55} n={route['count']:<6} p50={route['p50_ms']:<8} p95={route['p95_ms']:<8} "
+              f"p99={route['p99_ms']:<8} sql={route['queries_avg']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+"""
+Generador reproducible de datos sintéticos para las pruebas de carga.
+
+Usa los modelos reales de database/models contra la base configurada en secret.json
+(los modelos usan tipos de PostgreSQL: ARRAY, JSONB y el esquema auth).
+
+Uso:
+    python -m benchmarks.seed --businesses 200 --users 1000 --seed 42 --manifest benchmarks/manifest.json
+"""
+import argparse
+import json
+import random
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+from database.session import SessionLocal, init_db
+from database.models.address_model import Department, Municipality
+from database.models.business_model import Business, BusinessImage, TypeBusiness
+from database.models.cart_model import Cart, CartItem
+from database.models.favourite_model import Favourite
+from database.models.order_model import Order, OrderItem, OrderStatus, PaymentStatus
+from database.models.product_model import Category, Product, Option, Extra
+from database.models.users_model import User, BusinessAdmin
+from core.auth import hash_password
+
+BENCH_PASSWORD = "benchmark-password"
+WORDS = (
+    "pollo", "baleada", "pizza", "café", "taco", "hamburguesa", "ensalada", "jugo", "pastel",
+    "sopa", "pupusa", "carne", "queso", "frijoles", "arroz", "helado", "tortilla", "licuado",
+)
+
+
+def _name(rng: random.Random, words: int = 2) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def _price(rng: random.Random, low: int = 20, high: int = 400) -> Decimal:
+    return Decimal(rng.randint(low * 100, high * 100)) / 100
+
+
+def seed(args) -> dict:
+    rng = random.Random(args.seed)
+    init_db()
+    db = SessionLocal()
+    hashed = hash_password(BENCH_PASSWORD)  # Un solo hash: bcrypt es deliberadamente lento
+    try:
+        department = Department(name=f"Bench {args.seed}")
+        municipality = Municipality(name=f"Bench {args.seed}", department=department)
+        types = [TypeBusiness(name=f"Bench {args.seed} {index}", image_url="https://example.com/type.png")
+                 for index in range(args.types)]
+        db.add_all([department, municipality, *types])
+        db.flush()
+
+        users = [
+            User(
+                id=uuid.UUID(int=rng.getrandbits(128), version=4),
+                email=f"bench{args.seed}.user{index}@example.com",
+                phone_number="9999-9999",
+                full_name=f"Usuario {index}",
+                hashed_password=hashed,
+                municipality_id=municipality.id,
+                providers=["EMAIL"],
+                roles=["USER"],
+            )
+            for index in range(args.users)
+        ]
+        db.add_all(users)
+        db.flush()
+
+        businesses, products_by_business = [], {}
+        for index in range(args.businesses):
+            admin = User(
+                id=uuid.UUID(int=rng.getrandbits(128), version=4),
+                email=f"bench{args.seed}.admin{index}@example.com",
+                phone_number="9999-9999",
+                full_name=f"Administrador {index}",
+                hashed_password=hashed,
+                providers=["EMAIL"],
+                roles=["BUSINESS_ADMIN"],
+            )
+            business = Business(
+                id=uuid.UUID(int=rng.getrandbits(128), version=4),
+                type_business_id=rng.choice(types).id,
+                address="Colonia Centro",
+                admin_id=admin.id,
+                business_name=f"{_name(rng)} {index}",
+                municipality_id=municipality.id,
+                country="Honduras",
+                description="Negocio de prueba de carga",
+                email=f"bench{args.seed}.business{index}@example.com",
+                lat=14.0 + rng.random(), long=-87.5 + rng.random(),
+                is_active=True, is_open_now=True,
+                average_price=_price(rng), average_delivery="30 min",
+            )
+            db.add_all([admin, BusinessAdmin(id=admin.id, business_name=business.business_name), business])
+            db.add(BusinessImage(business=business, image_url="https://example.com/cover.png", image_type="portada"))
+
+            products = []
+            for _ in range(args.products):
+                price = _price(rng)
+                product = Product(
+                    id=uuid.UUID(int=rng.getrandbits(128), version=4),
+                    name=_name(rng, 3), price=price, description="Producto de prueba",
+                    product_image_url="https://example.com/product.png",
+                    stock=rng.randint(50, 500), available=True, business_id=business.id,
+                    discount=(price * Decimal("0.1")).quantize(Decimal("0.01")) if rng.random() < 0.2 else Decimal("0.00"),
+                    is_active=True,
+                )
+                for option_index in range(rng.randint(0, args.options)):
+                    option = Option(title=f"Opción {option_index}", max_extras=2, product=product)
+                    option.extras = [Extra(title=_name(rng, 1), price=_price(rng, 5, 40)) for _ in range(args.extras)]
+                products.append(product)
+            for category_index in range(args.categories):
+                category = Category(name=f"Categoría {category_index}", business_id=business.id)
+                category.products = rng.sample(products, k=min(len(products), max(1, len(products) // 2)))
+                db.add(category)
+            db.add_all(products)
+            businesses.append(business)
+            products_by_business[business.id] = products
+            if index % 20 == 19:
+                db.flush()
+        db.flush()
+
+        for user in users:
+            for business in rng.sample(businesses, k=min(len(businesses), args.favourites)):
+                db.add(Favourite(user_id=user.id, business_id=business.id))
+            # Un carrito abierto por usuario
+            business = rng.choice(businesses)
+            cart_products = rng.sample(products_by_business[business.id], k=min(3, args.products))
+            cart = Cart(user_id=user.id, business_id=business.id, subtotal=0, discount_total=0,
+                        taxes=0, delivery_fee=Decimal("50.00"), total=0)
+            cart.cart_items = [CartItem(product_id=product.id, quantity=rng.randint(1, 3)) for product in cart_products]
+            db.add(cart)
+            # Historial de pedidos
+            for _ in range(args.orders):
+                business = rng.choice(businesses)
+                order_products = rng.sample(products_by_business[business.id], k=min(2, args.products))
+                created_at = datetime.utcnow() - timedelta(days=rng.randint(0, 60), minutes=rng.randint(0, 1440))
+                order = Order(
+                    user_id=user.id, business_id=business.id, created_at=created_at,
+                    status=OrderStatus.PAID, payment_status=PaymentStatus.DELIVERED,
+                    subtotal=0, discount=Decimal("0.00"), taxes=0, delivery_fee=Decimal("50.00"), total=0,
+                    completed_at=created_at + timedelta(minutes=40),
+                    delivery_address_type="Casa", delivery_street_address="Colonia Centro",
+                    delivery_municipality=municipality.name,
+                )
+                order.order_items = [
+                    OrderItem(product_id=product.id, product_name=product.name, product_price=product.price,
+                              quantity=quantity, total_price=product.price * quantity)
+                    for product in order_products
+                    for quantity in (rng.randint(1, 3),)
+                ]
+                order.calculate_totals(Decimal("0.15"), Decimal("50.00"))
+                db.add(order)
+            db.flush()
+
+        db.commit()
+        return {
+            "seed": args.seed,
+            "password": BENCH_PASSWORD,
+            "users": [user.email for user in users],
+            "type_business_ids": [type_business.id for type_business in types],
+            "businesses": [
+                {
+                    "id": str(business.id),
+                    "search_terms": sorted({product.name.split()[0].lower() for product in products_by_business[business.id]})[:5],
+                }
+                for business in businesses
+            ],
+        }
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Siembra datos sintéticos para pruebas de carga")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--types", type=int, default=6)
+    parser.add_argument("--businesses", type=int, default=100)
+    parser.add_argument("--categories", type=int, default=5)
+    parser.add_argument("--products", type=int, default=30)
+    parser.add_argument("--options", type=int, default=2, help="Máximo de opciones por producto")
+    parser.add_argument("--extras", type=int, default=3)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--favourites", type=int, default=3)
+    parser.add_argument("--orders", type=int, default=5, help="Pedidos por usuario")
+    parser.add_argument("--manifest", default="benchmarks/manifest.json")
+    args = parser.parse_args(argv)
+
+    manifest = seed(args)
+    with open(args.manifest, "w") as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Datos sembrados. Manifiesto: {args.manifest}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import gzip
+import threading
+from collections import OrderedDict
+from starlette.datastructures import Headers, MutableHeaders
+
+try:  # brotli es opcional: sin él solo se ofrece gzip
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+DEFAULT_CONTENT_TYPES = (
+    "application/json",
+    "text/html",
+    "text/plain",
+    "text/css",
+    "application/javascript",
+)
+
+
+class CompressedBodyCache:
+    """
+    Cache LRU de cuerpos ya comprimidos, indexada por (ruta, codificación, ETag).
+    Como el ETag cambia con la versión del recurso, una entrada nunca queda obsoleta:
+    simplemente deja de usarse y sale por LRU.
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple, bytes] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> bytes | None:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def put(self, key: tuple, body: bytes) -> None:
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = body
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+
+def _accepted_encodings(accept_encoding: str) -> dict[str, float]:
+    encodings = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            encodings[name.strip().lower()] = quality
+    return encodings
+
+
+class CompressionMiddleware:
+    """
+    Comprime respuestas con brotli o gzip según Accept-Encoding.
+
+    Solo comprime respuestas completas (no streaming) cuyo Content-Type esté en la lista
+    permitida y cuyo cuerpo supere minimum_size. Si la respuesta trae ETag, el cuerpo
+    comprimido se guarda en la cache para no volver a comprimir los menús más pedidos.
+    """
+
+    def __init__(
+        self,
+        app,
+        minimum_size: int = 1024,
+        content_types: tuple = DEFAULT_CONTENT_TYPES,
+        gzip_level: int = 6,
+        brotli_quality: int = 5,
+        cache: CompressedBodyCache | None = None,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.content_types = tuple(content_types)
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.cache = cache
+
+    def _choose_encoding(self, scope) -> str | None:
+        encodings = _accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        if brotli is not None and encodings.get("br", 0) > 0:
+            return "br"
+        if encodings.get("gzip", 0) > 0:
+            return "gzip"
+        return None
+
+    def _compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    def _is_compressible(self, status: int, headers: MutableHeaders, body: bytes) -> bool:
+        if status < 200 or status in (204, 304) or "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+        return content_type in self.content_types and len(body) >= self.minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = self._choose_encoding(scope)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            headers = MutableHeaders(scope=start_message)
+            headers.add_vary_header("Accept-Encoding")
+
+            # Respuestas en streaming (p. ej. SSE) se envían sin tocar
+            if message.get("more_body", False) or not self._is_compressible(start_message["status"], headers, body):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            etag = headers.get("etag")
+            cache_key = (scope["path"], encoding, etag) if etag and self.cache is not None else None
+            compressed = self.cache.get(cache_key) if cache_key else None
+            if compressed is None:
+                compressed = self._compress(body, encoding)
+                if cache_key:
+                    self.cache.put(cache_key, compressed)
+
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
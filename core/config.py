@@ -13,6 +13,10 @@ def get_secret(secret_name: str, secrets: dict = secret) -> str:
         msg = f"The variable {secret_name} does not exist"
         raise HTTPException(status_code=500, detail=msg)
 
+def get_setting(setting_name: str, default=None, secrets: dict = secret):
+    # Ajustes opcionales: si no están en secret.json se usa el valor por defecto
+    return secrets.get(setting_name, default)
+
 SECRET_KEY = get_secret("SECRET_KEY")
 DATABASE_URL = get_secret("DATABASE_URL")
 ACCESS_TOKEN_EXPIRE_MINUTES = get_secret("ACCESS_TOKEN_EXPIRE_MINUTES")
@@ -0,0 +1,83 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import NamedTuple, Optional
+from fastapi import Request, Response
+from core.config import get_setting
+
+# Cache-Control configurable para que un CDN pueda absorber las lecturas públicas
+PUBLIC_CACHE_CONTROL = get_setting(
+    "CACHE_CONTROL_PUBLIC", "public, max-age=60, s-maxage=300, stale-while-revalidate=30"
+)
+# Las respuestas que dependen del usuario (favoritos) solo pueden guardarse en el cliente
+PRIVATE_CACHE_CONTROL = get_setting("CACHE_CONTROL_PRIVATE", "private, no-cache")
+
+
+class CacheValidators(NamedTuple):
+    etag: str
+    last_modified: Optional[datetime]
+    cache_control: str
+
+
+def build_validators(version_row, *parts, private: bool = False) -> Optional[CacheValidators]:
+    """
+    Construye ETag/Last-Modified a partir de la versión del snapshot del negocio.
+    :param version_row: Fila (version, updated_at) o None si aún no hay snapshot.
+    :param parts: Datos adicionales que distinguen la respuesta (id del recurso, usuario, etc.).
+    """
+    if version_row is None:
+        return None
+    version, updated_at = version_row
+    seed = ":".join(str(part) for part in (version, *parts))
+    etag = 'W/"' + hashlib.blake2b(seed.encode(), digest_size=12).hexdigest() + '"'
+    if updated_at is not None and updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+    return CacheValidators(etag, updated_at, PRIVATE_CACHE_CONTROL if private else PUBLIC_CACHE_CONTROL)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Comparación débil: se ignora el prefijo W/
+    wanted = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == wanted for tag in if_none_match.split(","))
+
+
+def _not_modified_since(if_modified_since: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    return last_modified.replace(microsecond=0) <= since
+
+
+def set_cache_headers(response: Response, validators: Optional[CacheValidators]) -> None:
+    if validators is None:
+        return
+    response.headers["ETag"] = validators.etag
+    response.headers["Cache-Control"] = validators.cache_control
+    if validators.last_modified is not None:
+        response.headers["Last-Modified"] = format_datetime(validators.last_modified, usegmt=True)
+
+
+def not_modified_response(request: Request, validators: Optional[CacheValidators]) -> Optional[Response]:
+    """Devuelve un 304 si el cliente ya tiene la representación actual, o None para continuar."""
+    if validators is None:
+        return None
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        matched = _etag_matches(if_none_match, validators.etag)
+    else:
+        # If-Modified-Since solo se evalúa cuando no hay If-None-Match
+        if_modified_since = request.headers.get("if-modified-since")
+        matched = bool(
+            if_modified_since and validators.last_modified
+            and _not_modified_since(if_modified_since, validators.last_modified)
+        )
+    if not matched:
+        return None
+
+    response = Response(status_code=304)
+    set_cache_headers(response, validators)
+    return response
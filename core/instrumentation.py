@@ -0,0 +1,199 @@
+import asyncio
+import cProfile
+import functools
+import os
+import random
+import time
+from contextvars import ContextVar
+from typing import Optional
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+from core.metrics import registry
+
+try:  # pyinstrument es opcional: si no está se usa cProfile
+    from pyinstrument import Profiler
+except ImportError:  # pragma: no cover
+    Profiler = None
+
+registry.describe("http_requests_total", "counter", "Peticiones HTTP atendidas")
+registry.describe("http_request_duration_seconds", "histogram", "Tiempo total de la petición")
+registry.describe("http_request_db_seconds", "histogram", "Tiempo de base de datos por petición")
+registry.describe("http_request_sql_statements_total", "counter", "Sentencias SQL ejecutadas")
+registry.describe("http_request_db_rows_total", "counter", "Filas devueltas por la base de datos")
+registry.describe("http_request_serialization_seconds_total", "counter", "Tiempo de serialización de respuestas")
+
+
+class RequestStats:
+    """Métricas acumuladas durante una petición."""
+
+    __slots__ = ("started", "db_time", "statements", "rows", "endpoint_finished", "profile", "profiler")
+
+    def __init__(self, profile: bool = False):
+        self.started = time.perf_counter()
+        self.db_time = 0.0
+        self.statements = 0
+        self.rows = 0
+        self.endpoint_finished: Optional[float] = None
+        self.profile = profile
+        self.profiler = None
+
+
+_current_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_stats() -> Optional[RequestStats]:
+    return _current_stats.get()
+
+
+def instrument_engine(engine) -> None:
+    """Cuenta sentencias, tiempo y filas de la base de datos para la petición en curso."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_start_time"].pop()
+        stats = _current_stats.get()
+        if stats is None:
+            return
+        stats.db_time += time.perf_counter() - started
+        stats.statements += 1
+        if cursor.description is not None and cursor.rowcount > 0:
+            stats.rows += cursor.rowcount
+
+
+def _profiled_call(call, stats: RequestStats, *args, **kwargs):
+    # Se perfila en el mismo hilo en el que corre el endpoint (threadpool en endpoints sync)
+    if Profiler is not None:
+        profiler = Profiler()
+        profiler.start()
+        try:
+            return call(*args, **kwargs)
+        finally:
+            profiler.stop()
+            stats.profiler = profiler
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(call, *args, **kwargs)
+    finally:
+        stats.profiler = profiler
+
+
+def _wrap_endpoint(call):
+    if asyncio.iscoroutinefunction(call):
+        @functools.wraps(call)
+        async def wrapper(*args, **kwargs):
+            stats = _current_stats.get()
+            try:
+                return await call(*args, **kwargs)
+            finally:
+                if stats is not None:
+                    stats.endpoint_finished = time.perf_counter()
+        return wrapper
+
+    @functools.wraps(call)
+    def wrapper(*args, **kwargs):
+        stats = _current_stats.get()
+        try:
+            if stats is not None and stats.profile:
+                return _profiled_call(call, stats, *args, **kwargs)
+            return call(*args, **kwargs)
+        finally:
+            if stats is not None:
+                stats.endpoint_finished = time.perf_counter()
+    return wrapper
+
+
+def instrument_routes(app) -> None:
+    """
+    Envuelve los endpoints ya registrados para marcar cuándo terminan, de modo que el
+    tiempo entre el fin del endpoint y el inicio de la respuesta cuente como serialización.
+    Debe llamarse después de incluir todos los routers.
+    """
+    for route in app.routes:
+        if isinstance(route, APIRoute) and not getattr(route.dependant.call, "__instrumented__", False):
+            route.dependant.call = _wrap_endpoint(route.dependant.call)
+            route.dependant.call.__instrumented__ = True
+
+
+class InstrumentationMiddleware:
+    """
+    Registra por ruta el tiempo total, de base de datos, número de sentencias, filas y
+    serialización; los expone como métricas de Prometheus y en la cabecera Server-Timing.
+    Opcionalmente perfila una muestra de peticiones y guarda las que superan el umbral.
+    """
+
+    def __init__(
+        self,
+        app,
+        profile_sample_rate: float = 0.0,
+        profile_threshold_ms: float = 500.0,
+        profile_dir: str = "profiles",
+    ):
+        self.app = app
+        self.profile_sample_rate = profile_sample_rate
+        self.profile_threshold_ms = profile_threshold_ms
+        self.profile_dir = profile_dir
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(profile=random.random() < self.profile_sample_rate)
+        token = _current_stats.set(stats)
+        status_code = 500
+        serialization = 0.0
+
+        async def send_wrapper(message):
+            nonlocal status_code, serialization
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                now = time.perf_counter()
+                if stats.endpoint_finished is not None:
+                    serialization = now - stats.endpoint_finished
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", ", ".join((
+                    f"total;dur={(now - stats.started) * 1000:.1f}",
+                    f"db;dur={stats.db_time * 1000:.1f}",
+                    f'sql;desc="{stats.statements}"',
+                    f'rows;desc="{stats.rows}"',
+                    f"ser;dur={serialization * 1000:.1f}",
+                )))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_stats.reset(token)
+            self._record(scope, stats, status_code, serialization)
+
+    def _record(self, scope, stats: RequestStats, status_code: int, serialization: float) -> None:
+        elapsed = time.perf_counter() - stats.started
+        route = scope.get("route")
+        # Se usa la plantilla de la ruta para no crear una serie por cada id
+        path = getattr(route, "path", None) or "unmatched"
+        method = scope.get("method", "")
+
+        registry.inc("http_requests_total", method=method, route=path, status=status_code)
+        registry.observe("http_request_duration_seconds", elapsed, method=method, route=path)
+        registry.observe("http_request_db_seconds", stats.db_time, method=method, route=path)
+        registry.inc("http_request_sql_statements_total", stats.statements, method=method, route=path)
+        registry.inc("http_request_db_rows_total", stats.rows, method=method, route=path)
+        registry.inc("http_request_serialization_seconds_total", serialization, method=method, route=path)
+
+        if stats.profiler is not None and elapsed * 1000 >= self.profile_threshold_ms:
+            self._dump_profile(stats.profiler, method, path, elapsed)
+
+    def _dump_profile(self, profiler, method: str, path: str, elapsed: float) -> None:
+        os.makedirs(self.profile_dir, exist_ok=True)
+        slug = path.strip("/").replace("/", "_").replace("{", "").replace("}", "") or "root"
+        base = os.path.join(self.profile_dir, f"{int(time.time() * 1000)}_{method}_{slug}_{elapsed * 1000:.0f}ms")
+        if isinstance(profiler, cProfile.Profile):
+            profiler.dump_stats(base + ".prof")
+        else:
+            with open(base + ".html", "w") as f:
+                f.write(profiler.output_html())
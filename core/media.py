@@ -0,0 +1,309 @@
+"""
+Almacenamiento de imágenes subidas por los negocios (logos, fotos de negocio y productos).
+
+El cuerpo multipart se procesa en streaming: cada fragmento que llega se escribe en un
+archivo temporal mientras se calcula su sha256, sin guardar el archivo completo en memoria.
+Al terminar se mueve a una ruta direccionada por contenido
+(MEDIA_ROOT/originals/ab/cd/<sha256>.<ext>); si ya existía, se descarta la copia y se
+reutiliza la anterior.
+
+Las miniaturas WebP de cada tamaño (MEDIA_THUMBNAIL_SIZES) se generan en un pool de
+procesos fuera de la petición, en MEDIA_ROOT/thumbs/<tamaño>/ab/cd/<sha256>.webp. Sin
+Pillow instalado no se generan y las URLs de cada tamaño apuntan al original.
+"""
+import hashlib
+import logging
+import multiprocessing
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional
+from starlette.concurrency import run_in_threadpool
+from starlette.staticfiles import StaticFiles
+from core.config import get_setting
+from core.metrics import registry
+
+try:  # Pillow es opcional: sin él no se generan miniaturas
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+try:
+    import python_multipart as multipart
+    from python_multipart.multipart import parse_options_header
+except ImportError:  # versiones anteriores de python-multipart
+    import multipart
+    from multipart.multipart import parse_options_header
+
+logger = logging.getLogger(__name__)
+
+registry.describe("media_uploads_total", "counter", "Imágenes subidas (deduplicated=true si ya existían)")
+registry.describe("media_upload_bytes_total", "counter", "Bytes de imágenes recibidos")
+registry.describe("media_thumbnail_errors_total", "counter", "Errores al generar miniaturas")
+registry.describe(
+    "media_thumbnail_seconds", "histogram", "Duración de la generación de las miniaturas de una imagen",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+
+MEDIA_ROOT = Path(get_setting("MEDIA_ROOT", "media"))
+MEDIA_PATH = "/media"
+# Subdirectorios que se publican en MEDIA_PATH; los archivos a medio escribir van en
+# MEDIA_ROOT/tmp (mismo sistema de archivos, para que os.replace sea atómico) y no se sirven
+PUBLIC_DIRS = ("originals", "thumbs")
+TEMP_DIR = MEDIA_ROOT / "tmp"
+MAX_UPLOAD_BYTES = get_setting("MEDIA_MAX_UPLOAD_BYTES", 10 * 1024 * 1024)
+# Lado mayor en píxeles de cada tamaño de miniatura
+THUMBNAIL_SIZES: dict[str, int] = get_setting("MEDIA_THUMBNAIL_SIZES", {"sm": 160, "md": 480, "lg": 1080})
+THUMBNAIL_QUALITY = get_setting("MEDIA_THUMBNAIL_QUALITY", 80)
+THUMBNAIL_WORKERS = get_setting("MEDIA_THUMBNAIL_WORKERS", 2)
+
+# Firmas de los formatos aceptados (primeros bytes del archivo)
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "jpg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+)
+_ORIGINAL_URL = re.compile(
+    r"^(?P<base>.*)/originals/(?P<a>[0-9a-f]{2})/(?P<b>[0-9a-f]{2})/(?P<digest>[0-9a-f]{64})\.[a-z]+$"
+)
+
+
+class MediaError(Exception):
+    """Subida inválida; `status_code` es el código HTTP que debe responderse."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def _sniff(head: bytes) -> Optional[str]:
+    for signature, extension in _SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+def _shard(digest: str) -> Path:
+    return Path(digest[:2], digest[2:4])
+
+
+def original_path(digest: str, extension: str) -> Path:
+    return MEDIA_ROOT / "originals" / _shard(digest) / f"{digest}.{extension}"
+
+
+def thumbnail_path(digest: str, size: str) -> Path:
+    return MEDIA_ROOT / "thumbs" / size / _shard(digest) / f"{digest}.webp"
+
+
+def original_url(base_url: str, digest: str, extension: str) -> str:
+    """URL pública del original; `base_url` es la URL donde se sirve MEDIA_ROOT."""
+    return f"{base_url.rstrip('/')}/originals/{digest[:2]}/{digest[2:4]}/{digest}.{extension}"
+
+
+def variant_urls(url: Optional[str]) -> Optional[dict[str, str]]:
+    """
+    URLs de cada tamaño de una imagen guardada aquí ({"sm": ..., "md": ..., "lg": ...}).
+    None para URLs externas (imágenes anteriores a la subida propia).
+    """
+    match = _ORIGINAL_URL.match(url or "")
+    if match is None:
+        return None
+    if Image is None:
+        return {size: url for size in THUMBNAIL_SIZES}
+    base, a, b, digest = match.group("base", "a", "b", "digest")
+    return {size: f"{base}/thumbs/{size}/{a}/{b}/{digest}.webp" for size in THUMBNAIL_SIZES}
+
+
+def make_thumbnails(source: str, digest: str, sizes: dict[str, int], quality: int) -> list[str]:
+    """Genera las miniaturas WebP que falten. Se ejecuta en un proceso del pool."""
+    created = []
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+        for size, max_side in sorted(sizes.items(), key=lambda item: -item[1]):
+            target = thumbnail_path(digest, size)
+            if target.exists():
+                continue
+            target.parent.mkdir(parents=True, exist_ok=True)
+            thumbnail = image.copy()
+            # Nunca se amplía: una imagen pequeña conserva su tamaño
+            thumbnail.thumbnail((max_side, max_side), Image.LANCZOS)
+            # Se escribe a un temporal y se renombra: un lector nunca ve un archivo a medias
+            TEMP_DIR.mkdir(parents=True, exist_ok=True)
+            fd, partial = tempfile.mkstemp(dir=TEMP_DIR, suffix=".partial")
+            with os.fdopen(fd, "wb") as output:
+                thumbnail.save(output, "WEBP", quality=quality, method=4)
+            os.replace(partial, target)
+            created.append(size)
+    return created
+
+
+class _UploadWriter:
+    """Recibe las callbacks del parser multipart y acumula los datos del primer archivo."""
+
+    def __init__(self):
+        self.pending: list[bytes] = []
+        self.finished = False
+        self._header_field = b""
+        self._header_value = b""
+        self._is_file = False
+        self._in_file = False
+
+    def on_part_begin(self) -> None:
+        self._is_file = False
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def on_header_end(self) -> None:
+        if self._header_field.lower() == b"content-disposition":
+            _, options = parse_options_header(self._header_value)
+            self._is_file = b"filename" in options
+        self._header_field = self._header_value = b""
+
+    def on_headers_finished(self) -> None:
+        self._in_file = self._is_file and not self.finished
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_file:
+            self.pending.append(data[start:end])
+
+    def on_part_end(self) -> None:
+        if self._in_file:
+            self.finished = True
+            self._in_file = False
+
+
+class MediaStore:
+    def __init__(self, max_bytes: int = MAX_UPLOAD_BYTES, workers: int = THUMBNAIL_WORKERS):
+        self.max_bytes = max_bytes
+        self.workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _thumbnail_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn y no fork: el proceso ya tiene hilos (tareas periódicas, hub de eventos) y un
+            # hijo creado con fork puede heredar bloqueos tomados (logging, métricas) y colgarse
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def save_upload(self, request) -> dict:
+        """
+        Guarda la primera imagen de un cuerpo multipart/form-data.
+        :return: {"digest", "extension", "size", "deduplicated", "thumbnails_ready"}
+        :raises MediaError: Cuerpo inválido (400), demasiado grande (413) o formato no admitido (415).
+        """
+        content_type, options = parse_options_header(request.headers.get("content-type", ""))
+        boundary = options.get(b"boundary")
+        if content_type != b"multipart/form-data" or not boundary:
+            raise MediaError(400, "Se esperaba un cuerpo multipart/form-data")
+        declared = request.headers.get("content-length")
+        if declared and declared.isdigit() and int(declared) > self.max_bytes + 64 * 1024:
+            raise MediaError(413, "La imagen supera el tamaño máximo permitido")
+
+        writer = _UploadWriter()
+        parser = multipart.MultipartParser(boundary, {
+            name: getattr(writer, name)
+            for name in ("on_part_begin", "on_header_field", "on_header_value", "on_header_end",
+                         "on_headers_finished", "on_part_data", "on_part_end")
+        })
+        TEMP_DIR.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=TEMP_DIR, suffix=".upload")
+        output = os.fdopen(fd, "wb")
+        sha256 = hashlib.sha256()
+        size = 0
+        head = b""
+        try:
+            async for chunk in request.stream():
+                parser.write(chunk)
+                if not writer.pending:
+                    continue
+                data, writer.pending = writer.pending, []
+                for piece in data:
+                    size += len(piece)
+                    if len(head) < 16:
+                        head += piece[:16 - len(head)]
+                    sha256.update(piece)
+                if size > self.max_bytes:
+                    raise MediaError(413, "La imagen supera el tamaño máximo permitido")
+                # La escritura a disco no debe bloquear el event loop
+                await run_in_threadpool(output.writelines, data)
+            parser.finalize()
+            output.close()
+            if not writer.finished or size == 0:
+                raise MediaError(400, "No se recibió ningún archivo")
+            extension = _sniff(head)
+            if extension is None:
+                raise MediaError(415, "Formato de imagen no admitido (JPEG, PNG, GIF o WebP)")
+
+            digest = sha256.hexdigest()
+            target = original_path(digest, extension)
+            deduplicated = target.exists()
+            if deduplicated:
+                os.unlink(temp_path)
+            else:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(temp_path, target)
+        except BaseException:
+            output.close()
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+        registry.inc("media_uploads_total", deduplicated=str(deduplicated).lower())
+        registry.inc("media_upload_bytes_total", size)
+        return {
+            "digest": digest,
+            "extension": extension,
+            "size": size,
+            "deduplicated": deduplicated,
+            "thumbnails_ready": self.schedule_thumbnails(target, digest),
+        }
+
+    def schedule_thumbnails(self, source: Path, digest: str) -> bool:
+        """Encola las miniaturas que falten. :return: Si ya estaban todas."""
+        if Image is None:
+            return True
+        if all(thumbnail_path(digest, size).exists() for size in THUMBNAIL_SIZES):
+            return True
+        started = time.perf_counter()
+        future = self._thumbnail_pool().submit(make_thumbnails, str(source), digest, THUMBNAIL_SIZES, THUMBNAIL_QUALITY)
+
+        def done(future):
+            if future.exception() is not None:
+                registry.inc("media_thumbnail_errors_total")
+                logger.error("No se pudieron generar las miniaturas de %s", digest, exc_info=future.exception())
+            else:
+                registry.observe("media_thumbnail_seconds", time.perf_counter() - started)
+
+        future.add_done_callback(done)
+        return False
+
+
+class MediaFiles(StaticFiles):
+    """Archivos de un directorio de PUBLIC_DIRS. Su ruta depende del contenido, así que nunca cambian."""
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
+
+# Almacén de la aplicación (MEDIA_ROOT, MEDIA_MAX_UPLOAD_BYTES, MEDIA_THUMBNAIL_WORKERS)
+media_store = MediaStore()
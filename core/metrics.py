@@ -0,0 +1,84 @@
+import threading
+
+# Límites (en segundos) de los histogramas de latencia
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels) + "}"
+
+
+class MetricsRegistry:
+    """Registro en memoria de contadores, gauges e histogramas en formato de texto de Prometheus."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._descriptions: dict[str, tuple[str, str]] = {}
+        self._values: dict[str, dict[tuple, float]] = {}
+        self._histograms: dict[str, dict[tuple, list]] = {}
+        self._buckets: dict[str, tuple] = {}
+
+    def describe(self, name: str, kind: str, help_text: str, buckets: tuple = DEFAULT_BUCKETS) -> None:
+        with self._lock:
+            self._descriptions[name] = (kind, help_text)
+            if kind == "histogram":
+                self._histograms.setdefault(name, {})
+                self._buckets[name] = buckets
+            else:
+                self._values.setdefault(name, {})
+
+    def inc(self, name: str, value: float = 1.0, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._values.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def set(self, name: str, value: float, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values.setdefault(name, {})[key] = value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            buckets = self._buckets.setdefault(name, DEFAULT_BUCKETS)
+            series = self._histograms.setdefault(name, {})
+            # [conteos por bucket..., suma, total]
+            data = series.setdefault(key, [0] * len(buckets) + [0.0, 0])
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    data[index] += 1
+            data[-2] += value
+            data[-1] += 1
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name in sorted(set(self._values) | set(self._histograms)):
+                kind, help_text = self._descriptions.get(name, ("untyped", ""))
+                if help_text:
+                    lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                if name in self._histograms:
+                    buckets = self._buckets[name]
+                    for labels, data in self._histograms[name].items():
+                        for bound, count in zip(buckets, data):
+                            bucket_labels = labels + (("le", bound),)
+                            lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {count}")
+                        lines.append(f'{name}_bucket{_format_labels(labels + (("le", "+Inf"),))} {data[-1]}')
+                        lines.append(f"{name}_sum{_format_labels(labels)} {data[-2]}")
+                        lines.append(f"{name}_count{_format_labels(labels)} {data[-1]}")
+                else:
+                    for labels, value in self._values[name].items():
+                        lines.append(f"{name}{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+# Registro compartido por toda la aplicación y los jobs
+registry = MetricsRegistry()
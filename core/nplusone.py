@@ -0,0 +1,137 @@
+import logging
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from core.config import get_setting
+
+logger = logging.getLogger(__name__)
+
+# Colapsa listas de parámetros (IN expandidos) y espacios para comparar la estructura de la sentencia
+_PARAM_LIST = re.compile(r"\(\s*(?:%\([^)]*\)s|\?|:\w+|\$\d+)(?:\s*,\s*(?:%\([^)]*\)s|\?|:\w+|\$\d+))*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_statement(statement: str) -> str:
+    return _WHITESPACE.sub(" ", _PARAM_LIST.sub("(?)", statement)).strip()
+
+
+class NPlusOneError(Exception):
+    """Se lanza en modo "raise" cuando una petición repite la misma sentencia demasiadas veces."""
+
+
+class QueryBudgetExceeded(AssertionError):
+    """La petición ejecutó más sentencias de las permitidas por su presupuesto."""
+
+
+class _RequestQueries:
+    __slots__ = ("scope", "counts", "relationships", "reported", "pending_relationship")
+
+    def __init__(self, scope: Optional[dict]):
+        self.scope = scope
+        self.counts: dict[str, int] = {}
+        self.relationships: dict[str, str] = {}
+        self.reported: set[str] = set()
+        self.pending_relationship: Optional[str] = None
+
+
+_current_queries: ContextVar[Optional[_RequestQueries]] = ContextVar("nplusone_queries", default=None)
+
+
+class NPlusOneDetector:
+    """
+    Detecta sentencias estructuralmente idénticas repetidas dentro de una misma petición,
+    típicamente cargas perezosas de relaciones dentro de un bucle.
+
+    mode: "off" (no hace nada), "log" (staging: registra una advertencia) o
+    "raise" (tests: lanza NPlusOneError indicando la ruta y la relación).
+    """
+
+    def __init__(self, mode: str = "off", threshold: int = 3):
+        self.mode = mode
+        self.threshold = threshold
+
+    def install(self, engine, session_factory) -> None:
+        @event.listens_for(session_factory, "do_orm_execute")
+        def remember_relationship(orm_execute_state):
+            queries = _current_queries.get()
+            if queries is None or not orm_execute_state.is_relationship_load:
+                return
+            path = getattr(orm_execute_state.loader_strategy_path, "path", ())
+            if path:
+                queries.pending_relationship = str(path[-1])
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def count_statement(conn, cursor, statement, parameters, context, executemany):
+            queries = _current_queries.get()
+            if queries is None or self.mode == "off":
+                return
+            key = normalize_statement(statement)
+            queries.counts[key] = queries.counts.get(key, 0) + 1
+            if queries.pending_relationship:
+                queries.relationships.setdefault(key, queries.pending_relationship)
+                queries.pending_relationship = None
+            if queries.counts[key] >= self.threshold and key not in queries.reported:
+                queries.reported.add(key)
+                self._report(queries, key)
+
+    def _report(self, queries: _RequestQueries, key: str) -> None:
+        scope = queries.scope or {}
+        route = getattr(scope.get("route"), "path", None) or scope.get("path", "?")
+        relationship = queries.relationships.get(key, "desconocida")
+        message = (
+            f"Posible N+1 en {scope.get('method', '')} {route}: la relación {relationship} "
+            f"ejecutó {queries.counts[key]} veces la sentencia: {key[:300]}"
+        )
+        if self.mode == "raise":
+            raise NPlusOneError(message)
+        logger.warning(message)
+
+
+# Detector de la aplicación: "raise" en tests, "log" en staging, "off" en producción
+detector = NPlusOneDetector(get_setting("NPLUSONE_MODE", "off"), get_setting("NPLUSONE_THRESHOLD", 3))
+
+
+class NPlusOneMiddleware:
+    """Abre el registro de sentencias por petición que usa el detector."""
+
+    def __init__(self, app, detector: NPlusOneDetector = detector):
+        self.app = app
+        self.detector = detector
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.detector.mode == "off":
+            await self.app(scope, receive, send)
+            return
+        token = _current_queries.set(_RequestQueries(scope))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current_queries.reset(token)
+
+
+@contextmanager
+def assert_max_queries(limit: int, engine=None):
+    """
+    Falla si el bloque ejecuta más de `limit` sentencias SQL.
+
+        with assert_max_queries(4):
+            client.get(f"/carts/carts/{user_id}")
+    """
+    if engine is None:
+        from database.session import engine
+    statements: list[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(normalize_statement(statement))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    if len(statements) > limit:
+        listing = "\n".join(f"  {index + 1}. {statement[:200]}" for index, statement in enumerate(statements))
+        raise QueryBudgetExceeded(f"Se ejecutaron {len(statements)} sentencias (máximo {limit}):\n{listing}")
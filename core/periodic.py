@@ -0,0 +1,45 @@
+import logging
+import threading
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """
+    Ejecuta `func` cada `interval` segundos en un hilo demonio. Los errores se registran y
+    no detienen el ciclo. Se inicia y detiene desde el ciclo de vida de la aplicación.
+    """
+
+    def __init__(self, name: str, interval: float, func: Callable[[], object]):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, final_run: bool = True, timeout: Optional[float] = None) -> None:
+        """Detiene el hilo; con final_run=True ejecuta una última vez (p. ej. para no perder escrituras)."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if final_run:
+            self.run_once()
+
+    def run_once(self) -> None:
+        try:
+            self.func()
+        except Exception:
+            logger.exception("Falló la tarea periódica %s", self.name)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.run_once()
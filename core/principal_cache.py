@@ -0,0 +1,117 @@
+"""
+Caché de los datos de autorización de cada usuario (activo, roles, proveedores y municipio).
+
+Las comprobaciones de core/security.py leen de aquí en lugar de consultar auth.users en
+cada petición. Las entradas caducan a los PRINCIPAL_CACHE_TTL_SECONDS y se invalidan al
+modificar, borrar, cambiar la contraseña o vincular un proveedor al usuario; la
+invalidación se publica en el hub de eventos para que la apliquen todos los workers.
+"""
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+from uuid import UUID
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from core.config import get_setting
+from core.metrics import registry
+from core.pubsub import hub
+from database.models.users_model import User
+
+registry.describe("principal_cache_hits_total", "counter", "Usuarios autenticados resueltos desde la caché")
+registry.describe("principal_cache_misses_total", "counter", "Usuarios autenticados leídos de la base de datos")
+registry.describe("principal_cache_invalidations_total", "counter", "Entradas de la caché de usuarios invalidadas")
+
+TOPIC = "principals"
+
+
+def _values(items) -> tuple[str, ...]:
+    return tuple(getattr(item, "value", item) for item in items or ())
+
+
+@dataclass(frozen=True)
+class Principal:
+    user_id: UUID
+    is_active: bool
+    roles: tuple[str, ...]
+    providers: tuple[str, ...]
+    municipality_id: Optional[int]
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(user.id, bool(user.is_active), _values(user.roles), _values(user.providers), user.municipality_id)
+
+    def has_role(self, *roles) -> bool:
+        return any(getattr(role, "value", role) in self.roles for role in roles)
+
+
+class PrincipalCache:
+    def __init__(self, ttl: float = 30.0, max_entries: int = 50000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[UUID, tuple[Principal, float]] = OrderedDict()
+        # Aumenta con cada invalidación: una lectura que empezó antes no se guarda
+        self._generation = 0
+
+    def get(self, db: Session, user_id: UUID) -> Optional[Principal]:
+        """Datos de autorización del usuario; None si no existe."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(user_id)
+                registry.inc("principal_cache_hits_total")
+                return entry[0]
+            generation = self._generation
+
+        registry.inc("principal_cache_misses_total")
+        row = db.execute(
+            select(User.id, User.is_active, User.roles, User.providers, User.municipality_id).where(User.id == user_id)
+        ).one_or_none()
+        if row is None:
+            return None
+        principal = Principal(row.id, bool(row.is_active), _values(row.roles), _values(row.providers), row.municipality_id)
+        with self._lock:
+            if generation == self._generation:
+                self._store(principal, now)
+        return principal
+
+    def put(self, user: User) -> Principal:
+        """Guarda los datos de un usuario recién leído (p. ej. al iniciar sesión)."""
+        principal = Principal.from_user(user)
+        with self._lock:
+            self._store(principal, time.monotonic())
+        return principal
+
+    def _store(self, principal: Principal, now: float) -> None:
+        self._entries[principal.user_id] = (principal, now + self.ttl)
+        self._entries.move_to_end(principal.user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id) -> None:
+        """Descarta el usuario en este y en los demás workers. Llamar después del commit."""
+        self._drop(user_id)
+        hub.publish([TOPIC], "principal.invalidated", {"user_id": str(user_id)})
+
+    def _drop(self, user_id) -> None:
+        user_id = UUID(str(user_id))
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(user_id, None)
+        registry.inc("principal_cache_invalidations_total")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+
+# Caché de la aplicación (PRINCIPAL_CACHE_TTL_SECONDS, 0 la desactiva)
+principal_cache = PrincipalCache(
+    ttl=get_setting("PRINCIPAL_CACHE_TTL_SECONDS", 30.0),
+    max_entries=get_setting("PRINCIPAL_CACHE_MAX_ENTRIES", 50000),
+)
+hub.add_listener(TOPIC, lambda event: principal_cache._drop(event.data["user_id"]))
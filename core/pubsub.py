@@ -0,0 +1,328 @@
+"""
+Hub de eventos para notificaciones en tiempo real (SSE y WebSocket).
+
+Los eventos se publican en uno o varios temas ("order:<id>", "business:<id>", "driver:<id>").
+El backend los reparte a todos los workers: en memoria (un solo worker), PostgreSQL
+LISTEN/NOTIFY o Redis pub/sub. Cada worker guarda los últimos eventos de cada tema para que
+un cliente que se reconecta con Last-Event-ID reciba lo que se perdió.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Iterable, Optional
+from sqlalchemy import text
+from core.config import get_setting
+from core.metrics import registry
+
+try:  # redis es opcional: solo se necesita con PUBSUB_BACKEND=redis
+    import redis
+except ImportError:  # pragma: no cover
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+registry.describe("pubsub_events_published_total", "counter", "Eventos publicados en el hub")
+registry.describe("pubsub_subscribers", "gauge", "Suscripciones abiertas (SSE y WebSocket)")
+registry.describe("pubsub_subscribers_dropped_total", "counter", "Suscripciones cerradas por no consumir a tiempo")
+
+CHANNEL = "app_events"
+
+
+class Event:
+    __slots__ = ("id", "topics", "type", "data")
+
+    def __init__(self, id: int, topics: list[str], type: str, data: dict):
+        self.id = id
+        self.topics = topics
+        self.type = type
+        self.data = data
+
+    def to_json(self) -> str:
+        return json.dumps({"id": self.id, "topics": self.topics, "type": self.type, "data": self.data}, default=str)
+
+    @classmethod
+    def from_json(cls, payload: str) -> "Event":
+        raw = json.loads(payload)
+        return cls(raw["id"], raw["topics"], raw["type"], raw["data"])
+
+    def to_sse(self) -> str:
+        return f"id: {self.id}\nevent: {self.type}\ndata: {json.dumps(self.data, default=str)}\n\n"
+
+
+class Subscription:
+    """Cola de eventos de un cliente. Vive en el event loop de la aplicación."""
+
+    __slots__ = ("topics", "queue", "overflowed")
+
+    def __init__(self, topics: list[str], queue_size: int):
+        self.topics = topics
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def _deliver(self, event: Event) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # El cliente no consume a tiempo: se cierra y se reconecta con Last-Event-ID
+            self.overflowed = True
+
+    async def get(self, timeout: float) -> Optional[Event]:
+        """Siguiente evento, o None si no llegó ninguno en `timeout` segundos."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class MemoryBackend:
+    """Reparte los eventos dentro del proceso. Solo es válido con un único worker."""
+
+    def __init__(self):
+        self._receive = None
+
+    def start(self, receive) -> None:
+        self._receive = receive
+
+    def publish(self, event: Event) -> None:
+        # Sin iniciar (p. ej. en jobs de consola) no hay suscriptores: el evento se descarta
+        if self._receive is not None:
+            self._receive(event)
+
+    def stop(self) -> None:
+        pass
+
+
+class PostgresBackend:
+    """
+    Reparte los eventos con NOTIFY/LISTEN sobre el canal `channel`. Cada worker mantiene una
+    conexión dedicada escuchando en un hilo. El payload de NOTIFY está limitado a 8000 bytes:
+    los eventos llevan solo identificadores y estados.
+    """
+
+    def __init__(self, engine, channel: str = CHANNEL):
+        self.engine = engine
+        self.channel = channel
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, receive) -> None:
+        self._receive = receive
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._listen, name="pubsub-listen", daemon=True)
+        self._thread.start()
+
+    def publish(self, event: Event) -> None:
+        with self.engine.connect() as conn:
+            conn.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": self.channel, "payload": event.to_json()})
+            conn.commit()
+
+    def _listen(self) -> None:
+        import psycopg
+
+        conninfo = self.engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        while not self._stop.is_set():
+            try:
+                with psycopg.connect(conninfo, autocommit=True) as conn:
+                    conn.execute(f"LISTEN {self.channel}")
+                    while not self._stop.is_set():
+                        for notify in conn.notifies(timeout=1.0):
+                            self._receive(Event.from_json(notify.payload))
+            except Exception:
+                # Los eventos emitidos mientras no hay conexión se pierden; los clientes recargan
+                logger.exception("Se perdió la conexión LISTEN; reintentando")
+                self._stop.wait(2.0)
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+
+class RedisBackend:
+    """Reparte los eventos con Redis pub/sub. El cliente debe crearse con decode_responses=True."""
+
+    def __init__(self, client, channel: str = CHANNEL):
+        self.client = client
+        self.channel = channel
+        self._thread = None
+
+    def start(self, receive) -> None:
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{self.channel: lambda message: receive(Event.from_json(message["data"]))})
+        self._thread = pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+    def publish(self, event: Event) -> None:
+        self.client.publish(self.channel, event.to_json())
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._thread.stop()
+
+
+class EventHub:
+    def __init__(self, backend, buffer_size: int = 100, max_topics: int = 10000, queue_size: int = 100):
+        self.backend = backend
+        self.buffer_size = buffer_size
+        self.max_topics = max_topics
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        # Últimos eventos por tema (LRU de temas para acotar la memoria)
+        self._buffers: OrderedDict[str, deque] = OrderedDict()
+        self._subscribers: dict[str, set[Subscription]] = {}
+        # Funciones que reciben los eventos de un tema en el hilo del backend (p. ej. invalidar cachés)
+        self._listeners: dict[str, list] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._last_id = 0
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self.backend.start(self._receive)
+
+    async def stop(self) -> None:
+        self.backend.stop()
+
+    def _next_id(self) -> int:
+        # Microsegundos desde epoch: crecientes entre reinicios y, con relojes sincronizados, entre workers
+        with self._lock:
+            self._last_id = max(self._last_id + 1, time.time_ns() // 1000)
+            return self._last_id
+
+    def publish(self, topics: Iterable[str], type: str, data: dict) -> Event:
+        """Publica un evento; puede llamarse desde cualquier hilo (p. ej. endpoints síncronos)."""
+        event = Event(self._next_id(), list(topics), type, data)
+        self.backend.publish(event)
+        registry.inc("pubsub_events_published_total", type=type)
+        return event
+
+    def _receive(self, event: Event) -> None:
+        # Lo llama el backend en cada worker, desde cualquier hilo
+        with self._lock:
+            subscribers, listeners = set(), []
+            for topic in event.topics:
+                buffer = self._buffers.get(topic)
+                if buffer is None:
+                    buffer = self._buffers[topic] = deque(maxlen=self.buffer_size)
+                    if len(self._buffers) > self.max_topics:
+                        self._buffers.popitem(last=False)
+                else:
+                    self._buffers.move_to_end(topic)
+                buffer.append(event)
+                subscribers.update(self._subscribers.get(topic, ()))
+                listeners.extend(self._listeners.get(topic, ()))
+        for listener in listeners:
+            try:
+                listener(event)
+            except Exception:
+                logger.exception("Error en el receptor de eventos de %s", event.topics)
+        if self._loop is None:
+            return
+        for subscription in subscribers:
+            self._loop.call_soon_threadsafe(subscription._deliver, event)
+
+    def add_listener(self, topic: str, listener) -> None:
+        """Llama a `listener(event)` con cada evento del tema publicado por cualquier worker."""
+        with self._lock:
+            self._listeners.setdefault(topic, []).append(listener)
+
+    def subscribe(self, topics: list[str], last_event_id: Optional[int] = None) -> tuple[Subscription, list[Event]]:
+        """
+        Abre una suscripción y devuelve los eventos guardados posteriores a `last_event_id`.
+        Debe llamarse desde el event loop.
+        """
+        subscription = Subscription(topics, self.queue_size)
+        with self._lock:
+            for topic in topics:
+                self._subscribers.setdefault(topic, set()).add(subscription)
+            missed = {}
+            if last_event_id is not None:
+                for topic in topics:
+                    for event in self._buffers.get(topic, ()):
+                        if event.id > last_event_id:
+                            missed[event.id] = event
+        registry.inc("pubsub_subscribers", 1)
+        return subscription, [missed[event_id] for event_id in sorted(missed)]
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            for topic in subscription.topics:
+                subscribers = self._subscribers.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[topic]
+        registry.inc("pubsub_subscribers", -1)
+        if subscription.overflowed:
+            registry.inc("pubsub_subscribers_dropped_total")
+
+
+HEARTBEAT_SECONDS = get_setting("PUBSUB_HEARTBEAT_SECONDS", 15.0)
+
+
+async def sse_stream(request, topics: list[str], last_event_id: Optional[int] = None):
+    """Generador de Server-Sent Events con latidos periódicos (comentarios ": ping")."""
+    subscription, missed = hub.subscribe(topics, last_event_id)
+    try:
+        # Los clientes EventSource reintentan tras 3 s por defecto
+        yield "retry: 3000\n\n"
+        for event in missed:
+            yield event.to_sse()
+        while not subscription.overflowed:
+            event = await subscription.get(HEARTBEAT_SECONDS)
+            if await request.is_disconnected():
+                break
+            yield event.to_sse() if event is not None else ": ping\n\n"
+    finally:
+        hub.unsubscribe(subscription)
+
+
+async def websocket_stream(websocket, topics: list[str], last_event_id: Optional[int] = None) -> None:
+    """
+    Envía los eventos como JSON ({"id", "type", "data"}) y {"type": "ping"} como latido.
+    Termina cuando el cliente cierra la conexión.
+    """
+    from starlette.websockets import WebSocketDisconnect
+
+    await websocket.accept()
+    subscription, missed = hub.subscribe(topics, last_event_id)
+    # El cliente no envía datos; se escucha solo para detectar el cierre
+    closed = asyncio.ensure_future(websocket.receive())
+    try:
+        for event in missed:
+            await websocket.send_json({"id": event.id, "type": event.type, "data": event.data})
+        while not subscription.overflowed:
+            getter = asyncio.ensure_future(subscription.get(HEARTBEAT_SECONDS))
+            done, _ = await asyncio.wait({getter, closed}, return_when=asyncio.FIRST_COMPLETED)
+            if closed in done:
+                getter.cancel()
+                return
+            event = getter.result()
+            if event is None:
+                await websocket.send_json({"type": "ping"})
+            else:
+                await websocket.send_json({"id": event.id, "type": event.type, "data": event.data})
+        # Se cerró por no consumir a tiempo: el cliente debe reconectarse con last_event_id
+        await websocket.close(code=4000)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        closed.cancel()
+        hub.unsubscribe(subscription)
+
+
+def _build_backend():
+    kind = get_setting("PUBSUB_BACKEND", "memory")
+    if kind == "postgres":
+        from database.session import engine
+        return PostgresBackend(engine)
+    if kind == "redis":
+        if redis is None:
+            raise RuntimeError("PUBSUB_BACKEND=redis requiere el paquete redis")
+        return RedisBackend(redis.Redis.from_url(get_setting("PUBSUB_URL"), decode_responses=True))
+    return MemoryBackend()
+
+
+# Hub de la aplicación (PUBSUB_BACKEND: memory, postgres o redis)
+hub = EventHub(_build_backend(), buffer_size=get_setting("PUBSUB_BUFFER_SIZE", 100))
@@ -0,0 +1,241 @@
+"""
+Limitación de peticiones por cubetas de fichas (token bucket).
+
+Cada regla se aplica a un método y una ruta y cuenta por IP o por usuario (el "sub" del
+access token; sin token válido se cuenta por IP). Una cubeta admite ráfagas de hasta
+`burst` peticiones y se rellena a `rate` fichas por segundo. Cuando está vacía se
+responde 429 con Retry-After antes de llegar a la ruta, sin tocar la base de datos,
+bcrypt ni el correo.
+
+Las cubetas se guardan en memoria (un solo worker) o en Redis (RATE_LIMIT_URL) para que
+los límites se compartan entre workers. Con Redis cada petición es un único script Lua
+atómico que usa el reloj del servidor; si Redis falla, se deja pasar la petición.
+
+Las reglas se configuran con RATE_LIMIT_RULES en secret.json, p. ej.:
+
+    "RATE_LIMIT_RULES": [
+        {"method": "POST", "path": "/auth/signIn", "key": "ip", "rate": 0.2, "burst": 5}
+    ]
+"""
+import json
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+import jwt
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from core.auth import ALGORITHM, SECRET_KEY
+from core.config import get_setting
+from core.metrics import registry
+
+try:  # redis es opcional: solo se necesita con RATE_LIMIT_URL
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+registry.describe("rate_limit_rejected_total", "counter", "Peticiones rechazadas con 429 por regla")
+registry.describe("rate_limit_backend_errors_total", "counter", "Errores del almacén de cubetas (la petición se deja pasar)")
+
+
+@dataclass(frozen=True)
+class Rule:
+    method: str
+    path: str
+    key: str = "ip"  # "ip" o "user"
+    rate: float = 1.0  # fichas por segundo
+    burst: int = 10
+
+    @property
+    def name(self) -> str:
+        return f"{self.method} {self.path} {self.key}"
+
+
+# Inicio de sesión y recuperación de contraseña: pocas peticiones por minuto por IP (bcrypt y SMTP).
+# La búsqueda de productos se limita por usuario y, con más holgura, por IP.
+DEFAULT_RULES = (
+    Rule("POST", "/auth/signIn", "ip", rate=10 / 60, burst=10),
+    Rule("POST", "/auth/oauth2-signIn", "ip", rate=10 / 60, burst=10),
+    Rule("POST", "/auth/request-password-reset", "ip", rate=3 / 300, burst=3),
+    Rule("GET", "/products/search", "user", rate=2.0, burst=20),
+    Rule("GET", "/products/search", "ip", rate=10.0, burst=100),
+)
+
+
+class MemoryBackend:
+    """Cubetas en memoria del worker. Se descartan las menos usadas por encima de `max_keys`."""
+
+    blocking = False
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        # clave -> (fichas, momento de la última actualización)
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    def take(self, key: str, rate: float, burst: int) -> float:
+        """Consume una ficha. :return: 0 si se admite o los segundos hasta la siguiente ficha."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                # Una cubeta olvidada equivale a una llena: solo se pierde su historial
+                self._buckets.popitem(last=False)
+            return wait
+
+    def reset(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+# KEYS[1]: cubeta; ARGV: rate, burst. Devuelve los milisegundos de espera (0 si se admite).
+_TAKE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or burst
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = math.ceil((1 - tokens) / rate * 1000)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000))
+return wait
+"""
+
+
+class RedisBackend:
+    """Cubetas compartidas en Redis (o un servidor compatible). La clave caduca al llenarse."""
+
+    blocking = True
+
+    def __init__(self, client, prefix: str = "ratelimit:"):
+        self.client = client
+        self.prefix = prefix
+        self._take = client.register_script(_TAKE_SCRIPT)
+
+    def take(self, key: str, rate: float, burst: int) -> float:
+        return int(self._take(keys=[self.prefix + key], args=[rate, burst])) / 1000
+
+    def reset(self) -> None:
+        for key in self.client.scan_iter(match=self.prefix + "*"):
+            self.client.delete(key)
+
+
+def _user_id(headers: Headers) -> Optional[str]:
+    # Solo se verifica la firma del token; la ruta hace la autenticación completa
+    authorization = headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+    except jwt.PyJWTError:
+        return None
+
+
+class RateLimiter:
+    def __init__(self, backend, rules=DEFAULT_RULES, trusted_proxies: int = 0):
+        self.backend = backend
+        self.trusted_proxies = trusted_proxies
+        self._rules: dict[tuple[str, str], list[Rule]] = {}
+        for rule in rules:
+            self._rules.setdefault((rule.method, rule.path.rstrip("/") or "/"), []).append(rule)
+
+    def rules_for(self, method: str, path: str) -> list[Rule]:
+        return self._rules.get((method, path.rstrip("/") or "/"), [])
+
+    def client_ip(self, scope, headers: Headers) -> str:
+        # Detrás de N proxies de confianza la IP real es la N-ésima desde el final de X-Forwarded-For
+        if self.trusted_proxies:
+            forwarded = [ip.strip() for ip in headers.get("x-forwarded-for", "").split(",") if ip.strip()]
+            if len(forwarded) >= self.trusted_proxies:
+                return forwarded[-self.trusted_proxies]
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    async def check(self, scope, rules: list[Rule]) -> float:
+        """:return: 0 si la petición se admite o los segundos que debe esperar el cliente."""
+        headers = Headers(scope=scope)
+        wait = 0.0
+        for rule in rules:
+            subject = _user_id(headers) if rule.key == "user" else None
+            key = f"{rule.name}:" + (f"user:{subject}" if subject else f"ip:{self.client_ip(scope, headers)}")
+            try:
+                if self.backend.blocking:
+                    rule_wait = await run_in_threadpool(self.backend.take, key, rule.rate, rule.burst)
+                else:
+                    rule_wait = self.backend.take(key, rule.rate, rule.burst)
+            except Exception:
+                logger.exception("No se pudo consultar el límite de %s", rule.name)
+                registry.inc("rate_limit_backend_errors_total")
+                continue
+            if rule_wait > 0:
+                registry.inc("rate_limit_rejected_total", rule=rule.name)
+                wait = max(wait, rule_wait)
+        return wait
+
+
+def _build_limiter() -> RateLimiter:
+    configured = get_setting("RATE_LIMIT_RULES")
+    rules = tuple(Rule(**rule) for rule in configured) if configured is not None else DEFAULT_RULES
+    url = get_setting("RATE_LIMIT_URL")
+    if not url:
+        backend = MemoryBackend(get_setting("RATE_LIMIT_MAX_KEYS", 100000))
+    elif redis is None:
+        raise RuntimeError("RATE_LIMIT_URL requiere el paquete redis")
+    else:
+        backend = RedisBackend(redis.Redis.from_url(url))
+    return RateLimiter(backend, rules, trusted_proxies=get_setting("RATE_LIMIT_TRUSTED_PROXIES", 0))
+
+
+# Limitador de la aplicación: Redis si RATE_LIMIT_URL está configurado, si no en memoria
+limiter = _build_limiter()
+
+
+class RateLimitMiddleware:
+    """Responde 429 con Retry-After a las peticiones que superan alguna regla de su ruta."""
+
+    def __init__(self, app, limiter: RateLimiter = limiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        rules = self.limiter.rules_for(scope["method"], scope["path"])
+        wait = await self.limiter.check(scope, rules) if rules else 0
+        if not wait:
+            await self.app(scope, receive, send)
+            return
+
+        body = json.dumps({"detail": "Demasiadas solicitudes; reintente más tarde."}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(wait))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
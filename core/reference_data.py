@@ -0,0 +1,178 @@
+"""
+Datos de referencia casi estáticos: departamentos, municipios y tipos de negocio.
+
+Se cargan una vez por worker en mapas inmutables y los serializadores los consultan en
+lugar de cargar las relaciones (business.type_business, address.municipality) fila a fila.
+Una tarea periódica compara una huella calculada en la base de datos (una sola consulta
+pequeña) y solo recarga si cambió; al crear un tipo de negocio se avisa por el hub de
+eventos para que todos los workers recarguen sin esperar.
+"""
+import hashlib
+import logging
+import threading
+import time
+from types import MappingProxyType
+from typing import Optional
+from sqlalchemy import func, literal_column, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from core.metrics import registry
+from core.pubsub import hub
+from database.models.address_model import Department, Municipality
+from database.models.business_model import TypeBusiness
+
+logger = logging.getLogger(__name__)
+
+registry.describe("reference_data_reloads_total", "counter", "Recargas de los datos de referencia")
+
+TOPIC = "reference_data"
+
+
+class _Frozen:
+    __slots__ = ()
+
+    def __init__(self, **values):
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} es inmutable")
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class DepartmentRef(_Frozen):
+    __slots__ = ("id", "name")
+
+
+class MunicipalityRef(_Frozen):
+    __slots__ = ("id", "name", "department_id")
+
+
+class TypeBusinessRef(_Frozen):
+    __slots__ = ("id", "name", "image_url")
+
+
+class ReferenceSnapshot(_Frozen):
+    """Una versión completa de los datos; se reemplaza entera al recargar."""
+
+    __slots__ = ("version", "loaded_at", "departments", "municipalities", "municipalities_by_department", "types_business")
+
+
+def _fingerprint_query():
+    # md5 de las filas de cada tabla en orden de id: cambia con cualquier alta, baja o edición
+    def table_hash(model, *columns):
+        rows = func.string_agg(func.concat_ws("|", *columns), aggregate_order_by(literal_column("'\n'"), model.id))
+        return select(func.md5(func.coalesce(rows, ""))).scalar_subquery()
+
+    return select(
+        table_hash(Department, Department.id, Department.name),
+        table_hash(Municipality, Municipality.id, Municipality.name, Municipality.department_id),
+        table_hash(TypeBusiness, TypeBusiness.id, TypeBusiness.name, TypeBusiness.image_url),
+    )
+
+
+class ReferenceData:
+    def __init__(self, session_factory=None):
+        self.session_factory = session_factory
+        self._lock = threading.Lock()
+        self._snapshot: Optional[ReferenceSnapshot] = None
+        self._checked_at = 0.0
+
+    def install(self, session_factory) -> None:
+        """Carga los datos y recarga cuando otro worker avisa de un cambio."""
+        self.session_factory = session_factory
+        self.refresh()
+        hub.add_listener(TOPIC, lambda event: self.refresh())
+
+    @property
+    def snapshot(self) -> ReferenceSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            # Uso fuera de la aplicación (jobs, consola): se carga al primer acceso
+            self.refresh()
+            snapshot = self._snapshot
+        return snapshot
+
+    def _session(self):
+        if self.session_factory is None:
+            from database.session import SessionLocal
+            self.session_factory = SessionLocal
+        return self.session_factory()
+
+    def refresh(self) -> bool:
+        """Recarga si la huella de las tablas cambió. :return: Si se recargó."""
+        with self._lock:
+            db = self._session()
+            try:
+                version = hashlib.blake2b(
+                    ":".join(db.execute(_fingerprint_query()).one()).encode(), digest_size=8
+                ).hexdigest()
+                self._checked_at = time.monotonic()
+                if self._snapshot is not None and self._snapshot.version == version:
+                    return False
+                departments = db.execute(select(Department.id, Department.name).order_by(Department.id)).all()
+                municipalities = db.execute(
+                    select(Municipality.id, Municipality.name, Municipality.department_id).order_by(Municipality.id)
+                ).all()
+                types_business = db.execute(
+                    select(TypeBusiness.id, TypeBusiness.name, TypeBusiness.image_url).order_by(TypeBusiness.id)
+                ).all()
+            finally:
+                db.close()
+
+            by_department: dict[int, list] = {}
+            municipality_map = {}
+            for row in municipalities:
+                municipality = MunicipalityRef(id=row.id, name=row.name, department_id=row.department_id)
+                municipality_map[row.id] = municipality
+                by_department.setdefault(row.department_id, []).append(municipality)
+            self._snapshot = ReferenceSnapshot(
+                version=version,
+                loaded_at=time.time(),
+                departments=MappingProxyType({row.id: DepartmentRef(id=row.id, name=row.name) for row in departments}),
+                municipalities=MappingProxyType(municipality_map),
+                municipalities_by_department=MappingProxyType(
+                    {department_id: tuple(items) for department_id, items in by_department.items()}
+                ),
+                types_business=MappingProxyType({
+                    row.id: TypeBusinessRef(id=row.id, name=row.name, image_url=row.image_url) for row in types_business
+                }),
+            )
+        registry.inc("reference_data_reloads_total")
+        logger.info("Datos de referencia cargados (versión %s)", version)
+        return True
+
+    def notify_changed(self) -> None:
+        """Recarga en este worker y avisa a los demás. Llamar después del commit."""
+        self.refresh()
+        hub.publish([TOPIC], "reference_data.changed", {"version": self.snapshot.version})
+
+    def _lookup(self, mapping: str, key: Optional[int]):
+        if key is None:
+            return None
+        value = getattr(self.snapshot, mapping).get(key)
+        # Las columnas que apuntan aquí tienen clave foránea: si falta, los datos están
+        # desactualizados (p. ej. un tipo creado en otro worker); se recarga a lo sumo una vez por segundo
+        if value is None and time.monotonic() - self._checked_at > 1.0:
+            self.refresh()
+            value = getattr(self.snapshot, mapping).get(key)
+        return value
+
+    # Accesos usados por los serializadores
+    def department(self, department_id: Optional[int]) -> Optional[DepartmentRef]:
+        return self._lookup("departments", department_id)
+
+    def municipality(self, municipality_id: Optional[int]) -> Optional[MunicipalityRef]:
+        return self._lookup("municipalities", municipality_id)
+
+    def type_business(self, type_business_id: Optional[int]) -> Optional[TypeBusinessRef]:
+        return self._lookup("types_business", type_business_id)
+
+    def municipalities_of(self, department_id: int) -> tuple:
+        return self.snapshot.municipalities_by_department.get(department_id, ())
+
+
+# Registro de la aplicación; main.py lo carga al iniciar (REFERENCE_DATA_REFRESH_SECONDS)
+reference_data = ReferenceData()
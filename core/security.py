@@ -1,7 +1,13 @@
-from fastapi import Security, HTTPException, status, Depends
+from fastapi import Security, HTTPException, WebSocketException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.orm import Session
+from uuid import UUID
 from core.auth import decode_access_token
+from core.principal_cache import Principal, principal_cache
 from schemas.auth_schemas import TokenData  # Importamos TokenData desde el nuevo archivo
+from database.session import SessionLocal, get_db
+from database.models.business_model import Business
+from database.models.users_model import RoleEnum
 
 # Definición del esquema de OAuth2
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/oauth2-signIn")
@@ -10,32 +16,72 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/oauth2-signIn")
 def get_current_user(token: str = Depends(oauth2_scheme)) -> TokenData:
     return decode_access_token(token)
 
-# Verificar que el usuario esté activo
-def get_current_active_user(current_user: TokenData = Depends(get_current_user)) -> TokenData:
-    if not current_user.local_id:  # Verifica que el usuario tenga un ID válido
+def _resolve_principal(current_user: TokenData, db: Session) -> Principal:
+    try:
+        user_id = UUID(current_user.local_id)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token inválido")
+    principal = principal_cache.get(db, user_id)
+    if principal is None or not principal.is_active:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Usuario inactivo o inválido")
-    return current_user
+    return principal
 
-# Verificar que el usuario tenga un rol específico
-def get_current_user_with_role(required_roles: str):
-    def role_verification(current_user: TokenData = Depends(get_current_active_user)) -> TokenData:
-        if current_user.roles != required_roles:
+# Verificar que el usuario exista y esté activo. Los roles se toman de la caché de usuarios
+# (no del token) para que un cambio de roles o una desactivación se apliquen sin esperar a
+# que caduque el token; solo se consulta la base de datos si el usuario no está en caché.
+def get_current_principal(current_user: TokenData = Depends(get_current_user), db: Session = Depends(get_db)) -> Principal:
+    return _resolve_principal(current_user, db)
+
+# Igual, con una sesión propia que se cierra enseguida: para endpoints largos (subidas en
+# streaming) en los que get_db retendría una conexión del pool durante toda la petición
+def get_current_principal_detached(current_user: TokenData = Depends(get_current_user)) -> Principal:
+    with SessionLocal() as db:
+        return _resolve_principal(current_user, db)
+
+# Para WebSockets: el token va en la URL (el navegador no permite cabeceras) y la sesión es
+# propia y breve, porque las dependencias siguen abiertas mientras dure la conexión
+def get_websocket_principal(token: str) -> Principal:
+    try:
+        with SessionLocal() as db:
+            return _resolve_principal(decode_access_token(token), db)
+    except HTTPException as e:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason=e.detail)
+
+def get_current_active_user(principal: Principal = Depends(get_current_principal)) -> TokenData:
+    return TokenData(local_id=str(principal.user_id), roles=list(principal.roles))
+
+# Verificar que el usuario tenga alguno de los roles indicados
+def get_current_user_with_role(*required_roles: RoleEnum, principal_dependency=get_current_principal):
+    def role_verification(principal: Principal = Depends(principal_dependency)) -> TokenData:
+        if not principal.has_role(*required_roles):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN, 
-                detail=f"El usuario no tiene privilegios de {required_roles}"
+                detail=f"El usuario no tiene privilegios de {', '.join(role.value for role in required_roles)}"
             )
-        return current_user
+        return TokenData(local_id=str(principal.user_id), roles=list(principal.roles))
     return role_verification
 
 # Funciones para verificar roles específicos
-def get_current_admin_user(current_user: TokenData = Depends(get_current_user_with_role("business_admin"))) -> TokenData:
-    return current_user
-
-def get_current_driver_user(current_user: TokenData = Depends(get_current_user_with_role("driver"))) -> TokenData:
-    return current_user
+get_current_admin_user = get_current_user_with_role(RoleEnum.BUSINESS_ADMIN)
+get_current_driver_user = get_current_user_with_role(RoleEnum.DRIVER)
+get_current_customer_user = get_current_user_with_role(RoleEnum.USER)
+# Sin conexión retenida durante la petición (ver get_current_principal_detached)
+get_current_admin_user_detached = get_current_user_with_role(
+    RoleEnum.BUSINESS_ADMIN, principal_dependency=get_current_principal_detached
+)
 
-def get_current_customer_user(current_user: TokenData = Depends(get_current_user_with_role("customer"))) -> TokenData:
-    return current_user
+# Verificar que el usuario sea el administrador del negocio
+def check_business_admin(db: Session, business_id: UUID, current_user: TokenData) -> Business:
+    business = db.get(Business, business_id)
+    if not business:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Business not found")
+    if str(business.admin_id) != current_user.local_id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No tiene acceso a este negocio")
+    return business
 
-def get_current_superadmin_user(current_user: TokenData = Depends(get_current_user_with_role("super_admin"))) -> TokenData:
-    return current_user
+def get_owned_business(
+    business_id: UUID,
+    db: Session = Depends(get_db),
+    current_user: TokenData = Depends(get_current_active_user),
+) -> Business:
+    return check_business_admin(db, business_id, current_user)
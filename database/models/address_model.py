@@ -1,6 +1,6 @@
 from enum import Enum  # Importa Enum del módulo estándar de Python
-from sqlalchemy import Column, String, ForeignKey, Integer, Boolean, Float
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, ForeignKey, Integer, Boolean, Float, text
+from sqlalchemy.dialects.postgresql import UUID, ExcludeConstraint
 from sqlalchemy.orm import relationship
 from database.session import Base
 from sqlalchemy import Enum as SQLAlchemyEnum  # Importa el Enum de SQLAlchemy
@@ -50,4 +50,12 @@ class Address(Base):
 
     # Relación con municipios
     municipality_id = Column(Integer, ForeignKey('municipalities.id', ondelete="CASCADE"))
-    municipality = relationship("Municipality", back_populates="addresses")
\ No newline at end of file
+    municipality = relationship("Municipality", back_populates="addresses")
+
+    # Como mucho una dirección principal por entidad; diferible para poder cambiarla con un solo UPDATE
+    __table_args__ = (
+        ExcludeConstraint(
+            (entity_type, "="), (entity_id, "="),
+            name="ex_addresses_one_main", using="btree", where=text("is_main_address"), deferrable=True,
+        ),
+    )
\ No newline at end of file
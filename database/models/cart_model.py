@@ -1,6 +1,6 @@
 from sqlalchemy.sql import func
 from decimal import Decimal
-from sqlalchemy import Column, DateTime, Integer, ForeignKey, Numeric
+from sqlalchemy import Column, DateTime, Integer, ForeignKey, Numeric, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID
 from database.session import Base
@@ -12,10 +12,12 @@ class Cart(Base):
     user_id = Column(UUID(as_uuid=True), ForeignKey("auth.users.id", ondelete="CASCADE"), nullable=False, index=True)
     business_id = Column(UUID(as_uuid=True), ForeignKey("businesses.id", ondelete="CASCADE"), nullable=False, index=True)  # Relación con el negocio
     created_at = Column(DateTime, server_default=func.now())
-    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    # Indexado: el reaper de carritos abandonados borra por antigüedad
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), index=True)
     # Totales financieros
     subtotal = Column(Numeric(precision=10, scale=2), nullable=False)
-    discount = Column(Numeric(precision=10, scale=2), nullable=False)
+    # La columna se llama "discount" en la tabla; el resto del código usa discount_total
+    discount_total = Column("discount", Numeric(precision=10, scale=2), nullable=False)
     taxes = Column(Numeric(precision=10, scale=2), nullable=False)
     delivery_fee = Column(Numeric(precision=10, scale=2), nullable=False)
     total = Column(Numeric(precision=10, scale=2), nullable=False)
@@ -29,10 +31,19 @@ class CartItem(Base):
     __tablename__ = "cart_items"
     id = Column(Integer, primary_key=True)
     cart_id = Column(Integer, ForeignKey("carts.id", ondelete="CASCADE"), nullable=False)
-    product_id = Column(UUID(as_uuid=True), ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
+    # Indexado: la propagación de cambios de precio busca los carritos por producto
+    product_id = Column(UUID(as_uuid=True), ForeignKey("products.id", ondelete="CASCADE"), nullable=False, index=True)
     quantity = Column(Integer, nullable=False, default=1)
+    # Precio y descuento del producto con los que se calcularon los totales del carrito
+    unit_price = Column(Numeric(precision=10, scale=2), nullable=True)
+    unit_discount = Column(Numeric(precision=10, scale=2), nullable=True)
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
     cart = relationship("Cart", back_populates="cart_items")
     product = relationship("Product")
+
+    __table_args__ = (
+        # Un producto aparece una sola vez por carrito (lo requiere el upsert del write-behind)
+        Index("uq_cart_items_cart_product", "cart_id", "product_id", unique=True),
+    )
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, DateTime, Float, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+from database.session import Base
+
+# Última posición reportada por cada repartidor (una fila por repartidor). Se escribe por
+# lotes desde el buffer de ingesta con INSERT ... ON CONFLICT, nunca punto a punto.
+# La migración deja fillfactor = 70 para que las actualizaciones sean HOT.
+class DriverLocation(Base):
+    __tablename__ = "driver_locations"
+
+    driver_id = Column(UUID(as_uuid=True), ForeignKey("drivers.id", ondelete="CASCADE"), primary_key=True)
+    latitude = Column(Float, nullable=False)
+    longitude = Column(Float, nullable=False)
+    heading = Column(Float, nullable=True)  # Rumbo en grados
+    speed = Column(Float, nullable=True)  # Velocidad en m/s
+    accuracy = Column(Float, nullable=True)  # Precisión en metros
+    recorded_at = Column(DateTime, nullable=False)  # Hora del dispositivo (UTC)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
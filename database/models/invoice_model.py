@@ -1,5 +1,5 @@
 from datetime import datetime, timezone
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, Numeric, Enum, Text
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Numeric, Enum, Text, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID
 from database.session import Base
@@ -16,5 +16,15 @@ class BusinessInvoice(Base):
     commission_amount = Column(Numeric(precision=10, scale=2), nullable=False)
     service_fee = Column(Numeric(precision=10, scale=2), nullable=True, default=0.00)  # Tarifa adicional si aplica
     notes = Column(Text, nullable=True)
+    # Periodo facturado [period_start, period_end) y número de pedidos entregados en él
+    period_start = Column(DateTime, nullable=True)
+    period_end = Column(DateTime, nullable=True)
+    order_count = Column(Integer, nullable=False, default=0)
 
-    business = relationship("Business", back_populates="invoices")
\ No newline at end of file
+    business = relationship("Business", back_populates="invoices")
+
+    __table_args__ = (
+        # Una factura por negocio y periodo: el job de facturación puede repetirse sin duplicar
+        UniqueConstraint("business_id", "period_start", "period_end", name="uq_business_invoices_business_period"),
+        Index("ix_business_invoices_period_start", "period_start"),
+    )
\ No newline at end of file
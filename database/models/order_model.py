@@ -1,5 +1,5 @@
 from decimal import Decimal
-from sqlalchemy import Column, String, DateTime, Integer, ForeignKey, Numeric, Enum, func
+from sqlalchemy import Column, String, DateTime, Integer, ForeignKey, Numeric, Enum, Index, func, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
@@ -51,6 +51,14 @@ class Order(Base):
     # Relación con los productos del pedido
     order_items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan")
 
+    # Índices de los listados por usuario, negocio y repartidor (más recientes primero)
+    __table_args__ = (
+        Index("ix_orders_user_id_created_at", "user_id", text("created_at DESC")),
+        Index("ix_orders_business_id_created_at", "business_id", text("created_at DESC")),
+        Index("ix_orders_business_id_status_created_at", "business_id", "status", text("created_at DESC")),
+        Index("ix_orders_driver_id_status", "driver_id", "status"),
+    )
+
     def calculate_totals(self, tax_rate: Decimal, delivery_fee: Decimal):
         """ Calcula los totales del pedido, incluyendo descuentos. """
         # Calcular el subtotal de los productos
@@ -68,7 +76,8 @@ class OrderItem(Base):
     __tablename__ = "order_items"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    order_id = Column(UUID(as_uuid=True), ForeignKey("orders.id", ondelete="CASCADE"), nullable=False)
+    # Indexado: los listados cargan y cuentan los items por pedido
+    order_id = Column(UUID(as_uuid=True), ForeignKey("orders.id", ondelete="CASCADE"), nullable=False, index=True)
     product_id = Column(UUID(as_uuid=True), ForeignKey("products.id", ondelete="SET NULL"), nullable=True)
     product_name = Column(String, nullable=False)
     product_price = Column(Numeric(precision=10, scale=2), nullable=False)
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, String, Boolean, ForeignKey
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Boolean, ForeignKey, text
+from sqlalchemy.dialects.postgresql import UUID, ExcludeConstraint
 from sqlalchemy.orm import relationship
 import uuid
 from database.session import Base
@@ -17,3 +17,11 @@ class PaymentMethod(Base):
     card_provider = Column(String, nullable=True)  # Ejemplo: 'Visa', 'MasterCard', 'Banco XYZ'
 
     user = relationship("User", back_populates="payment_methods")
+
+    # Como mucho un método de pago principal por usuario; diferible para poder cambiarlo con un solo UPDATE
+    __table_args__ = (
+        ExcludeConstraint(
+            (user_id, "="),
+            name="ex_payment_methods_one_main", using="btree", where=text("is_main_payment_method"), deferrable=True,
+        ),
+    )
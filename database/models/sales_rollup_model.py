@@ -0,0 +1,40 @@
+from sqlalchemy import Column, Date, DateTime, Integer, ForeignKey, Numeric, String
+from sqlalchemy.dialects.postgresql import UUID
+from database.session import Base
+
+# Agregados de ventas por negocio para los tableros. Se mantienen de forma incremental
+# cuando un pedido llega a un estado final (Entregado/Cancelado) y se recalculan cada
+# noche con jobs/sales_rollups.py. Los periodos se agrupan por la fecha de creación del
+# pedido. Los endpoints del tablero leen solo estas tablas.
+
+# Ventas por negocio y hora
+class BusinessSalesHourly(Base):
+    __tablename__ = "business_sales_hourly"
+
+    business_id = Column(UUID(as_uuid=True), ForeignKey("businesses.id", ondelete="CASCADE"), primary_key=True)
+    hour = Column(DateTime, primary_key=True)  # Inicio de la hora
+    delivered_orders = Column(Integer, nullable=False, default=0)
+    canceled_orders = Column(Integer, nullable=False, default=0)
+    revenue = Column(Numeric(precision=12, scale=2), nullable=False, default=0)  # Total de los pedidos entregados
+    items_sold = Column(Integer, nullable=False, default=0)
+
+# Ventas por negocio y día
+class BusinessSalesDaily(Base):
+    __tablename__ = "business_sales_daily"
+
+    business_id = Column(UUID(as_uuid=True), ForeignKey("businesses.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    delivered_orders = Column(Integer, nullable=False, default=0)
+    canceled_orders = Column(Integer, nullable=False, default=0)
+    revenue = Column(Numeric(precision=12, scale=2), nullable=False, default=0)
+    items_sold = Column(Integer, nullable=False, default=0)
+
+# Ventas por producto y día (por el nombre guardado en el pedido: sobrevive al borrado del producto)
+class BusinessProductSalesDaily(Base):
+    __tablename__ = "business_product_sales_daily"
+
+    business_id = Column(UUID(as_uuid=True), ForeignKey("businesses.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    product_name = Column(String, primary_key=True)
+    quantity = Column(Integer, nullable=False, default=0)
+    revenue = Column(Numeric(precision=12, scale=2), nullable=False, default=0)
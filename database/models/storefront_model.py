@@ -0,0 +1,15 @@
+from sqlalchemy import Column, DateTime, Integer, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.sql import func
+from database.session import Base
+
+# Snapshot desnormalizado de la tienda de un negocio (negocio, tipo, imágenes,
+# categorías, productos, opciones y extras) para servir el catálogo con una
+# sola lectura por clave primaria.
+class BusinessStorefront(Base):
+    __tablename__ = "business_storefronts"
+
+    business_id = Column(UUID(as_uuid=True), ForeignKey("businesses.id", ondelete="CASCADE"), primary_key=True)
+    version = Column(Integer, nullable=False, default=1)  # Se incrementa cada vez que cambia el payload
+    payload = Column(JSONB, nullable=False)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
@@ -1,6 +1,6 @@
 import uuid
 import enum
-from sqlalchemy import Column, String, Boolean, ForeignKey, DateTime, Integer, Enum
+from sqlalchemy import Column, String, Boolean, ForeignKey, DateTime, Integer, Enum, Index
 from sqlalchemy.dialects.postgresql import UUID, ARRAY
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -20,7 +20,6 @@ class AuthProviderEnum(enum.Enum):
 # Tabla base de usuarios que almacena credenciales comunes
 class User(Base):
     __tablename__ = 'users'
-    __table_args__ = {'schema': 'auth'}  # Esquema auth
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     email = Column(String, unique=True, nullable=False)
@@ -32,6 +31,13 @@ class User(Base):
     start_date = Column(DateTime(timezone=True), server_default=func.now())  # Fecha de creación
     providers = Column(ARRAY(Enum(AuthProviderEnum)), default=[AuthProviderEnum.EMAIL], nullable=False)
     roles = Column(ARRAY(Enum(RoleEnum)), default=[RoleEnum.USER], nullable=False)
+
+    __table_args__ = (
+        # Un correo por cuenta sin distinguir mayúsculas (las búsquedas usan lower(email))
+        Index("uq_users_email_lower", func.lower(email), unique=True),
+        {'schema': 'auth'},  # Esquema auth
+    )
+
     # Relaciones
     driver_profile = relationship("Driver", back_populates="user", uselist=False)
     business_admin_profile = relationship("BusinessAdmin", back_populates="user", uselist=False)
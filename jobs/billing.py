@@ -0,0 +1,155 @@
+"""
+Generación de facturas mensuales de los negocios.
+
+Suma los pedidos entregados de cada negocio en el periodo con una sola consulta agrupada y
+la inserta directamente en business_invoices (INSERT ... SELECT ... GROUP BY). Los negocios
+se procesan en lotes por id, cada lote en su propia transacción: si el job se interrumpe se
+puede reanudar con --after <último negocio procesado>, y repetirlo no duplica facturas
+(ON CONFLICT DO NOTHING sobre negocio y periodo).
+
+El periodo se toma por la fecha de creación del pedido, que es la que indexa
+ix_orders_business_id_created_at.
+
+Uso:
+    python -m jobs.billing [--month 2026-09] [--batch-size 500] [--after BUSINESS_ID] [--dry-run]
+"""
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Optional
+from uuid import UUID
+from sqlalchemy import cast, func, literal, select
+from sqlalchemy.dialects.postgresql import insert
+from core.config import get_setting
+from database.session import SessionLocal
+from database.models.business_model import Business
+from database.models.invoice_model import BusinessInvoice
+from database.models.order_model import Order, PaymentStatus
+
+COMMISSION_RATE = Decimal(str(get_setting("BILLING_COMMISSION_RATE", "0.10")))
+SERVICE_FEE_PER_ORDER = Decimal(str(get_setting("BILLING_SERVICE_FEE_PER_ORDER", "0.00")))
+DUE_DAYS = get_setting("BILLING_DUE_DAYS", 15)
+BATCH_SIZE = get_setting("BILLING_BATCH_SIZE", 500)
+
+
+def month_period(month: Optional[str] = None) -> tuple[datetime, datetime]:
+    """Periodo [inicio, fin) del mes "AAAA-MM"; por defecto, el mes anterior."""
+    if month:
+        start = datetime.strptime(month, "%Y-%m")
+    else:
+        start = (datetime.now().replace(day=1) - timedelta(days=1)).replace(day=1)
+    start = start.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    end = (start + timedelta(days=32)).replace(day=1)
+    return start, end
+
+
+def _invoice_rows(business_ids: list[UUID], period_start: datetime, period_end: datetime):
+    """Totales de los pedidos entregados por negocio, listos para insertar como facturas."""
+    total = func.sum(Order.total)
+    order_count = func.count(Order.id)
+    return (
+        select(
+            Order.business_id,
+            literal(period_start).label("period_start"),
+            literal(period_end).label("period_end"),
+            func.now().label("invoice_date"),
+            literal(period_end + timedelta(days=DUE_DAYS)).label("due_date"),
+            cast(literal("PENDING"), BusinessInvoice.status.type).label("status"),
+            total.label("total_amount"),
+            func.round(total * COMMISSION_RATE, 2).label("commission_amount"),
+            (order_count * SERVICE_FEE_PER_ORDER).label("service_fee"),
+            order_count.label("order_count"),
+        )
+        .where(
+            Order.business_id.in_(business_ids),
+            Order.payment_status == PaymentStatus.DELIVERED,
+            Order.created_at >= period_start,
+            Order.created_at < period_end,
+        )
+        .group_by(Order.business_id)
+    )
+
+
+def generate_invoices(
+    session_factory,
+    period_start: datetime,
+    period_end: datetime,
+    batch_size: int = BATCH_SIZE,
+    after: Optional[UUID] = None,
+    progress=None,
+) -> int:
+    """
+    Crea las facturas del periodo para todos los negocios con pedidos entregados.
+    :param after: Reanuda después de este id de negocio.
+    :param progress: Función llamada con el último id de negocio de cada lote confirmado.
+    :return: Número de facturas creadas (las que ya existían no cuentan).
+    """
+    created = 0
+    db = session_factory()
+    try:
+        while True:
+            query = select(Business.id).order_by(Business.id).limit(batch_size)
+            if after is not None:
+                query = query.where(Business.id > after)
+            business_ids = db.execute(query).scalars().all()
+            if not business_ids:
+                break
+
+            rows = _invoice_rows(business_ids, period_start, period_end)
+            stmt = insert(BusinessInvoice).from_select(
+                [column.name for column in rows.selected_columns], rows
+            ).on_conflict_do_nothing(index_elements=["business_id", "period_start", "period_end"])
+            created += db.execute(stmt).rowcount
+            db.commit()
+
+            after = business_ids[-1]
+            if progress is not None:
+                progress(after)
+            if len(business_ids) < batch_size:
+                break
+        return created
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Genera las facturas mensuales de los negocios")
+    parser.add_argument("--month", help="Mes a facturar (AAAA-MM); por defecto el anterior")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--after", type=UUID, help="Reanudar después de este id de negocio")
+    parser.add_argument("--dry-run", action="store_true", help="Solo muestra los totales del periodo")
+    args = parser.parse_args(argv)
+
+    period_start, period_end = month_period(args.month)
+    if args.dry_run:
+        db = SessionLocal()
+        try:
+            businesses, orders, total = db.execute(
+                select(func.count(func.distinct(Order.business_id)), func.count(Order.id), func.sum(Order.total)).where(
+                    Order.payment_status == PaymentStatus.DELIVERED,
+                    Order.created_at >= period_start,
+                    Order.created_at < period_end,
+                )
+            ).one()
+        finally:
+            db.close()
+        print(f"{period_start:%Y-%m}: {businesses} negocios, {orders} pedidos entregados, total {total or 0}")
+        return 0
+
+    started = time.perf_counter()
+    created = generate_invoices(
+        SessionLocal, period_start, period_end, args.batch_size, args.after,
+        # Si el job se interrumpe, el último id impreso sirve para --after
+        progress=lambda business_id: print(f"Procesado hasta el negocio {business_id}", flush=True),
+    )
+    print(f"Facturas creadas para {period_start:%Y-%m}: {created} en {time.perf_counter() - started:.1f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""
+Eliminación de carritos abandonados.
+
+Borra los carritos sin actividad desde hace más de CART_MAX_IDLE_DAYS días en lotes acotados,
+recorriendo el índice de carts.updated_at. Cada lote es una transacción corta y las filas
+bloqueadas por otra transacción se saltan (SKIP LOCKED), así que puede ejecutarse a la vez en
+varios workers. La aplicación lo programa cada CART_REAPER_INTERVAL_SECONDS; también se
+puede lanzar desde cron.
+
+Uso:
+    python -m jobs.cart_reaper [--max-idle-days 30] [--batch-size 1000] [--dry-run]
+"""
+import argparse
+import sys
+import time
+from datetime import timedelta
+from sqlalchemy import delete, func, select, tuple_
+from core.config import get_setting
+from core.metrics import registry
+from database.session import SessionLocal
+from database.models.cart_model import Cart, CartItem
+from repositories.cart_store import cart_store
+
+registry.describe("cart_reaper_carts_deleted_total", "counter", "Carritos abandonados eliminados")
+registry.describe("cart_reaper_items_deleted_total", "counter", "Items de carritos abandonados eliminados")
+registry.describe(
+    "cart_reaper_duration_seconds", "histogram", "Duración de cada ejecución del reaper",
+    buckets=(0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0),
+)
+registry.describe("cart_reaper_last_run_timestamp_seconds", "gauge", "Fin de la última ejecución del reaper")
+
+MAX_IDLE_DAYS = get_setting("CART_MAX_IDLE_DAYS", 30)
+BATCH_SIZE = get_setting("CART_REAPER_BATCH_SIZE", 1000)
+
+
+def _idle_carts(max_idle_days: float, after: tuple | None = None):
+    stmt = (
+        select(Cart.id, Cart.user_id, Cart.business_id, Cart.updated_at)
+        .where(Cart.updated_at < func.now() - timedelta(days=max_idle_days))
+        .order_by(Cart.updated_at, Cart.id)
+    )
+    if after is not None:
+        stmt = stmt.where(tuple_(Cart.updated_at, Cart.id) > after)
+    return stmt
+
+
+def reap_abandoned_carts(
+    session_factory,
+    max_idle_days: float = MAX_IDLE_DAYS,
+    batch_size: int = BATCH_SIZE,
+    pause: float = 0.05,
+) -> tuple[int, int]:
+    """
+    Elimina los carritos inactivos por lotes.
+    :param pause: Segundos de espera entre lotes para no saturar la base de datos.
+    :return: (carritos, items) eliminados.
+    """
+    started = time.perf_counter()
+    carts_deleted = items_deleted = 0
+    db = session_factory()
+    # Se avanza por (updated_at, id): los carritos que se saltan no vuelven a leerse
+    cursor = None
+    try:
+        while True:
+            batch = db.execute(
+                _idle_carts(max_idle_days, cursor).limit(batch_size).with_for_update(skip_locked=True)
+            ).all()
+            if not batch:
+                break
+            # El updated_at de la base puede ser viejo aunque el carrito esté en uso: los que
+            # están en el almacén (con cambios aún sin escribir o recién cargados) no se borran
+            in_use = cart_store.in_use([row.id for row in batch])
+            rows = [row for row in batch if row.id not in in_use]
+            cart_ids = [row.id for row in rows]
+            items = 0
+            if cart_ids:
+                items = db.execute(delete(CartItem).where(CartItem.cart_id.in_(cart_ids))).rowcount
+                db.execute(delete(Cart).where(Cart.id.in_(cart_ids)))
+                if cart_store.in_use(cart_ids):
+                    # Alguno se cargó mientras tanto: se deshace y se repite el lote sin él
+                    db.rollback()
+                    continue
+            db.commit()
+            cursor = (batch[-1].updated_at, batch[-1].id)
+
+            # Lo que quede en el almacén ya no existe en la base
+            for row in rows:
+                cart_store.evict(row.id, row.user_id, row.business_id)
+
+            carts_deleted += len(rows)
+            items_deleted += items
+            registry.inc("cart_reaper_carts_deleted_total", len(rows))
+            registry.inc("cart_reaper_items_deleted_total", items)
+            if len(batch) < batch_size:
+                break
+            time.sleep(pause)
+        return carts_deleted, items_deleted
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+        registry.observe("cart_reaper_duration_seconds", time.perf_counter() - started)
+        registry.set("cart_reaper_last_run_timestamp_seconds", time.time())
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Elimina carritos abandonados")
+    parser.add_argument("--max-idle-days", type=float, default=MAX_IDLE_DAYS)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="Solo cuenta los carritos que se eliminarían")
+    args = parser.parse_args(argv)
+
+    if args.dry_run:
+        db = SessionLocal()
+        try:
+            count = db.execute(
+                select(func.count()).select_from(_idle_carts(args.max_idle_days).order_by(None).subquery())
+            ).scalar()
+        finally:
+            db.close()
+        print(f"Carritos inactivos por más de {args.max_idle_days} días: {count}")
+        return 0
+
+    started = time.perf_counter()
+    carts, items = reap_abandoned_carts(SessionLocal, args.max_idle_days, args.batch_size)
+    print(f"Carritos eliminados: {carts} ({items} items) en {time.perf_counter() - started:.1f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
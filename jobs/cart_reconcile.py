@@ -0,0 +1,93 @@
+"""
+Verificación de los totales de carrito mantenidos de forma incremental.
+
+Cada mutación ajusta los totales por diferencia (ver utils/cart_totals.apply_quantity_delta);
+este job los compara contra un recálculo completo. Los carritos vivos se verifican en el
+almacén contra sus propias líneas y el resto en la tabla carts contra cart_items. Se puede
+ejecutar bajo demanda o desde cron.
+
+Uso:
+    python -m jobs.cart_reconcile [--cart-id ID ...] [--fix]
+"""
+import argparse
+import sys
+from decimal import Decimal, ROUND_HALF_UP
+from sqlalchemy import select
+from database.session import SessionLocal
+from database.models.cart_model import Cart
+from repositories.cart_store import cart_store, recompute_totals, recomputed_sums
+from utils.cart_totals import totals_from_sums
+
+BATCH_SIZE = 500
+CHECKED_FIELDS = ("subtotal", "discount_total", "taxes", "total")
+CENT = Decimal("0.01")
+
+
+def _iter_batches(db, cart_ids: list[int] | None):
+    if cart_ids:
+        yield cart_ids
+        return
+    last_id = 0
+    while True:
+        batch = db.execute(
+            select(Cart.id).where(Cart.id > last_id).order_by(Cart.id).limit(BATCH_SIZE)
+        ).scalars().all()
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1]
+
+
+def _mismatched_fields(stored, expected: dict) -> list[str]:
+    # La tabla guarda dos decimales: se compara redondeando igual que PostgreSQL
+    return [
+        field for field in CHECKED_FIELDS
+        if Decimal(stored[field]).quantize(CENT, ROUND_HALF_UP) != Decimal(expected[field]).quantize(CENT, ROUND_HALF_UP)
+    ]
+
+
+def reconcile(cart_ids: list[int] | None, fix: bool) -> int:
+    db = SessionLocal()
+    try:
+        checked = problems = 0
+        for batch in _iter_batches(db, cart_ids):
+            live = cart_store.peek_many(batch)
+            rows = db.execute(
+                select(Cart.id, Cart.subtotal, Cart.discount_total, Cart.taxes, Cart.delivery_fee, Cart.total)
+                .where(Cart.id.in_(batch))
+                .order_by(Cart.id)
+            ).all()
+            sums = recomputed_sums(db, [row.id for row in rows if row.id not in live])
+
+            for row in rows:
+                checked += 1
+                if row.id in live:
+                    source = "almacén"
+                    fields = _mismatched_fields(live[row.id], recompute_totals(live[row.id]))
+                else:
+                    source = "carts"
+                    subtotal, discount_total = sums.get(row.id, (Decimal("0.00"), Decimal("0.00")))
+                    expected = totals_from_sums(subtotal, discount_total, delivery_fee=row.delivery_fee)
+                    fields = _mismatched_fields(row._mapping, expected)
+                if fields:
+                    problems += 1
+                    print(f"{row.id} ({source}): {', '.join(fields)}")
+                    if fix:
+                        cart_store.reconcile(db, row.id)
+
+        print(f"Carritos verificados: {checked}. Con totales inconsistentes: {problems}")
+        return 1 if problems and not fix else 0
+    finally:
+        db.close()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Verifica los totales mantenidos de los carritos")
+    parser.add_argument("--cart-id", type=int, action="append", dest="cart_ids")
+    parser.add_argument("--fix", action="store_true", help="Reemplaza los totales inconsistentes por el recálculo")
+    args = parser.parse_args(argv)
+    return reconcile(args.cart_ids, args.fix)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""
+Reconstrucción de los agregados de ventas de los tableros.
+
+Recalcula desde orders los agregados por hora, día y producto de un rango de días. Por
+defecto reconstruye el día anterior (ejecución nocturna desde cron), lo que corrige
+cualquier desviación de la actualización incremental; con --from/--to sirve como backfill
+del histórico. Los negocios se procesan en lotes por id, cada lote en su propia transacción,
+y el job se puede reanudar con --after.
+
+Uso:
+    python -m jobs.sales_rollups [--from 2026-01-01] [--to 2026-10-01] [--batch-size 200] [--after BUSINESS_ID]
+"""
+import argparse
+import sys
+import time
+from datetime import date, timedelta
+from typing import Optional
+from uuid import UUID
+from sqlalchemy import select
+from core.config import get_setting
+from database.session import SessionLocal
+from database.models.business_model import Business
+from repositories.sales_rollups import rebuild_rollups
+
+BATCH_SIZE = get_setting("SALES_ROLLUPS_BATCH_SIZE", 200)
+
+
+def rebuild_all(
+    session_factory,
+    day_from: date,
+    day_to: date,
+    batch_size: int = BATCH_SIZE,
+    after: Optional[UUID] = None,
+    progress=None,
+) -> int:
+    """
+    Reconstruye los agregados de todos los negocios en los días [day_from, day_to).
+    :param progress: Función llamada con el último id de negocio de cada lote confirmado.
+    :return: Número de negocios procesados.
+    """
+    processed = 0
+    db = session_factory()
+    try:
+        while True:
+            query = select(Business.id).order_by(Business.id).limit(batch_size)
+            if after is not None:
+                query = query.where(Business.id > after)
+            business_ids = db.execute(query).scalars().all()
+            if not business_ids:
+                break
+            rebuild_rollups(db, business_ids, day_from, day_to)
+            db.commit()
+
+            processed += len(business_ids)
+            after = business_ids[-1]
+            if progress is not None:
+                progress(after)
+            if len(business_ids) < batch_size:
+                break
+        return processed
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def main(argv=None) -> int:
+    yesterday = date.today() - timedelta(days=1)
+    parser = argparse.ArgumentParser(description="Reconstruye los agregados de ventas de los negocios")
+    parser.add_argument("--from", dest="day_from", type=date.fromisoformat, default=yesterday, help="Primer día (inclusive)")
+    parser.add_argument("--to", dest="day_to", type=date.fromisoformat, help="Último día (exclusive); por defecto el siguiente a --from")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--after", type=UUID, help="Reanudar después de este id de negocio")
+    args = parser.parse_args(argv)
+
+    day_to = args.day_to or args.day_from + timedelta(days=1)
+    started = time.perf_counter()
+    processed = rebuild_all(
+        SessionLocal, args.day_from, day_to, args.batch_size, args.after,
+        # Si el job se interrumpe, el último id impreso sirve para --after
+        progress=lambda business_id: print(f"Procesado hasta el negocio {business_id}", flush=True),
+    )
+    print(f"Agregados de {args.day_from} a {day_to} reconstruidos para {processed} negocios "
+          f"en {time.perf_counter() - started:.1f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""
+Mantenimiento de los snapshots de tienda (business_storefronts).
+
+Uso:
+    python -m jobs.storefront rebuild [--business-id ID ...]
+    python -m jobs.storefront check [--fix]
+"""
+import argparse
+import sys
+from uuid import UUID
+from sqlalchemy import select
+from database.session import SessionLocal
+from database.models.business_model import Business
+from database.models.storefront_model import BusinessStorefront
+from repositories.storefront import rebuild_storefront, check_storefront
+
+BATCH_SIZE = 500
+
+
+def _iter_business_ids(db, business_ids: list[UUID] | None):
+    if business_ids:
+        yield from business_ids
+        return
+    # Recorre los negocios por lotes ordenados por id para no cargar toda la tabla
+    last_id = None
+    while True:
+        stmt = select(Business.id).order_by(Business.id).limit(BATCH_SIZE)
+        if last_id is not None:
+            stmt = stmt.where(Business.id > last_id)
+        batch = db.execute(stmt).scalars().all()
+        if not batch:
+            return
+        yield from batch
+        last_id = batch[-1]
+
+
+def rebuild(business_ids: list[UUID] | None) -> int:
+    db = SessionLocal()
+    try:
+        count = 0
+        for business_id in _iter_business_ids(db, business_ids):
+            rebuild_storefront(db, business_id)
+            count += 1
+        print(f"Snapshots reconstruidos: {count}")
+        return 0
+    finally:
+        db.close()
+
+
+def check(fix: bool) -> int:
+    db = SessionLocal()
+    try:
+        problems = 0
+        for business_id in _iter_business_ids(db, None):
+            result = check_storefront(db, business_id)
+            if result:
+                problems += 1
+                print(f"{business_id}: {result}")
+                if fix:
+                    rebuild_storefront(db, business_id)
+
+        # Snapshots cuyo negocio ya no existe
+        orphans = db.execute(
+            select(BusinessStorefront.business_id).where(
+                ~select(Business.id).where(Business.id == BusinessStorefront.business_id).exists()
+            )
+        ).scalars().all()
+        for business_id in orphans:
+            problems += 1
+            print(f"{business_id}: orphan")
+            if fix:
+                rebuild_storefront(db, business_id)
+
+        print(f"Snapshots inconsistentes: {problems}")
+        return 1 if problems and not fix else 0
+    finally:
+        db.close()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Snapshots de tienda por negocio")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    rebuild_parser = subparsers.add_parser("rebuild", help="Reconstruye snapshots (todos por defecto)")
+    rebuild_parser.add_argument("--business-id", type=UUID, action="append", dest="business_ids")
+
+    check_parser = subparsers.add_parser("check", help="Verifica la consistencia de los snapshots")
+    check_parser.add_argument("--fix", action="store_true", help="Reconstruye los snapshots inconsistentes")
+
+    args = parser.parse_args(argv)
+    if args.command == "rebuild":
+        return rebuild(args.business_ids)
+    return check(args.fix)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,19 @@
-from fastapi import FastAPI
+import hmac
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import FastAPI, Header, HTTPException, status
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from core.config import get_setting
+from core.compression import CompressionMiddleware, CompressedBodyCache, DEFAULT_CONTENT_TYPES
+from core.instrumentation import InstrumentationMiddleware, instrument_engine, instrument_routes
+from core.media import MEDIA_PATH, MEDIA_ROOT, PUBLIC_DIRS, MediaFiles, media_store
+from core.metrics import registry
+from core.nplusone import NPlusOneMiddleware, detector as nplusone_detector
+from core.periodic import PeriodicTask
+from core.pubsub import hub as event_hub
+from core.rate_limit import RateLimitMiddleware
+from core.reference_data import reference_data
 from api.v1.routes.auth_routes import router as auth_routes
 from api.v1.routes.user_routes import router as users_routes
 from api.v1.routes.address_routes import router as address_routes
@@ -10,7 +24,12 @@ from api.v1.routes.product_routes import router as products_router
 from api.v1.routes.cart_routes import router as cart_router
 from api.v1.routes.payment_methods_routes import router as payment_methods_router
 from api.v1.routes.order_routes import router as order_router
-from database.session import init_db
+from api.v1.routes.driver_routes import router as driver_router
+from api.v1.routes.invoice_routes import router as invoice_router
+from api.v1.routes.business_admin_routes import router as business_admin_router
+from api.v1.routes.reference_routes import router as reference_router
+from api.v1.routes.media_routes import router as media_router
+from database.session import init_db, SessionLocal, engine
 # import models
 from database.models.users_model import User, Driver, BusinessAdmin
 from database.models.address_model import Address, Department, Municipality
@@ -21,11 +40,101 @@ from database.models.cart_model import Cart, CartItem
 from database.models.payment_method_model import PaymentMethod
 from database.models.order_model import Order, OrderItem
 from database.models.invoice_model import BusinessInvoice
+from database.models.storefront_model import BusinessStorefront
+from database.models.driver_location_model import DriverLocation
+from database.models.sales_rollup_model import BusinessSalesHourly, BusinessSalesDaily, BusinessProductSalesDaily
+from repositories.storefront import register_storefront_events, storefront_rebuilds
+from repositories.cart_store import cart_store
+from jobs.cart_reaper import reap_abandoned_carts
+from repositories.dispatch import sync_available_drivers
+from repositories.location_ingest import location_buffer
 
 # Inicializa la base de datos
 init_db()
+register_storefront_events(SessionLocal)
+instrument_engine(engine)
+nplusone_detector.install(engine, SessionLocal)
+
+# Escritura diferida de los carritos modificados (CART_FLUSH_INTERVAL_SECONDS)
+cart_flusher = PeriodicTask(
+    "cart-flush",
+    get_setting("CART_FLUSH_INTERVAL_SECONDS", 5.0),
+    lambda: cart_store.flush_dirty(SessionLocal),
+)
+
+# Eliminación periódica de carritos abandonados (CART_REAPER_INTERVAL_SECONDS, 0 la desactiva)
+cart_reaper = PeriodicTask(
+    "cart-reaper",
+    get_setting("CART_REAPER_INTERVAL_SECONDS", 3600.0),
+    lambda: reap_abandoned_carts(SessionLocal),
+)
+
+# Disponibilidad de repartidores en el índice de asignación (cambios hechos por otros workers)
+dispatch_sync = PeriodicTask(
+    "dispatch-sync",
+    get_setting("DISPATCH_SYNC_INTERVAL_SECONDS", 30.0),
+    lambda: sync_available_drivers(SessionLocal),
+)
+
+# Escritura por lotes de las posiciones de los repartidores (LOCATION_FLUSH_INTERVAL_SECONDS)
+location_flusher = PeriodicTask(
+    "location-flush",
+    get_setting("LOCATION_FLUSH_INTERVAL_SECONDS", 1.0),
+    lambda: location_buffer.flush(SessionLocal),
+)
+
+# Reconstrucción de los snapshots de tienda modificados, fuera de las peticiones
+storefront_rebuilder = PeriodicTask(
+    "storefront-rebuild",
+    get_setting("STOREFRONT_REBUILD_INTERVAL_SECONDS", 1.0),
+    lambda: storefront_rebuilds.drain(SessionLocal),
+)
+
+# Revisión de cambios en departamentos, municipios y tipos de negocio (REFERENCE_DATA_REFRESH_SECONDS)
+reference_refresh = PeriodicTask(
+    "reference-data-refresh",
+    get_setting("REFERENCE_DATA_REFRESH_SECONDS", 300.0),
+    reference_data.refresh,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Hub de eventos en tiempo real (PUBSUB_BACKEND: memory, postgres o redis)
+    await event_hub.start()
+    reference_data.install(SessionLocal)
+    reference_refresh.start()
+    storefront_rebuilder.start()
+    cart_flusher.start()
+    dispatch_sync.run_once()
+    dispatch_sync.start()
+    location_flusher.start()
+    if cart_reaper.interval > 0:
+        cart_reaper.start()
+    yield
+    reference_refresh.stop(final_run=False)
+    cart_reaper.stop(final_run=False)
+    dispatch_sync.stop(final_run=False)
+    location_flusher.stop()
+    storefront_rebuilder.stop()
+    # Al apagar se escriben los carritos pendientes
+    cart_flusher.stop()
+    media_store.shutdown()
+    await event_hub.stop()
 
-app = FastAPI(title="Easy Solutions API", version="0.1.0")
+
+app = FastAPI(title="Easy Solutions API", version="0.1.0", lifespan=lifespan)
+
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=get_setting("COMPRESSION_MINIMUM_SIZE", 1024),
+    content_types=tuple(get_setting("COMPRESSION_CONTENT_TYPES", DEFAULT_CONTENT_TYPES)),
+    cache=CompressedBodyCache(max_bytes=get_setting("COMPRESSION_CACHE_MAX_BYTES", 32 * 1024 * 1024)),
+)
+
+# Límites por IP y por usuario de las rutas costosas (RATE_LIMIT_RULES, RATE_LIMIT_URL).
+# Va dentro de CORS para que el navegador pueda leer las respuestas 429.
+app.add_middleware(RateLimitMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -35,6 +144,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Detector de consultas N+1 (NPLUSONE_MODE: off, log o raise)
+app.add_middleware(NPlusOneMiddleware, detector=nplusone_detector)
+
+# Métricas por ruta y perfilado opcional (PROFILE_SAMPLE_RATE > 0 para activarlo)
+app.add_middleware(
+    InstrumentationMiddleware,
+    profile_sample_rate=get_setting("PROFILE_SAMPLE_RATE", 0.0),
+    profile_threshold_ms=get_setting("PROFILE_THRESHOLD_MS", 500.0),
+    profile_dir=get_setting("PROFILE_DIR", "profiles"),
+)
+
 # Registrar las rutas de autenticación
 app.include_router(auth_routes)
 app.include_router(users_routes)
@@ -46,7 +166,36 @@ app.include_router(favourites_router)
 app.include_router(cart_router)
 app.include_router(payment_methods_router)
 app.include_router(order_router)
+app.include_router(driver_router)
+app.include_router(invoice_router)
+app.include_router(business_admin_router)
+app.include_router(reference_router)
+app.include_router(media_router)
+
+# Imágenes subidas y sus miniaturas (MEDIA_ROOT); en producción puede servirlas el proxy o un CDN.
+# Solo se publican originals/ y thumbs/: MEDIA_ROOT/tmp guarda las subidas en curso
+for media_dir in PUBLIC_DIRS:
+    (MEDIA_ROOT / media_dir).mkdir(parents=True, exist_ok=True)
+    app.mount(f"{MEDIA_PATH}/{media_dir}", MediaFiles(directory=MEDIA_ROOT / media_dir), name=f"media-{media_dir}")
 
 @app.get("/")
 def root():
     return {"message": "Hi, I am fastapi."}
+
+# Las métricas exponen rutas, volúmenes y errores: solo se sirven a quien envía METRICS_TOKEN
+# como "Authorization: Bearer ..." (bearer_token en Prometheus). Sin el ajuste no hay endpoint.
+METRICS_TOKEN = get_setting("METRICS_TOKEN")
+
+if METRICS_TOKEN:
+    @app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+    def metrics(authorization: Optional[str] = Header(None)):
+        scheme, _, token = (authorization or "").partition(" ")
+        if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), METRICS_TOKEN.encode()):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token de métricas inválido",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+instrument_routes(app)
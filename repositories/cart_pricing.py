@@ -0,0 +1,187 @@
+"""
+Propagación de cambios de precio y descuento de un producto a los carritos que lo contienen.
+
+Los carritos afectados se encuentran por el índice de cart_items.product_id y se procesan por
+lotes: los que están vivos en el almacén se ajustan allí de forma incremental y el resto se
+actualiza con SQL por conjuntos (precio registrado de las líneas y totales agrupados).
+
+El precio registrado en cada línea (unit_price/unit_discount) permite al checkout detectar
+cambios de precio sin volver a cargar los productos.
+"""
+import logging
+from decimal import Decimal
+from uuid import UUID
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+from core.metrics import registry
+from database.models.cart_model import Cart, CartItem
+from database.models.product_model import Product
+from repositories.cart_store import cart_store, find_item, set_item_quantity
+from utils.cart_totals import TAX_RATE
+
+logger = logging.getLogger(__name__)
+
+registry.describe("cart_repriced_total", "counter", "Carritos recalculados por cambios de precio de productos")
+
+BATCH_SIZE = 500
+
+
+def _reprice_stored_carts(db: Session, product: Product, cart_ids: list[int]) -> None:
+    """Actualiza con SQL por conjuntos los carritos que no están en el almacén."""
+    if not cart_ids:
+        return
+    db.execute(
+        update(CartItem)
+        .where(CartItem.product_id == product.id, CartItem.cart_id.in_(cart_ids))
+        .values(unit_price=product.price, unit_discount=product.discount or 0, updated_at=CartItem.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+    _refresh_totals(db, cart_ids)
+    db.commit()
+
+
+def _refresh_totals(db: Session, cart_ids: list[int]) -> None:
+    """Recalcula los totales de los carritos con una sola sentencia agrupada."""
+    sums = (
+        select(
+            CartItem.cart_id,
+            func.sum(CartItem.quantity * func.coalesce(CartItem.unit_price, Product.price)).label("subtotal"),
+            func.sum(CartItem.quantity * func.coalesce(CartItem.unit_discount, Product.discount, 0)).label("discount_total"),
+        )
+        .join(Product, Product.id == CartItem.product_id)
+        .where(CartItem.cart_id.in_(cart_ids))
+        .group_by(CartItem.cart_id)
+        .subquery()
+    )
+    db.execute(
+        update(Cart)
+        .where(Cart.id == sums.c.cart_id)
+        .values(
+            subtotal=sums.c.subtotal,
+            discount_total=sums.c.discount_total,
+            taxes=(sums.c.subtotal - sums.c.discount_total) * TAX_RATE,
+            total=sums.c.subtotal - sums.c.discount_total + Cart.delivery_fee,
+            # Se conserva updated_at: el reaper de carritos inactivos depende de él
+            updated_at=Cart.updated_at,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    # Carritos que quedaron sin líneas (no aparecen en la consulta agrupada)
+    db.execute(
+        update(Cart)
+        .where(Cart.id.in_(cart_ids), ~select(CartItem.id).where(CartItem.cart_id == Cart.id).exists())
+        .values(subtotal=0, discount_total=0, taxes=0, total=Cart.delivery_fee, updated_at=Cart.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _reprice_live_cart(db: Session, product: Product, cart_id: int) -> None:
+    with cart_store.editing(db, cart_id) as state:
+        item = find_item(state, product_id=product.id) if state else None
+        if item:
+            set_item_quantity(state, item, item["quantity"], product)
+
+
+def reprice_product_carts(session_factory, product_id: UUID, batch_size: int = BATCH_SIZE) -> int:
+    """
+    Recalcula los carritos que contienen el producto con su precio y descuento actuales.
+    Se ejecuta en segundo plano después de update_product.
+    :return: Número de carritos recalculados.
+    """
+    db = session_factory()
+    try:
+        product = db.get(Product, product_id)
+        if product is None:
+            return 0
+
+        # Carritos del almacén que agregaron el producto y aún no se escribieron (la tabla no
+        # los incluye): se ajustan allí mismo, sin escribir los demás carritos pendientes
+        pending = set(cart_store.dirty_with_product(product_id))
+        for cart_id in pending:
+            _reprice_live_cart(db, product, cart_id)
+
+        repriced = len(pending)
+        last_id = 0
+        while True:
+            cart_ids = db.execute(
+                select(CartItem.cart_id)
+                .where(CartItem.product_id == product_id, CartItem.cart_id > last_id)
+                .order_by(CartItem.cart_id)
+                .limit(batch_size)
+            ).scalars().all()
+            if not cart_ids:
+                break
+            last_id = cart_ids[-1]
+
+            live = cart_store.peek_many(cart_ids)
+            for cart_id in live:
+                if cart_id not in pending:
+                    _reprice_live_cart(db, product, cart_id)
+            stored = [cart_id for cart_id in cart_ids if cart_id not in live]
+            _reprice_stored_carts(db, product, stored)
+            # Un carrito pudo cargarse en el almacén entre la lectura anterior y el commit, con el
+            # precio viejo: su próxima escritura pisaría el nuevo. Se ajusta también en el almacén.
+            for cart_id in cart_store.peek_many(stored):
+                _reprice_live_cart(db, product, cart_id)
+            repriced += len([cart_id for cart_id in cart_ids if cart_id not in pending])
+
+        registry.inc("cart_repriced_total", repriced)
+        return repriced
+    except Exception:
+        db.rollback()
+        logger.exception("No se pudieron recalcular los carritos del producto %s", product_id)
+        raise
+    finally:
+        db.close()
+
+
+def affected_cart_ids(db: Session, product_id: UUID) -> list[int]:
+    return db.execute(select(CartItem.cart_id).where(CartItem.product_id == product_id)).scalars().all()
+
+
+def remove_product_from_carts(session_factory, product_id: UUID, cart_ids: list[int]) -> None:
+    """
+    Quita un producto eliminado de los carritos vivos y recalcula los totales de los demás
+    (la eliminación en cascada ya borró sus líneas). `cart_ids` se obtiene antes de borrar.
+    """
+    db = session_factory()
+    try:
+        live = cart_store.peek_many(cart_ids)
+        for cart_id in live:
+            with cart_store.editing(db, cart_id) as state:
+                item = find_item(state, product_id=product_id) if state else None
+                if item:
+                    set_item_quantity(state, item, 0)
+        stored = [cart_id for cart_id in cart_ids if cart_id not in live]
+        for start in range(0, len(stored), BATCH_SIZE):
+            _refresh_totals(db, stored[start:start + BATCH_SIZE])
+            db.commit()
+        registry.inc("cart_repriced_total", len(cart_ids))
+    except Exception:
+        db.rollback()
+        logger.exception("No se pudieron recalcular los carritos del producto eliminado %s", product_id)
+        raise
+    finally:
+        db.close()
+
+
+def price_drift(db: Session, user_id: UUID, business_id: UUID, order_items) -> list[dict]:
+    """
+    Compara el precio enviado en cada línea del pedido con el registrado en el carrito.
+    Una consulta sobre cart_items; las líneas sin carrito o sin precio registrado no se comparan.
+    """
+    snapshots = dict(db.execute(
+        select(CartItem.product_id, CartItem.unit_price)
+        .join(Cart, Cart.id == CartItem.cart_id)
+        .where(Cart.user_id == user_id, Cart.business_id == business_id, CartItem.unit_price.is_not(None))
+    ).all())
+    return [
+        {
+            "product_id": str(item.product_id),
+            "product_name": item.product_name,
+            "expected_price": str(snapshots[item.product_id]),
+            "received_price": str(item.product_price),
+        }
+        for item in order_items
+        if item.product_id in snapshots and Decimal(item.product_price) != snapshots[item.product_id]
+    ]
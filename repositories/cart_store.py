@@ -0,0 +1,669 @@
+"""
+Almacén de carritos vivos con escritura diferida (write-behind) a la base de datos.
+
+Los carritos se leen y modifican en un almacén clave-valor (Redis o, con un solo worker y
+CART_STORE_URL=memory://, la memoria del proceso). Cada mutación ajusta los totales de
+forma incremental y marca el carrito como pendiente; una tarea periódica escribe los
+pendientes en carts/cart_items y el checkout fuerza la escritura del carrito antes de
+crear el pedido.
+
+Solo la creación del carrito se escribe de inmediato (se necesita su id); los ids de los
+items se reservan con nextval sobre la secuencia de cart_items.
+"""
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Iterable, Iterator, Optional
+from uuid import UUID
+from sqlalchemy import delete, func, select, text, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, joinedload, selectinload
+from core.config import get_setting
+from core.metrics import registry
+from database.models.cart_model import Cart, CartItem
+from database.models.product_model import Product
+from utils.cart_totals import DELIVERY_FEE, apply_quantity_delta, calculate_cart_totals, totals_from_sums
+
+try:  # redis es opcional: con CART_STORE_URL=memory:// se usa el almacén en memoria
+    import redis
+except ImportError:  # pragma: no cover
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+registry.describe("cart_store_flushed_total", "counter", "Carritos escritos en la base de datos")
+registry.describe("cart_store_flush_errors_total", "counter", "Errores al escribir carritos en la base de datos")
+registry.describe("cart_store_dirty", "gauge", "Carritos con cambios pendientes de escribir")
+
+TOTAL_FIELDS = ("subtotal", "discount_total", "taxes", "delivery_fee", "total")
+
+
+class InMemoryCartBackend:
+    """
+    Backend en la memoria del proceso. Solo es válido con un único worker: con varios
+    procesos cada uno tendría su propia copia de los carritos.
+    """
+
+    def __init__(self, lock_stripes: int = 64):
+        self._lock = threading.Lock()
+        self._carts: dict[int, str] = {}
+        self._owners: dict[str, int] = {}
+        self._dirty: set[int] = set()
+        # producto -> carritos pendientes de escribir que lo contienen
+        self._dirty_by_product: dict[str, set[int]] = {}
+        # Bloqueos por franjas: acotados en memoria sin importar cuántos carritos existan
+        self._stripes = [threading.RLock() for _ in range(lock_stripes)]
+
+    def get_many(self, cart_ids: list[int]) -> list[Optional[str]]:
+        with self._lock:
+            return [self._carts.get(cart_id) for cart_id in cart_ids]
+
+    def set(self, cart_id: int, data: str, only_if_absent: bool = False) -> None:
+        with self._lock:
+            if only_if_absent and cart_id in self._carts:
+                return
+            self._carts[cart_id] = data
+
+    def delete(self, cart_id: int, owner_key: Optional[str] = None) -> None:
+        with self._lock:
+            self._carts.pop(cart_id, None)
+            self._dirty.discard(cart_id)
+            if owner_key is not None and self._owners.get(owner_key) == cart_id:
+                del self._owners[owner_key]
+
+    def get_owner(self, owner_key: str) -> Optional[int]:
+        with self._lock:
+            return self._owners.get(owner_key)
+
+    def set_owner(self, owner_key: str, cart_id: int) -> None:
+        with self._lock:
+            self._owners[owner_key] = cart_id
+
+    def mark_dirty(self, cart_id: int) -> None:
+        with self._lock:
+            self._dirty.add(cart_id)
+
+    def discard_dirty(self, cart_id: int) -> None:
+        with self._lock:
+            self._dirty.discard(cart_id)
+
+    def pop_dirty(self, count: int) -> list[int]:
+        with self._lock:
+            return [self._dirty.pop() for _ in range(min(count, len(self._dirty)))]
+
+    def dirty_count(self) -> int:
+        with self._lock:
+            return len(self._dirty)
+
+    def dirty_ids(self) -> list[int]:
+        with self._lock:
+            return list(self._dirty)
+
+    def index_dirty_products(self, cart_id: int, product_ids: list[str]) -> None:
+        with self._lock:
+            for product_id in product_ids:
+                self._dirty_by_product.setdefault(product_id, set()).add(cart_id)
+
+    def unindex_dirty_products(self, cart_id: int, product_ids: list[str]) -> None:
+        with self._lock:
+            for product_id in product_ids:
+                carts = self._dirty_by_product.get(product_id)
+                if carts is not None:
+                    carts.discard(cart_id)
+                    if not carts:
+                        del self._dirty_by_product[product_id]
+
+    def dirty_carts_with_product(self, product_id: str) -> list[int]:
+        with self._lock:
+            return list(self._dirty_by_product.get(product_id, ()))
+
+    def lock(self, name: str):
+        return self._stripes[hash(name) % len(self._stripes)]
+
+
+class RedisCartBackend:
+    """Backend compartido entre workers. El cliente debe crearse con decode_responses=True."""
+
+    def __init__(self, client, prefix: str = "cart:", ttl: int = 7 * 24 * 3600, lock_timeout: float = 10.0):
+        self.client = client
+        self.prefix = prefix
+        # El TTL solo limpia carritos abandonados; es muy superior al intervalo de escritura
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+
+    def _key(self, cart_id: int) -> str:
+        return f"{self.prefix}{cart_id}"
+
+    @property
+    def _dirty_key(self) -> str:
+        return f"{self.prefix}dirty"
+
+    def get_many(self, cart_ids: list[int]) -> list[Optional[str]]:
+        if not cart_ids:
+            return []
+        return self.client.mget([self._key(cart_id) for cart_id in cart_ids])
+
+    def set(self, cart_id: int, data: str, only_if_absent: bool = False) -> None:
+        self.client.set(self._key(cart_id), data, ex=self.ttl, nx=only_if_absent)
+
+    def delete(self, cart_id: int, owner_key: Optional[str] = None) -> None:
+        pipe = self.client.pipeline()
+        pipe.delete(self._key(cart_id))
+        pipe.srem(self._dirty_key, cart_id)
+        if owner_key is not None:
+            pipe.delete(f"{self.prefix}owner:{owner_key}")
+        pipe.execute()
+
+    def get_owner(self, owner_key: str) -> Optional[int]:
+        value = self.client.get(f"{self.prefix}owner:{owner_key}")
+        return int(value) if value is not None else None
+
+    def set_owner(self, owner_key: str, cart_id: int) -> None:
+        self.client.set(f"{self.prefix}owner:{owner_key}", cart_id, ex=self.ttl)
+
+    def mark_dirty(self, cart_id: int) -> None:
+        self.client.sadd(self._dirty_key, cart_id)
+
+    def discard_dirty(self, cart_id: int) -> None:
+        self.client.srem(self._dirty_key, cart_id)
+
+    def pop_dirty(self, count: int) -> list[int]:
+        return [int(cart_id) for cart_id in self.client.spop(self._dirty_key, count) or []]
+
+    def dirty_count(self) -> int:
+        return self.client.scard(self._dirty_key)
+
+    def dirty_ids(self) -> list[int]:
+        return [int(cart_id) for cart_id in self.client.sscan_iter(self._dirty_key, count=1000)]
+
+    def _product_key(self, product_id: str) -> str:
+        return f"{self.prefix}dirty:product:{product_id}"
+
+    def index_dirty_products(self, cart_id: int, product_ids: list[str]) -> None:
+        if not product_ids:
+            return
+        pipe = self.client.pipeline()
+        for product_id in product_ids:
+            pipe.sadd(self._product_key(product_id), cart_id)
+            # Las entradas que no se limpien (p. ej. un worker caído) caducan con los carritos
+            pipe.expire(self._product_key(product_id), self.ttl)
+        pipe.execute()
+
+    def unindex_dirty_products(self, cart_id: int, product_ids: list[str]) -> None:
+        if not product_ids:
+            return
+        pipe = self.client.pipeline()
+        for product_id in product_ids:
+            pipe.srem(self._product_key(product_id), cart_id)
+        pipe.execute()
+
+    def dirty_carts_with_product(self, product_id: str) -> list[int]:
+        return [int(cart_id) for cart_id in self.client.smembers(self._product_key(product_id))]
+
+    def lock(self, name: str):
+        return self.client.lock(
+            f"{self.prefix}lock:{name}", timeout=self.lock_timeout, blocking_timeout=self.lock_timeout
+        )
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+def _owner_key(user_id, business_id) -> str:
+    return f"{user_id}:{business_id}"
+
+
+def _encode(state: dict) -> str:
+    return json.dumps(state, default=str)
+
+
+def _decode(data: str) -> dict:
+    state = json.loads(data)
+    for field in TOTAL_FIELDS:
+        state[field] = Decimal(state[field])
+    return state
+
+
+def product_snapshot(product: Product) -> dict:
+    """Datos del producto que se muestran en el carrito, sin cargar sus opciones."""
+    return {
+        "id": str(product.id),
+        "name": product.name,
+        "price": str(product.price),
+        "description": product.description,
+        "product_image_url": product.product_image_url,
+        "stock": product.stock,
+        "available": product.available,
+        "business_id": str(product.business_id),
+        "discount": str(product.discount or Decimal("0.00")),
+        "is_active": bool(product.is_active),
+    }
+
+
+def _line_snapshot(item: CartItem) -> dict:
+    # La línea conserva el precio y descuento registrados (los que vio el cliente), no los
+    # actuales del producto: así el checkout sigue detectando cambios de precio
+    snapshot = product_snapshot(item.product)
+    if item.unit_price is not None:
+        snapshot["price"] = str(item.unit_price)
+    if item.unit_discount is not None:
+        snapshot["discount"] = str(item.unit_discount)
+    return snapshot
+
+
+def _cart_state(cart: Cart) -> dict:
+    items = [(item, _line_snapshot(item)) for item in sorted(cart.cart_items, key=lambda item: item.id)]
+    totals = calculate_cart_totals(
+        (item.quantity, Decimal(snapshot["price"]), Decimal(snapshot["discount"])) for item, snapshot in items
+    )
+    return {
+        "id": cart.id,
+        "user_id": str(cart.user_id),
+        "business_id": str(cart.business_id),
+        "created_at": _isoformat(cart.created_at),
+        "updated_at": _isoformat(cart.updated_at),
+        **totals,
+        "items": [
+            {
+                "id": item.id,
+                "product_id": str(item.product_id),
+                "quantity": item.quantity,
+                "created_at": _isoformat(item.created_at),
+                "updated_at": _isoformat(item.updated_at),
+                "product": snapshot,
+            }
+            for item, snapshot in items
+        ],
+    }
+
+
+def _hydrate(db: Session, cart_ids: list[int]) -> list[dict]:
+    """Construye el estado de los carritos a partir de la base de datos con dos consultas."""
+    if not cart_ids:
+        return []
+    carts = (
+        db.query(Cart)
+        .options(selectinload(Cart.cart_items).joinedload(CartItem.product))
+        .filter(Cart.id.in_(cart_ids))
+        .all()
+    )
+    return [_cart_state(cart) for cart in carts]
+
+
+def _apply_line(state: dict, quantity_delta: int, snapshot: dict) -> None:
+    apply_quantity_delta(state, quantity_delta, Decimal(snapshot["price"]), Decimal(snapshot["discount"]))
+
+
+def find_item(state: dict, product_id=None, item_id: Optional[int] = None) -> Optional[dict]:
+    for item in state["items"]:
+        if item_id is not None and item["id"] == item_id:
+            return item
+        if product_id is not None and item["product_id"] == str(product_id):
+            return item
+    return None
+
+
+def set_item_quantity(state: dict, item: dict, quantity: int, product: Optional[Product] = None) -> None:
+    """
+    Cambia la cantidad de una línea (0 la elimina) y ajusta los totales sin recorrer el
+    carrito. Si se pasa `product`, la línea toma su precio y descuento actuales.
+    """
+    _apply_line(state, -item["quantity"], item["product"])
+    if product is not None:
+        item["product"] = product_snapshot(product)
+    if quantity <= 0:
+        state["items"].remove(item)
+        return
+    item["quantity"] = quantity
+    item["updated_at"] = _now()
+    _apply_line(state, quantity, item["product"])
+
+
+def add_item(state: dict, item_id: int, product: Product, quantity: int) -> dict:
+    now = _now()
+    item = {
+        "id": item_id,
+        "product_id": str(product.id),
+        "quantity": 0,
+        "created_at": now,
+        "updated_at": now,
+        "product": product_snapshot(product),
+    }
+    state["items"].append(item)
+    set_item_quantity(state, item, quantity, product)
+    return item
+
+
+def recompute_totals(state: dict) -> dict:
+    """Recálculo completo de los totales del estado; sirve para verificar los incrementales."""
+    return calculate_cart_totals(
+        (
+            (item["quantity"], Decimal(item["product"]["price"]), Decimal(item["product"]["discount"]))
+            for item in state["items"]
+        ),
+        delivery_fee=state["delivery_fee"],
+    )
+
+
+def recomputed_sums(db: Session, cart_ids: list[int]) -> dict[int, tuple[Decimal, Decimal]]:
+    """
+    Subtotal y descuento de cada carrito recalculados desde cart_items en una consulta agrupada.
+    Usa el precio registrado en cada línea y, si falta, el precio actual del producto.
+    """
+    if not cart_ids:
+        return {}
+    rows = db.execute(
+        select(
+            CartItem.cart_id,
+            func.sum(CartItem.quantity * func.coalesce(CartItem.unit_price, Product.price)),
+            func.sum(CartItem.quantity * func.coalesce(CartItem.unit_discount, Product.discount, 0)),
+        )
+        .join(Product, Product.id == CartItem.product_id)
+        .where(CartItem.cart_id.in_(cart_ids))
+        .group_by(CartItem.cart_id)
+    ).all()
+    return {cart_id: (subtotal, discount_total) for cart_id, subtotal, discount_total in rows}
+
+
+def allocate_item_ids(db: Session, count: int) -> list[int]:
+    """Reserva ids de items en la secuencia de la tabla para poder responder sin insertarlos."""
+    if count <= 0:
+        return []
+    return list(db.execute(
+        text("SELECT nextval(pg_get_serial_sequence('cart_items', 'id')) FROM generate_series(1, :count)"),
+        {"count": count},
+    ).scalars())
+
+
+def allocate_item_id(db: Session) -> int:
+    return allocate_item_ids(db, 1)[0]
+
+
+def _write_cart(db: Session, state: dict) -> bool:
+    """Escribe el estado del carrito en carts/cart_items. Devuelve False si el carrito ya no existe."""
+    result = db.execute(
+        update(Cart)
+        .where(Cart.id == state["id"])
+        .values(
+            subtotal=state["subtotal"],
+            discount_total=state["discount_total"],
+            taxes=state["taxes"],
+            delivery_fee=state["delivery_fee"],
+            total=state["total"],
+            updated_at=datetime.fromisoformat(state["updated_at"]),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        return False
+
+    product_ids = [UUID(item["product_id"]) for item in state["items"]]
+    stmt = delete(CartItem).where(CartItem.cart_id == state["id"])
+    if product_ids:
+        stmt = stmt.where(CartItem.product_id.not_in(product_ids))
+    db.execute(stmt.execution_options(synchronize_session=False))
+    if not product_ids:
+        return True
+
+    stmt = insert(CartItem).values([
+        {
+            "id": item["id"],
+            "cart_id": state["id"],
+            "product_id": UUID(item["product_id"]),
+            "quantity": item["quantity"],
+            "unit_price": Decimal(item["product"]["price"]),
+            "unit_discount": Decimal(item["product"]["discount"]),
+            "created_at": datetime.fromisoformat(item["created_at"]),
+            "updated_at": datetime.fromisoformat(item["updated_at"]),
+        }
+        for item in state["items"]
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[CartItem.cart_id, CartItem.product_id],
+        set_={
+            # Una línea quitada y vuelta a agregar antes de escribirse tiene un id nuevo en el
+            # almacén (el que recibió el cliente): la fila toma ese id para que sigan coincidiendo
+            "id": stmt.excluded.id,
+            "quantity": stmt.excluded.quantity,
+            "unit_price": stmt.excluded.unit_price,
+            "unit_discount": stmt.excluded.unit_discount,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    db.execute(stmt)
+    return True
+
+
+class CartStore:
+    def __init__(self, backend):
+        self.backend = backend
+
+    def load_many(self, db: Session, cart_ids: Iterable[int]) -> list[dict]:
+        """Devuelve los carritos en el orden pedido; los que no están en el almacén se cargan de la base."""
+        cart_ids = list(cart_ids)
+        states = {
+            cart_id: _decode(data)
+            for cart_id, data in zip(cart_ids, self.backend.get_many(cart_ids))
+            if data is not None
+        }
+        for state in _hydrate(db, [cart_id for cart_id in cart_ids if cart_id not in states]):
+            # Sin sobrescribir: otra petición pudo guardar una versión más nueva entretanto
+            self.backend.set(state["id"], _encode(state), only_if_absent=True)
+            self.backend.set_owner(_owner_key(state["user_id"], state["business_id"]), state["id"])
+            states[state["id"]] = state
+        return [states[cart_id] for cart_id in cart_ids if cart_id in states]
+
+    def load(self, db: Session, cart_id: int) -> Optional[dict]:
+        states = self.load_many(db, [cart_id])
+        return states[0] if states else None
+
+    def get_or_create(self, db: Session, user_id: UUID, business_id: UUID) -> dict:
+        """Carrito del usuario para el negocio; si no existe se inserta de inmediato para obtener su id."""
+        owner_key = _owner_key(user_id, business_id)
+        cart_id = self.backend.get_owner(owner_key)
+        if cart_id is not None:
+            state = self.load(db, cart_id)
+            if state is not None:
+                return state
+
+        with self.backend.lock(f"owner:{owner_key}"):
+            cart_id = db.execute(
+                select(Cart.id)
+                .where(Cart.user_id == user_id, Cart.business_id == business_id)
+                .order_by(Cart.id)
+                .limit(1)
+            ).scalar()
+            if cart_id is None:
+                now = datetime.now(timezone.utc)
+                cart = Cart(
+                    user_id=user_id,
+                    business_id=business_id,
+                    created_at=now,
+                    updated_at=now,
+                    subtotal=Decimal("0.00"),
+                    discount_total=Decimal("0.00"),
+                    taxes=Decimal("0.00"),
+                    delivery_fee=DELIVERY_FEE,
+                    total=Decimal("0.00"),
+                )
+                db.add(cart)
+                db.flush()
+                cart_id = cart.id
+                db.commit()
+            state = self.load(db, cart_id)
+            self.backend.set_owner(owner_key, cart_id)
+        return state
+
+    @contextmanager
+    def editing(self, db: Session, cart_id: int) -> Iterator[Optional[dict]]:
+        """
+        Bloquea el carrito y entrega su estado para modificarlo. Si el bloque termina sin
+        errores el estado se guarda y queda pendiente de escribir; si lanza, se descarta.
+        """
+        with self.lock(cart_id):
+            state = self.load(db, cart_id)
+            yield state
+            if state is not None:
+                state["updated_at"] = _now()
+                self.backend.set(cart_id, _encode(state))
+                self.backend.mark_dirty(cart_id)
+                self.backend.index_dirty_products(cart_id, [item["product_id"] for item in state["items"]])
+
+    def peek_many(self, cart_ids: list[int]) -> dict[int, dict]:
+        """Estados de los carritos que están en el almacén, sin cargar los demás de la base."""
+        return {
+            cart_id: _decode(data)
+            for cart_id, data in zip(cart_ids, self.backend.get_many(cart_ids))
+            if data is not None
+        }
+
+    def in_use(self, cart_ids: list[int]) -> set[int]:
+        """Carritos que están en el almacén (cargados o con cambios pendientes de escribir)."""
+        live = {cart_id for cart_id, data in zip(cart_ids, self.backend.get_many(cart_ids)) if data is not None}
+        return live | (set(self.backend.dirty_ids()) & set(cart_ids))
+
+    def dirty_with_product(self, product_id) -> list[int]:
+        """
+        Carritos con cambios pendientes de escribir que contienen el producto. Usa el índice
+        producto -> carritos pendientes: solo se leen los estados de esos carritos.
+        """
+        product_id = str(product_id)
+        candidates = self.backend.dirty_carts_with_product(product_id)
+        states = self.peek_many(candidates)
+        found = [cart_id for cart_id, state in states.items() if find_item(state, product_id=product_id)]
+        # Entradas obsoletas (línea quitada antes de escribir, carrito desalojado)
+        for cart_id in set(candidates) - set(found):
+            self.backend.unindex_dirty_products(cart_id, [product_id])
+        return found
+
+    def reconcile(self, db: Session, cart_id: int) -> None:
+        """
+        Reemplaza los totales mantenidos del carrito por un recálculo completo. Si el carrito
+        está en el almacén se corrige su estado (y se escribirá después); si no, la fila de carts.
+        """
+        with self.lock(cart_id):
+            data = self.backend.get_many([cart_id])[0]
+            if data is not None:
+                state = _decode(data)
+                state.update(recompute_totals(state))
+                self.backend.set(cart_id, _encode(state))
+                self.backend.mark_dirty(cart_id)
+                return
+
+            delivery_fee = db.execute(select(Cart.delivery_fee).where(Cart.id == cart_id)).scalar()
+            if delivery_fee is None:
+                return
+            subtotal, discount_total = recomputed_sums(db, [cart_id]).get(cart_id, (Decimal("0.00"), Decimal("0.00")))
+            db.execute(
+                update(Cart)
+                .where(Cart.id == cart_id)
+                # Se conserva updated_at: solo cuenta la actividad del usuario
+                .values(updated_at=Cart.updated_at, **totals_from_sums(subtotal, discount_total, delivery_fee=delivery_fee))
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+
+    def lock(self, cart_id: int):
+        return self.backend.lock(f"cart:{cart_id}")
+
+    def evict(self, cart_id: int, user_id=None, business_id=None) -> None:
+        """Quita el carrito del almacén sin escribirlo (se descartan los cambios pendientes)."""
+        owner_key = _owner_key(user_id, business_id) if user_id is not None else None
+        self.backend.delete(cart_id, owner_key)
+
+    def flush(self, db: Session, cart_id: int) -> bool:
+        """Escribe el carrito en la base de datos si está en el almacén."""
+        with self.lock(cart_id):
+            data = self.backend.get_many([cart_id])[0]
+            if data is None:
+                return False
+            state = _decode(data)
+            self.backend.discard_dirty(cart_id)
+            try:
+                missing = self._drop_deleted_products(db, state)
+                written = _write_cart(db, state)
+                db.commit()
+            except Exception:
+                db.rollback()
+                self.backend.mark_dirty(cart_id)
+                registry.inc("cart_store_flush_errors_total")
+                raise
+            if not written:
+                # El carrito se eliminó en la base (p. ej. en cascada con el usuario o el negocio)
+                self.evict(cart_id, state["user_id"], state["business_id"])
+                return False
+            self.backend.unindex_dirty_products(cart_id, [item["product_id"] for item in state["items"]])
+            if missing:
+                self.backend.set(cart_id, _encode(state))
+            registry.inc("cart_store_flushed_total")
+            return True
+
+    def _drop_deleted_products(self, db: Session, state: dict) -> bool:
+        """Quita del estado las líneas cuyos productos ya no existen (el insert violaría la FK)."""
+        product_ids = [UUID(item["product_id"]) for item in state["items"]]
+        if not product_ids:
+            return False
+        existing = {str(product_id) for product_id in db.scalars(select(Product.id).where(Product.id.in_(product_ids)))}
+        missing = [item for item in state["items"] if item["product_id"] not in existing]
+        for item in missing:
+            set_item_quantity(state, item, 0)
+        return bool(missing)
+
+    def flush_owner(self, db: Session, user_id: UUID, business_id: UUID) -> bool:
+        """Escribe el carrito del usuario para el negocio (se usa en el checkout)."""
+        cart_id = self.backend.get_owner(_owner_key(user_id, business_id))
+        if cart_id is None:
+            return False
+        return self.flush(db, cart_id)
+
+    def flush_dirty(self, session_factory, batch_size: int = 100) -> int:
+        """Escribe los carritos pendientes; lo ejecuta la tarea periódica de la aplicación."""
+        flushed = 0
+        # Se acota a los pendientes al iniciar para que un carrito que falla no se reintente en bucle
+        remaining = self.backend.dirty_count()
+        while remaining > 0:
+            cart_ids = self.backend.pop_dirty(min(batch_size, remaining))
+            if not cart_ids:
+                break
+            remaining -= len(cart_ids)
+            db = session_factory()
+            try:
+                for cart_id in cart_ids:
+                    try:
+                        flushed += self.flush(db, cart_id)
+                    except Exception:
+                        logger.exception("No se pudo escribir el carrito %s", cart_id)
+            finally:
+                db.close()
+        registry.set("cart_store_dirty", self.backend.dirty_count())
+        return flushed
+
+
+def _build_backend():
+    url = get_setting("CART_STORE_URL")
+    if url == "memory://":
+        return InMemoryCartBackend()
+    if not url:
+        # Con varios workers cada proceso tendría sus propios carritos y sus escrituras
+        # diferidas se pisarían entre sí: el almacén en memoria debe pedirse explícitamente
+        raise RuntimeError(
+            'CART_STORE_URL no está configurado: usa una URL de Redis o "memory://" (un solo worker)'
+        )
+    if redis is None:
+        raise RuntimeError("CART_STORE_URL requiere el paquete redis")
+    return RedisCartBackend(
+        redis.Redis.from_url(url, decode_responses=True),
+        ttl=get_setting("CART_STORE_TTL_SECONDS", 7 * 24 * 3600),
+    )
+
+
+# Almacén de la aplicación (CART_STORE_URL: URL de Redis o memory:// con un solo worker)
+cart_store = CartStore(_build_backend())
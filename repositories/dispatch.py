@@ -0,0 +1,281 @@
+"""
+Asignación de repartidores a pedidos.
+
+Las posiciones de los repartidores se guardan en un índice espacial en memoria: una rejilla
+de celdas de `cell_size` grados donde solo están los repartidores disponibles. La búsqueda de
+los k más cercanos recorre anillos de celdas alrededor del negocio y se detiene cuando ningún
+anillo más lejano puede mejorar el resultado.
+
+El índice solo propone candidatos; la reserva del repartidor es un UPDATE condicional sobre
+drivers, así que dos pedidos (o dos workers con índices distintos) nunca obtienen el mismo.
+"""
+import logging
+import math
+import threading
+import time
+from datetime import timezone
+from typing import Iterable, Optional
+from uuid import UUID
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from core.config import get_setting
+from core.metrics import registry
+from database.models.business_model import Business
+from database.models.driver_location_model import DriverLocation
+from database.models.order_model import Order
+from database.models.users_model import Driver
+
+logger = logging.getLogger(__name__)
+
+registry.describe("dispatch_assigned_total", "counter", "Pedidos asignados a un repartidor")
+registry.describe("dispatch_claim_conflicts_total", "counter", "Candidatos que ya no estaban disponibles al reservarlos")
+registry.describe("dispatch_unassigned_total", "counter", "Pedidos sin repartidor disponible cercano")
+registry.describe("dispatch_available_drivers", "gauge", "Repartidores disponibles en el índice de este worker")
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+CANDIDATES = get_setting("DISPATCH_CANDIDATES", 5)
+MAX_DISTANCE_KM = get_setting("DISPATCH_MAX_DISTANCE_KM", 10.0)
+# Posiciones más antiguas se ignoran (la aplicación del repartidor dejó de reportar)
+MAX_POSITION_AGE_SECONDS = get_setting("DISPATCH_MAX_POSITION_AGE_SECONDS", 300.0)
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class DriverIndex:
+    """
+    Índice en rejilla de las últimas posiciones de los repartidores. Guarda la posición de
+    todos los que reportan, pero solo los disponibles están en las celdas.
+    """
+
+    def __init__(self, cell_size: float = 0.02, max_age_seconds: float = MAX_POSITION_AGE_SECONDS):
+        self.cell_size = cell_size
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+        self._cells: dict[tuple[int, int], set[UUID]] = {}
+        # driver_id -> (lat, lon, reportada_en)
+        self._positions: dict[UUID, tuple[float, float, float]] = {}
+        self._available: set[UUID] = set()
+
+    def _cell(self, lat: float, lon: float) -> tuple[int, int]:
+        return math.floor(lat / self.cell_size), math.floor(lon / self.cell_size)
+
+    def _unlink(self, driver_id: UUID) -> None:
+        position = self._positions.get(driver_id)
+        if position is None or driver_id not in self._available:
+            return
+        cell = self._cell(position[0], position[1])
+        members = self._cells.get(cell)
+        if members is not None:
+            members.discard(driver_id)
+            if not members:
+                del self._cells[cell]
+
+    def _link(self, driver_id: UUID) -> None:
+        lat, lon, _ = self._positions[driver_id]
+        self._cells.setdefault(self._cell(lat, lon), set()).add(driver_id)
+
+    def update(self, driver_id: UUID, lat: float, lon: float, reported_at: Optional[float] = None) -> None:
+        """
+        Registra la última posición del repartidor (no cambia su disponibilidad). Una posición
+        más antigua que la registrada se ignora.
+        """
+        reported_at = reported_at if reported_at is not None else time.time()
+        with self._lock:
+            current = self._positions.get(driver_id)
+            if current is not None and current[2] > reported_at:
+                return
+            self._unlink(driver_id)
+            self._positions[driver_id] = (lat, lon, reported_at)
+            if driver_id in self._available:
+                self._link(driver_id)
+
+    def set_available(self, driver_id: UUID, available: bool) -> None:
+        with self._lock:
+            if available == (driver_id in self._available):
+                return
+            if available:
+                self._available.add(driver_id)
+                if driver_id in self._positions:
+                    self._link(driver_id)
+            else:
+                self._unlink(driver_id)
+                self._available.discard(driver_id)
+            registry.set("dispatch_available_drivers", len(self._available))
+
+    def replace_available(self, driver_ids: Iterable[UUID]) -> None:
+        """Reemplaza el conjunto de disponibles (sincronización con la tabla drivers)."""
+        driver_ids = set(driver_ids)
+        with self._lock:
+            for driver_id in self._available - driver_ids:
+                self._unlink(driver_id)
+            for driver_id in driver_ids - self._available:
+                if driver_id in self._positions:
+                    self._link(driver_id)
+            self._available = driver_ids
+            registry.set("dispatch_available_drivers", len(driver_ids))
+
+    def remove(self, driver_id: UUID) -> None:
+        with self._lock:
+            self._unlink(driver_id)
+            self._available.discard(driver_id)
+            self._positions.pop(driver_id, None)
+            registry.set("dispatch_available_drivers", len(self._available))
+
+    def __len__(self) -> int:
+        return len(self._available)
+
+    def nearest(
+        self,
+        lat: float,
+        lon: float,
+        k: int = CANDIDATES,
+        max_distance_km: float = MAX_DISTANCE_KM,
+        exclude: Iterable[UUID] = (),
+    ) -> list[tuple[UUID, float]]:
+        """
+        Los `k` repartidores disponibles más cercanos a (lat, lon) dentro de `max_distance_km`.
+        :return: Lista de (driver_id, distancia en km) ordenada por distancia.
+        """
+        exclude = set(exclude)
+        oldest = time.time() - self.max_age_seconds
+        center_lat, center_lon = self._cell(lat, lon)
+        # Ancho mínimo de una celda en km (las longitudes se estrechan con la latitud)
+        widest_lat = min(abs(lat) + self.cell_size, 89.9)
+        cell_km = self.cell_size * KM_PER_DEGREE * math.cos(math.radians(widest_lat))
+        found: list[tuple[float, UUID]] = []
+        ring = 0
+        with self._lock:
+            if not self._cells:
+                return []
+            while True:
+                # Cualquier punto del anillo `ring` está al menos a (ring - 1) celdas completas
+                if (ring - 1) * cell_km > max_distance_km:
+                    break
+                if len(found) >= k and found[k - 1][0] <= (ring - 1) * cell_km:
+                    break
+                for cell in self._ring_cells(center_lat, center_lon, ring):
+                    for driver_id in self._cells.get(cell, ()):
+                        if driver_id in exclude:
+                            continue
+                        driver_lat, driver_lon, reported_at = self._positions[driver_id]
+                        if reported_at < oldest:
+                            continue
+                        distance = haversine_km(lat, lon, driver_lat, driver_lon)
+                        if distance <= max_distance_km:
+                            found.append((distance, driver_id))
+                found.sort(key=lambda entry: entry[0])
+                ring += 1
+        return [(driver_id, distance) for distance, driver_id in found[:k]]
+
+    @staticmethod
+    def _ring_cells(center_lat: int, center_lon: int, ring: int):
+        if ring == 0:
+            yield center_lat, center_lon
+            return
+        for offset in range(-ring, ring + 1):
+            yield center_lat - ring, center_lon + offset
+            yield center_lat + ring, center_lon + offset
+        for offset in range(-ring + 1, ring):
+            yield center_lat + offset, center_lon - ring
+            yield center_lat + offset, center_lon + ring
+
+
+# Índice de este worker; lo alimentan los reportes de posición de los repartidores
+driver_index = DriverIndex(cell_size=get_setting("DISPATCH_CELL_SIZE_DEGREES", 0.02))
+
+
+def sync_available_drivers(session_factory) -> int:
+    """
+    Carga en el índice la disponibilidad de la tabla drivers y la última posición guardada
+    de los disponibles. Corrige los cambios hechos por otros workers (reservas, liberaciones
+    y posiciones recibidas por ellos) que este índice no vio.
+    """
+    db = session_factory()
+    try:
+        rows = db.execute(
+            select(Driver.id, DriverLocation.latitude, DriverLocation.longitude, DriverLocation.recorded_at)
+            .outerjoin(DriverLocation, DriverLocation.driver_id == Driver.id)
+            .where(Driver.is_available.is_(True))
+        ).all()
+    finally:
+        db.close()
+    for row in rows:
+        if row.recorded_at is not None:
+            reported_at = row.recorded_at.replace(tzinfo=timezone.utc).timestamp()
+            driver_index.update(row.id, row.latitude, row.longitude, reported_at=reported_at)
+    driver_index.replace_available(row.id for row in rows)
+    return len(rows)
+
+
+def claim_driver(db: Session, driver_id: UUID) -> bool:
+    """Reserva el repartidor solo si sigue disponible. No hace commit."""
+    result = db.execute(
+        update(Driver)
+        .where(Driver.id == driver_id, Driver.is_available.is_(True))
+        .values(is_available=False)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def release_driver(db: Session, driver_id: UUID) -> None:
+    """Marca al repartidor como disponible de nuevo y lo devuelve al índice. Hace commit."""
+    db.execute(
+        update(Driver).where(Driver.id == driver_id).values(is_available=True).execution_options(synchronize_session=False)
+    )
+    db.commit()
+    driver_index.set_available(driver_id, True)
+
+
+class DispatchError(Exception):
+    pass
+
+
+def dispatch_order(db: Session, order_id: UUID, k: int = CANDIDATES) -> Optional[UUID]:
+    """
+    Asigna al pedido el repartidor disponible más cercano al negocio.
+    Cada candidato se reserva con un UPDATE condicional; si otro pedido lo tomó antes se
+    prueba el siguiente. El pedido se asigna en la misma transacción que la reserva.
+    :return: Id del repartidor asignado, o None si no hay ninguno disponible cerca.
+    :raises DispatchError: Si el pedido ya tiene repartidor o el negocio no tiene coordenadas.
+    """
+    order = db.get(Order, order_id)
+    if order.driver_id is not None:
+        raise DispatchError("El pedido ya tiene un repartidor asignado.")
+    business = db.get(Business, order.business_id)
+    if business.lat is None or business.long is None:
+        raise DispatchError("El negocio no tiene coordenadas.")
+
+    tried: set[UUID] = set()
+    while True:
+        candidates = driver_index.nearest(business.lat, business.long, k=k, exclude=tried)
+        if not candidates:
+            registry.inc("dispatch_unassigned_total")
+            return None
+        for driver_id, _ in candidates:
+            tried.add(driver_id)
+            if not claim_driver(db, driver_id):
+                # Lo tomó otro pedido o dejó de estar disponible
+                registry.inc("dispatch_claim_conflicts_total")
+                driver_index.set_available(driver_id, False)
+                continue
+            # Solo se asigna si el pedido sigue sin repartidor (otra petición pudo asignarlo)
+            assigned = db.execute(
+                update(Order)
+                .where(Order.id == order_id, Order.driver_id.is_(None))
+                .values(driver_id=driver_id)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if not assigned:
+                db.rollback()
+                raise DispatchError("El pedido ya tiene un repartidor asignado.")
+            db.commit()
+            driver_index.set_available(driver_id, False)
+            registry.inc("dispatch_assigned_total")
+            return driver_id
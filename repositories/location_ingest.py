@@ -0,0 +1,189 @@
+"""
+Ingesta de posiciones GPS de los repartidores.
+
+Los puntos recibidos (HTTP por lotes o WebSocket) no se escriben uno a uno: se guardan en un
+buffer en memoria que conserva solo el último punto de cada repartidor, y una tarea
+periódica los escribe en driver_locations con INSERT ... ON CONFLICT de varias filas.
+
+La posición más reciente alimenta en el momento el índice de asignación de repartidores y,
+al escribirse, se publica en el tema "driver:<id>" del hub para el seguimiento de pedidos.
+Si el buffer se llena (la base de datos no da abasto), los repartidores nuevos reciben 429.
+"""
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+from uuid import UUID
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from core.config import get_setting
+from core.metrics import registry
+from core.pubsub import hub
+from database.models.driver_location_model import DriverLocation
+from database.models.users_model import Driver
+from repositories.dispatch import driver_index
+
+logger = logging.getLogger(__name__)
+
+registry.describe("location_points_received_total", "counter", "Puntos GPS recibidos")
+registry.describe("location_points_coalesced_total", "counter", "Puntos GPS descartados por uno más reciente del mismo repartidor")
+registry.describe("location_points_rejected_total", "counter", "Puntos GPS rechazados por buffer lleno (429)")
+registry.describe("location_pending", "gauge", "Repartidores con posición pendiente de escribir")
+registry.describe("location_flush_rows_total", "counter", "Posiciones escritas en driver_locations")
+registry.describe("location_flush_errors_total", "counter", "Errores al escribir posiciones")
+registry.describe(
+    "location_flush_duration_seconds", "histogram", "Duración de cada escritura del buffer de posiciones",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+registry.describe(
+    "location_flush_lag_seconds", "histogram", "Tiempo desde que se recibe una posición hasta que se escribe",
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0),
+)
+
+MAX_PENDING = get_setting("LOCATION_MAX_PENDING", 50000)
+BATCH_SIZE = get_setting("LOCATION_FLUSH_BATCH_SIZE", 1000)
+FLUSH_INTERVAL = get_setting("LOCATION_FLUSH_INTERVAL_SECONDS", 1.0)
+
+FIELDS = ("latitude", "longitude", "heading", "speed", "accuracy", "recorded_at")
+
+
+def _utc_naive(value: datetime) -> datetime:
+    # driver_locations guarda fechas UTC sin zona, como el resto de tablas
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class LocationBuffer:
+    def __init__(self, max_pending: int = MAX_PENDING):
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        # driver_id -> (punto, momento en que se recibió el primer punto aún no escrito)
+        self._pending: dict[UUID, tuple[dict, float]] = {}
+        # Última posición conocida de cada repartidor que reporta a este worker
+        self._latest: dict[UUID, dict] = {}
+
+    def offer(self, driver_id: UUID, points: list[dict]) -> bool:
+        """
+        Recibe uno o varios puntos del repartidor y conserva solo el más reciente.
+        :return: False si el buffer está lleno y el punto se rechazó (el cliente debe reintentar).
+        """
+        newest = max(points, key=lambda point: _utc_naive(point["recorded_at"]))
+        newest = {field: newest.get(field) for field in FIELDS}
+        newest["recorded_at"] = _utc_naive(newest["recorded_at"])
+        with self._lock:
+            pending = self._pending.get(driver_id)
+            if pending is None and len(self._pending) >= self.max_pending:
+                registry.inc("location_points_rejected_total", len(points))
+                return False
+            registry.inc("location_points_received_total", len(points))
+            latest = self._latest.get(driver_id)
+            if latest is not None and latest["recorded_at"] >= newest["recorded_at"]:
+                # Llegó fuera de orden: ya hay una posición más reciente
+                registry.inc("location_points_coalesced_total", len(points))
+                return True
+            registry.inc("location_points_coalesced_total", len(points) - 1 + (pending is not None))
+            self._pending[driver_id] = (newest, pending[1] if pending else time.monotonic())
+            self._latest[driver_id] = newest
+            registry.set("location_pending", len(self._pending))
+        driver_index.update(
+            driver_id, newest["latitude"], newest["longitude"],
+            reported_at=newest["recorded_at"].replace(tzinfo=timezone.utc).timestamp(),
+        )
+        return True
+
+    def latest(self, driver_id: UUID) -> Optional[dict]:
+        with self._lock:
+            return self._latest.get(driver_id)
+
+    def forget(self, driver_id: UUID) -> None:
+        with self._lock:
+            self._latest.pop(driver_id, None)
+            self._pending.pop(driver_id, None)
+
+    @staticmethod
+    def retry_after() -> int:
+        """Segundos sugeridos al cliente cuando el buffer está lleno."""
+        return max(1, math.ceil(FLUSH_INTERVAL * 2))
+
+    def _take(self) -> dict[UUID, tuple[dict, float]]:
+        with self._lock:
+            batch, self._pending = self._pending, {}
+            registry.set("location_pending", 0)
+            return batch
+
+    def _restore(self, batch: dict[UUID, tuple[dict, float]]) -> None:
+        # Los puntos que no se pudieron escribir vuelven al buffer salvo que ya haya uno más nuevo
+        with self._lock:
+            for driver_id, entry in batch.items():
+                self._pending.setdefault(driver_id, entry)
+            registry.set("location_pending", len(self._pending))
+
+    def flush(self, session_factory, batch_size: int = BATCH_SIZE) -> int:
+        """
+        Escribe las posiciones pendientes con un INSERT ... ON CONFLICT por lote. Una posición
+        más antigua que la guardada (otro worker escribió una más nueva) no la sobrescribe.
+        :return: Número de posiciones escritas.
+        """
+        batch = self._take()
+        if not batch:
+            return 0
+        started = time.perf_counter()
+        written = []
+        remaining = dict(batch)
+        db = session_factory()
+        try:
+            items = list(batch.items())
+            for start in range(0, len(items), batch_size):
+                chunk = dict(items[start:start + batch_size])
+                try:
+                    self._upsert(db, chunk)
+                except IntegrityError:
+                    # Algún id no es un repartidor: se descartan esos puntos y se reintenta
+                    db.rollback()
+                    known = set(db.execute(select(Driver.id).where(Driver.id.in_(list(chunk)))).scalars())
+                    for driver_id in set(chunk) - known:
+                        logger.warning("Posición descartada: %s no es un repartidor", driver_id)
+                        self.forget(driver_id)
+                        del chunk[driver_id]
+                        del remaining[driver_id]
+                    self._upsert(db, chunk)
+                db.commit()
+                now = time.monotonic()
+                for driver_id, (point, received) in chunk.items():
+                    registry.observe("location_flush_lag_seconds", now - received)
+                    written.append((driver_id, point))
+                    del remaining[driver_id]
+                registry.inc("location_flush_rows_total", len(chunk))
+        except Exception:
+            db.rollback()
+            self._restore(remaining)
+            registry.inc("location_flush_errors_total")
+            raise
+        finally:
+            db.close()
+            registry.observe("location_flush_duration_seconds", time.perf_counter() - started)
+
+        for driver_id, point in written:
+            hub.publish([f"driver:{driver_id}"], "driver.location", {"driver_id": driver_id, **point})
+        return len(written)
+
+    @staticmethod
+    def _upsert(db, chunk: dict[UUID, tuple[dict, float]]) -> None:
+        if not chunk:
+            return
+        stmt = insert(DriverLocation).values([
+            {"driver_id": driver_id, **point} for driver_id, (point, _) in chunk.items()
+        ])
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[DriverLocation.driver_id],
+            set_={**{field: stmt.excluded[field] for field in FIELDS}, "updated_at": func.now()},
+            where=DriverLocation.recorded_at < stmt.excluded.recorded_at,
+        ))
+
+
+# Buffer de este worker; la aplicación lo escribe cada LOCATION_FLUSH_INTERVAL_SECONDS
+location_buffer = LocationBuffer()
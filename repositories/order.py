@@ -0,0 +1,118 @@
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import Session, joinedload, selectinload
+from core.pubsub import hub
+from database.models.business_model import Business
+from database.models.order_model import Order, OrderItem, OrderStatus, PaymentStatus
+
+# Número de líneas del pedido, calculado en la misma consulta del listado
+ITEM_COUNT = (
+    select(func.count(OrderItem.id))
+    .where(OrderItem.order_id == Order.id)
+    .correlate(Order)
+    .scalar_subquery()
+    .label("item_count")
+)
+
+
+def list_orders(
+    db: Session,
+    *,
+    user_id: Optional[UUID] = None,
+    driver_id: Optional[UUID] = None,
+    business_id: Optional[UUID] = None,
+    status: Optional[list[OrderStatus]] = None,
+    payment_status: Optional[list[PaymentStatus]] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    limit: int = 20,
+    offset: int = 0,
+    view: str = "full",
+) -> tuple[list, bool]:
+    """
+    Pedidos más recientes primero, filtrados por dueño (usuario, repartidor o negocio) y
+    opcionalmente por estado y rango de fechas. Los filtros coinciden con los índices
+    compuestos de orders.
+    :param view: "full" devuelve los pedidos con sus items (una consulta adicional para
+        todos los items de la página); "summary" devuelve filas con id, estados, total,
+        fecha y número de items, sin cargar los items.
+    :return: (pedidos de la página, si hay más páginas).
+    """
+    if view == "summary":
+        stmt = select(Order.id, Order.status, Order.payment_status, Order.total, Order.created_at, ITEM_COUNT)
+    else:
+        stmt = select(Order).options(selectinload(Order.order_items))
+
+    if user_id is not None:
+        stmt = stmt.where(Order.user_id == user_id)
+    if driver_id is not None:
+        stmt = stmt.where(Order.driver_id == driver_id)
+    if business_id is not None:
+        stmt = stmt.where(Order.business_id == business_id)
+    if status:
+        stmt = stmt.where(Order.status.in_(status))
+    if payment_status:
+        stmt = stmt.where(Order.payment_status.in_(payment_status))
+    if date_from is not None:
+        stmt = stmt.where(Order.created_at >= date_from)
+    if date_to is not None:
+        stmt = stmt.where(Order.created_at < date_to)
+
+    # Se pide una fila de más para saber si hay otra página sin contar el total
+    result = db.execute(stmt.order_by(Order.created_at.desc(), Order.id.desc()).limit(limit + 1).offset(offset))
+    orders = result.all() if view == "summary" else result.scalars().all()
+    return orders[:limit], len(orders) > limit
+
+
+def get_order_detail(db: Session, order_id: UUID) -> Optional[Order]:
+    """Pedido con sus items en una sola consulta (JOIN)."""
+    return db.execute(
+        select(Order).options(joinedload(Order.order_items)).where(Order.id == order_id)
+    ).unique().scalar_one_or_none()
+
+
+def can_track_driver(db: Session, driver_id: UUID, user_id: UUID) -> bool:
+    """
+    Si el usuario puede ver la posición y los eventos del repartidor: el propio repartidor,
+    o el cliente o el administrador del negocio de un pedido en curso asignado a él.
+    """
+    if driver_id == user_id:
+        return True
+    return db.scalar(
+        select(Order.id)
+        .join(Business, Business.id == Order.business_id)
+        .where(
+            Order.driver_id == driver_id,
+            Order.payment_status.in_((PaymentStatus.PENDING, PaymentStatus.IN_PROGRESS)),
+            or_(Order.user_id == user_id, Business.admin_id == user_id),
+        )
+        .limit(1)
+    ) is not None
+
+
+def order_topics(order: Order) -> list[str]:
+    """Temas del hub que reciben los eventos del pedido."""
+    topics = [f"order:{order.id}", f"business:{order.business_id}"]
+    if order.driver_id is not None:
+        topics.append(f"driver:{order.driver_id}")
+    return topics
+
+
+def publish_order_event(order: Order, event_type: str, previous_driver_id: Optional[UUID] = None) -> None:
+    """
+    Publica el estado actual del pedido a sus suscriptores. Se llama después del commit.
+    Si el pedido cambió de repartidor, el anterior también recibe el evento.
+    """
+    topics = order_topics(order)
+    if previous_driver_id is not None and previous_driver_id != order.driver_id:
+        topics.append(f"driver:{previous_driver_id}")
+    hub.publish(topics, event_type, {
+        "order_id": order.id,
+        "business_id": order.business_id,
+        "driver_id": order.driver_id,
+        "status": order.status.value,
+        "payment_status": order.payment_status.value,
+        "updated_at": order.updated_at,
+    })
@@ -0,0 +1,67 @@
+"""
+Selección de la fila "principal" de un propietario (dirección principal, método de pago principal).
+
+La base de datos garantiza que haya como mucho una principal por propietario con una
+restricción EXCLUDE ... WHERE (is_main) diferible: se comprueba al final de cada sentencia,
+de modo que el cambio de principal se hace con un solo UPDATE que desmarca la anterior y
+marca la elegida a la vez, sin estados intermedios con cero o dos principales.
+"""
+from sqlalchemy import exists, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from database.models.address_model import Address
+from database.models.payment_method_model import PaymentMethod
+
+
+class PrimarySelection:
+    def __init__(self, model, flag, *owner_columns):
+        self.model = model
+        self.flag = flag
+        self.owner_columns = owner_columns
+
+    def _owned_by(self, owner: tuple) -> list:
+        return [column == value for column, value in zip(self.owner_columns, owner)]
+
+    def has_rows(self, db: Session, *owner) -> bool:
+        """Si el propietario ya tiene alguna fila (EXISTS, sin contar todas)."""
+        return db.execute(select(exists().where(*self._owned_by(owner)))).scalar()
+
+    def select(self, db: Session, chosen_id, *owner) -> bool:
+        """
+        Marca `chosen_id` como la principal del propietario y desmarca la anterior en un
+        solo UPDATE, que solo toca esas dos filas. No hace commit.
+        :return: False si otra transacción eligió otra principal a la vez (no se cambia nada).
+        """
+        stmt = (
+            update(self.model)
+            .where(*self._owned_by(owner), or_(self.flag, self.model.id == chosen_id))
+            .values({self.flag.key: self.model.id == chosen_id})
+            .execution_options(synchronize_session=False)
+        )
+        # Si otra transacción cambia la principal al mismo tiempo, la restricción rechaza el
+        # UPDATE; al repetirlo ya se ve la principal que quedó confirmada
+        for attempt in range(2):
+            try:
+                with db.begin_nested():
+                    db.execute(stmt)
+                return True
+            except IntegrityError:
+                if attempt:
+                    return False
+        return False
+
+    def add(self, db: Session, row, *owner) -> bool:
+        """
+        Inserta `row`; pasa a ser la principal si así se pidió o si es la primera del
+        propietario. No hace commit.
+        :return: Si la fila quedó como principal.
+        """
+        wanted = bool(getattr(row, self.flag.key)) or not self.has_rows(db, *owner)
+        setattr(row, self.flag.key, False)
+        db.add(row)
+        db.flush()
+        return wanted and self.select(db, row.id, *owner)
+
+
+addresses = PrimarySelection(Address, Address.is_main_address, Address.entity_type, Address.entity_id)
+payment_methods = PrimarySelection(PaymentMethod, PaymentMethod.is_main_payment_method, PaymentMethod.user_id)
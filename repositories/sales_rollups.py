@@ -0,0 +1,202 @@
+"""
+Agregados de ventas por negocio (por hora, por día y por producto y día).
+
+Se mantienen de forma incremental: cuando un pedido entra o sale de un estado final
+(Entregado/Cancelado), apply_order_transition suma o resta su aporte con upserts en la misma
+transacción que el cambio de estado. rebuild_rollups los recalcula desde orders para un
+rango de días (job nocturno jobs/sales_rollups.py), lo que corrige pedidos borrados o
+modificados por otras vías.
+"""
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Optional
+from uuid import UUID
+from sqlalchemy import Date, cast, delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from database.models.order_model import Order, OrderItem, PaymentStatus
+from database.models.sales_rollup_model import BusinessProductSalesDaily, BusinessSalesDaily, BusinessSalesHourly
+
+def _upsert_increment(db: Session, model, rows: list[dict], keys: tuple[str, ...]) -> None:
+    """Suma los valores de `rows` a las filas existentes (o las crea)."""
+    stmt = insert(model).values(rows)
+    columns = [column for column in rows[0] if column not in keys]
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=list(keys),
+        set_={column: getattr(model, column) + stmt.excluded[column] for column in columns},
+    ))
+
+
+def _insert_replacing(db: Session, model, rows, keys: tuple[str, ...]) -> None:
+    """
+    INSERT ... SELECT que reemplaza las filas existentes: entre el DELETE y el INSERT de
+    rebuild_rollups un pedido concurrente puede crear la fila con _upsert_increment.
+    """
+    columns = [column.name for column in rows.selected_columns]
+    stmt = insert(model).from_select(columns, rows)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=list(keys),
+        set_={column: stmt.excluded[column] for column in columns if column not in keys},
+    ))
+
+
+def apply_order_transition(db: Session, order: Order, previous: Optional[PaymentStatus]) -> None:
+    """
+    Ajusta los agregados por el paso del pedido de `previous` a su estado actual.
+    No hace commit: debe llamarse en la transacción que cambia el estado, con los items ya
+    escritos (flush) si el pedido es nuevo.
+    """
+    _apply_delta(db, order, previous, order.payment_status)
+
+
+def remove_order_contribution(db: Session, order: Order) -> None:
+    """Resta el aporte de un pedido que se va a borrar. Llamar antes de db.delete(order)."""
+    _apply_delta(db, order, order.payment_status, None)
+
+
+def _apply_delta(db: Session, order: Order, previous: Optional[PaymentStatus], current: Optional[PaymentStatus]) -> None:
+    delivered = int(current == PaymentStatus.DELIVERED) - int(previous == PaymentStatus.DELIVERED)
+    canceled = int(current == PaymentStatus.CANCELED) - int(previous == PaymentStatus.CANCELED)
+    if not delivered and not canceled:
+        return
+
+    products = []
+    if delivered:
+        products = db.execute(
+            select(OrderItem.product_name, func.sum(OrderItem.quantity), func.sum(OrderItem.total_price))
+            .where(OrderItem.order_id == order.id)
+            .group_by(OrderItem.product_name)
+            # Orden fijo de bloqueo de filas entre pedidos concurrentes del mismo negocio
+            .order_by(OrderItem.product_name)
+        ).all()
+    hour = order.created_at.replace(minute=0, second=0, microsecond=0)
+    counters = {
+        "delivered_orders": delivered,
+        "canceled_orders": canceled,
+        "revenue": Decimal(order.total) * delivered,
+        "items_sold": sum(quantity for _, quantity, _ in products) * delivered,
+    }
+    _upsert_increment(
+        db, BusinessSalesHourly, [{"business_id": order.business_id, "hour": hour, **counters}], ("business_id", "hour")
+    )
+    _upsert_increment(
+        db, BusinessSalesDaily, [{"business_id": order.business_id, "day": hour.date(), **counters}], ("business_id", "day")
+    )
+    if products:
+        _upsert_increment(db, BusinessProductSalesDaily, [
+            {
+                "business_id": order.business_id,
+                "day": hour.date(),
+                "product_name": name,
+                "quantity": quantity * delivered,
+                "revenue": revenue * delivered,
+            }
+            for name, quantity, revenue in products
+        ], ("business_id", "day", "product_name"))
+
+
+def rebuild_rollups(db: Session, business_ids: list[UUID], day_from: date, day_to: date) -> None:
+    """
+    Recalcula desde orders los agregados de los negocios en los días [day_from, day_to).
+    Cada tabla se reconstruye con un DELETE y un INSERT ... SELECT agrupado que reemplaza las
+    filas que un pedido concurrente haya creado entretanto. No hace commit.
+    """
+    start, end = datetime.combine(day_from, time()), datetime.combine(day_to, time())
+    in_range = (
+        Order.business_id.in_(business_ids),
+        Order.created_at >= start,
+        Order.created_at < end,
+        Order.payment_status.in_((PaymentStatus.DELIVERED, PaymentStatus.CANCELED)),
+    )
+    # Pedidos finalizados del rango con sus unidades (subconsulta por el índice de order_items.order_id)
+    orders = select(
+        Order.business_id,
+        Order.created_at,
+        Order.payment_status,
+        Order.total,
+        select(func.coalesce(func.sum(OrderItem.quantity), 0))
+        .where(OrderItem.order_id == Order.id)
+        .correlate(Order)
+        .scalar_subquery()
+        .label("quantity"),
+    ).where(*in_range).subquery()
+    delivered = orders.c.payment_status == PaymentStatus.DELIVERED
+
+    for model, bucket, period, low, high in (
+        (BusinessSalesHourly, func.date_trunc("hour", orders.c.created_at), BusinessSalesHourly.hour, start, end),
+        (BusinessSalesDaily, cast(orders.c.created_at, Date), BusinessSalesDaily.day, day_from, day_to),
+    ):
+        db.execute(delete(model).where(model.business_id.in_(business_ids), period >= low, period < high))
+        rows = (
+            select(
+                orders.c.business_id,
+                bucket.label(period.key),
+                func.count().filter(delivered).label("delivered_orders"),
+                func.count().filter(~delivered).label("canceled_orders"),
+                func.coalesce(func.sum(orders.c.total).filter(delivered), 0).label("revenue"),
+                func.coalesce(func.sum(orders.c.quantity).filter(delivered), 0).label("items_sold"),
+            )
+            .group_by(orders.c.business_id, bucket)
+        )
+        _insert_replacing(db, model, rows, ("business_id", period.key))
+
+    day = cast(Order.created_at, Date)
+    db.execute(delete(BusinessProductSalesDaily).where(
+        BusinessProductSalesDaily.business_id.in_(business_ids),
+        BusinessProductSalesDaily.day >= day_from,
+        BusinessProductSalesDaily.day < day_to,
+    ))
+    rows = (
+        select(
+            Order.business_id,
+            day.label("day"),
+            OrderItem.product_name,
+            func.sum(OrderItem.quantity).label("quantity"),
+            func.sum(OrderItem.total_price).label("revenue"),
+        )
+        .join(OrderItem, OrderItem.order_id == Order.id)
+        .where(*in_range, Order.payment_status == PaymentStatus.DELIVERED)
+        .group_by(Order.business_id, day, OrderItem.product_name)
+    )
+    _insert_replacing(db, BusinessProductSalesDaily, rows, ("business_id", "day", "product_name"))
+
+
+def daily_sales(db: Session, business_id: UUID, day_from: date, day_to: date) -> list:
+    return db.execute(
+        select(BusinessSalesDaily)
+        .where(BusinessSalesDaily.business_id == business_id, BusinessSalesDaily.day >= day_from, BusinessSalesDaily.day < day_to)
+        .order_by(BusinessSalesDaily.day)
+    ).scalars().all()
+
+
+def hourly_sales(db: Session, business_id: UUID, day: date) -> list:
+    start = datetime.combine(day, time())
+    return db.execute(
+        select(BusinessSalesHourly)
+        .where(
+            BusinessSalesHourly.business_id == business_id,
+            BusinessSalesHourly.hour >= start,
+            BusinessSalesHourly.hour < start + timedelta(days=1),
+        )
+        .order_by(BusinessSalesHourly.hour)
+    ).scalars().all()
+
+
+def top_products(db: Session, business_id: UUID, day_from: date, day_to: date, limit: int = 10) -> list:
+    """Productos más vendidos del rango, sumando sus filas diarias."""
+    quantity = func.sum(BusinessProductSalesDaily.quantity)
+    return db.execute(
+        select(
+            BusinessProductSalesDaily.product_name,
+            quantity.label("quantity"),
+            func.sum(BusinessProductSalesDaily.revenue).label("revenue"),
+        )
+        .where(
+            BusinessProductSalesDaily.business_id == business_id,
+            BusinessProductSalesDaily.day >= day_from,
+            BusinessProductSalesDaily.day < day_to,
+        )
+        .group_by(BusinessProductSalesDaily.product_name)
+        .order_by(quantity.desc(), BusinessProductSalesDaily.product_name)
+        .limit(limit)
+    ).all()
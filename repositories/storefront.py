@@ -0,0 +1,322 @@
+import logging
+import threading
+import time
+from itertools import chain
+from typing import Iterable
+from uuid import UUID
+from sqlalchemy import event, select, or_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.sql import func
+from database.models.business_model import Business, BusinessImage, TypeBusiness
+from database.models.favourite_model import Favourite
+from database.models.product_model import Category, Product, Option, Extra
+from database.models.storefront_model import BusinessStorefront
+from schemas.business_schemas import BusinessResponse
+from schemas.product_schemas import CategoryResponse
+
+logger = logging.getLogger(__name__)
+
+# Clave en session.info donde se acumulan los negocios a reconstruir
+_PENDING_KEY = "storefront_pending"
+
+
+def build_storefront_payload(db: Session, business_id: UUID) -> dict | None:
+    """Construye el snapshot completo de la tienda a partir de las tablas normalizadas."""
+    business = (
+        db.query(Business)
+        .options(
+            # type_business se resuelve con los datos de referencia (core.reference_data)
+            selectinload(Business.business_images),
+            selectinload(Business.business_categories)
+            .selectinload(Category.products)
+            .selectinload(Product.options)
+            .selectinload(Option.extras),
+        )
+        .filter(Business.id == business_id)
+        .first()
+    )
+    if not business:
+        return None
+
+    # Todas las colecciones van ordenadas por id: el orden de selectinload no es estable y
+    # un snapshot igual en otro orden se tomaría como un cambio (nueva versión y ETag)
+    business_data = BusinessResponse.model_validate(business).model_dump(mode="json")
+    business_data["business_images"] = _by_id(business_data["business_images"])
+    categories = _by_id([
+        CategoryResponse.model_validate(category).model_dump(mode="json") for category in business.business_categories
+    ])
+    for category in categories:
+        category["products"] = _by_id(category["products"])
+        for product in category["products"]:
+            product["options"] = _by_id(product["options"])
+            for option in product["options"]:
+                option["extras"] = _by_id(option["extras"])
+    return {"business": business_data, "business_categories": categories}
+
+
+def _by_id(items: list[dict]) -> list[dict]:
+    return sorted(items, key=lambda item: item["id"])
+
+
+def _payload_product_ids(payload: dict) -> set[str]:
+    return {product["id"] for category in payload["business_categories"] for product in category["products"]}
+
+
+def rebuild_storefront(db: Session, business_id: UUID, touch: bool = False, product_ids: Iterable = ()) -> bool:
+    """
+    Reconstruye el snapshot de un negocio. La versión solo aumenta si el payload cambió,
+    salvo con touch=True o si alguno de `product_ids` (productos modificados) no forma
+    parte del snapshot, p. ej. un producto sin categoría: su ETag depende de la versión.
+    :return: False si el negocio ya no existe (su snapshot se elimina).
+    """
+    payload = build_storefront_payload(db, business_id)
+    if payload is None:
+        db.query(BusinessStorefront).filter(BusinessStorefront.business_id == business_id).delete()
+        db.commit()
+        return False
+    if not touch and product_ids:
+        touch = not {str(product_id) for product_id in product_ids} <= _payload_product_ids(payload)
+
+    stmt = insert(BusinessStorefront).values(
+        business_id=business_id, version=1, payload=payload, updated_at=func.now()
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[BusinessStorefront.business_id],
+        set_={
+            "version": BusinessStorefront.version + 1,
+            "payload": stmt.excluded.payload,
+            "updated_at": func.now(),
+        },
+        where=None if touch else BusinessStorefront.payload != stmt.excluded.payload,
+    )
+    db.execute(stmt)
+    db.commit()
+    return True
+
+
+def get_storefront(db: Session, business_id: UUID) -> dict | None:
+    """Devuelve el snapshot con una lectura por clave primaria, construyéndolo si aún no existe."""
+    payload = db.execute(
+        select(BusinessStorefront.payload).where(BusinessStorefront.business_id == business_id)
+    ).scalar_one_or_none()
+    if payload is None and rebuild_storefront(db, business_id):
+        payload = db.execute(
+            select(BusinessStorefront.payload).where(BusinessStorefront.business_id == business_id)
+        ).scalar_one_or_none()
+    return payload
+
+
+def get_storefront_version(db: Session, business_id: UUID):
+    """Versión y fecha de modificación del snapshot de un negocio, sin cargar el payload."""
+    return db.execute(
+        select(BusinessStorefront.version, BusinessStorefront.updated_at)
+        .where(BusinessStorefront.business_id == business_id)
+    ).first()
+
+
+def get_product_storefront_version(db: Session, product_id: UUID):
+    """Versión del snapshot del negocio al que pertenece un producto."""
+    return db.execute(
+        select(BusinessStorefront.version, BusinessStorefront.updated_at)
+        .join(Product, Product.business_id == BusinessStorefront.business_id)
+        .where(Product.id == product_id)
+    ).first()
+
+
+def get_user_favourites_stamp(db: Session, user_id: str) -> str:
+    """Sello barato de los favoritos de un usuario (cambia al agregar o eliminar uno)."""
+    count, max_id = db.execute(
+        select(func.count(Favourite.id), func.max(Favourite.id)).where(Favourite.user_id == user_id)
+    ).one()
+    return f"{count}.{max_id or 0}"
+
+
+def apply_user_favourites(db: Session, payload: dict, user_id: str, products_limit: int | None = None) -> dict:
+    """Marca los favoritos del usuario sobre una copia del snapshot (una sola consulta)."""
+    business_id = UUID(payload["business"]["id"])
+    product_ids = {UUID(product_id) for product_id in _payload_product_ids(payload)}
+    rows = db.execute(
+        select(Favourite.business_id, Favourite.product_id).where(
+            Favourite.user_id == user_id,
+            or_(Favourite.business_id == business_id, Favourite.product_id.in_(product_ids)),
+        )
+    ).all()
+    favourite_business = any(row.business_id is not None for row in rows)
+    favourite_products = {str(row.product_id) for row in rows if row.product_id is not None}
+
+    return {
+        "business": {**payload["business"], "is_favorite": favourite_business},
+        "business_categories": [
+            {
+                **category,
+                "products": [
+                    {**product, "is_favorite": product["id"] in favourite_products}
+                    for product in category["products"][:products_limit]
+                ],
+            }
+            for category in payload["business_categories"]
+        ],
+    }
+
+
+def check_storefront(db: Session, business_id: UUID) -> str | None:
+    """
+    Compara el snapshot guardado con uno recién construido.
+    :return: None si es consistente, o "missing"/"stale"/"orphan".
+    """
+    stored = db.execute(
+        select(BusinessStorefront.payload).where(BusinessStorefront.business_id == business_id)
+    ).scalar_one_or_none()
+    fresh = build_storefront_payload(db, business_id)
+    if fresh is None:
+        return "orphan" if stored is not None else None
+    if stored is None:
+        return "missing"
+    if stored != fresh:
+        return "stale"
+    return None
+
+
+def _storefront_change_key(obj) -> tuple | None:
+    # Traduce una instancia modificada a la entidad que permite ubicar su negocio
+    if isinstance(obj, Business):
+        return ("business", obj.id)
+    if isinstance(obj, Product):
+        return ("business_product", (obj.business_id, obj.id))
+    if isinstance(obj, (BusinessImage, Category)):
+        return ("business", obj.business_id)
+    if isinstance(obj, Option):
+        return ("product", obj.product_id)
+    if isinstance(obj, Extra):
+        return ("option", obj.option_id)
+    if isinstance(obj, TypeBusiness):
+        return ("type_business", obj.id)
+    return None
+
+
+def _resolve_business_ids(db: Session, keys: set) -> dict:
+    """:return: {business_id: ids de los productos del negocio modificados directamente}"""
+    business_ids = {value for kind, value in keys if kind == "business" and value is not None}
+    product_ids = {value for kind, value in keys if kind == "product" and value is not None}
+    option_ids = {value for kind, value in keys if kind == "option" and value is not None}
+    type_ids = {value for kind, value in keys if kind == "type_business" and value is not None}
+
+    if option_ids:
+        business_ids.update(db.execute(
+            select(Product.business_id).join(Option, Option.product_id == Product.id).where(Option.id.in_(option_ids))
+        ).scalars())
+    if product_ids:
+        business_ids.update(db.execute(
+            select(Product.business_id).where(Product.id.in_(product_ids))
+        ).scalars())
+    if type_ids:
+        business_ids.update(db.execute(
+            select(Business.id).where(Business.type_business_id.in_(type_ids))
+        ).scalars())
+
+    changes = {business_id: set() for business_id in business_ids}
+    for kind, value in keys:
+        if kind == "business_product" and value[0] is not None:
+            changes.setdefault(value[0], set()).add(value[1])
+    return changes
+
+
+class StorefrontRebuildQueue:
+    """
+    Cambios confirmados pendientes de llevar a los snapshots. La reconstrucción no se hace en
+    el hilo de la petición: la tarea periódica de la aplicación vacía la cola
+    (STOREFRONT_REBUILD_INTERVAL_SECONDS) y varias ediciones seguidas de un mismo negocio se
+    reconstruyen una sola vez. Si la reconstrucción falla, los cambios vuelven a la cola con
+    una espera que se duplica en cada intento (hasta retry_max segundos); tras max_attempts
+    se descartan y queda el job de revisión (jobs/storefront.py check --fix).
+    """
+
+    def __init__(self, retry_base: float = 1.0, retry_max: float = 300.0, max_attempts: int = 10):
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._pending: set = set()
+        # clave -> (instante a partir del cual se reintenta, intentos fallidos)
+        self._deferred: dict = {}
+
+    def add(self, keys: set) -> None:
+        with self._lock:
+            self._pending.update(keys)
+
+    def _defer(self, keys: set, attempts: int) -> None:
+        if attempts >= self.max_attempts:
+            logger.error("Se descartan %d cambios de tienda tras %d intentos", len(keys), attempts)
+            return
+        ready_at = time.monotonic() + min(self.retry_base * 2 ** (attempts - 1), self.retry_max)
+        with self._lock:
+            for key in keys:
+                self._deferred[key] = (ready_at, attempts)
+
+    def drain(self, session_factory) -> int:
+        """Reconstruye los negocios afectados por los cambios pendientes. :return: Cuántos."""
+        now = time.monotonic()
+        with self._lock:
+            pending, self._pending = self._pending, set()
+            retries = {key: attempts for key, (ready_at, attempts) in self._deferred.items() if ready_at <= now}
+            for key in retries:
+                del self._deferred[key]
+        keys = pending | retries.keys()
+        if not keys:
+            return 0
+        rebuilt = 0
+        db = session_factory()
+        try:
+            try:
+                changes = _resolve_business_ids(db, keys)
+            except Exception:
+                db.rollback()
+                logger.exception("No se pudieron resolver los negocios de los cambios de tienda")
+                self._defer(keys, max(retries.values(), default=0) + 1)
+                return 0
+            for business_id, product_ids in changes.items():
+                # Los cambios se reencolan ya resueltos a su negocio
+                business_keys = {("business", business_id)}
+                business_keys.update(("business_product", (business_id, product_id)) for product_id in product_ids)
+                try:
+                    rebuild_storefront(db, business_id, product_ids=product_ids)
+                    rebuilt += 1
+                except Exception:
+                    db.rollback()
+                    logger.exception("No se pudo reconstruir el snapshot de tienda de %s", business_id)
+                    self._defer(business_keys, max(retries.get(key, 0) for key in business_keys) + 1)
+                    continue
+                # Un cambio nuevo del negocio ya cubrió un reintento que seguía esperando
+                with self._lock:
+                    for key in business_keys:
+                        self._deferred.pop(key, None)
+        finally:
+            db.close()
+        return rebuilt
+
+
+# Cola de la aplicación; main.py la vacía con una tarea periódica
+storefront_rebuilds = StorefrontRebuildQueue()
+
+
+def register_storefront_events(session_factory) -> None:
+    """Encola los negocios cuyos snapshots cambian con cada commit."""
+
+    @event.listens_for(session_factory, "after_flush")
+    def collect_storefront_changes(session, flush_context):
+        pending = session.info.setdefault(_PENDING_KEY, set())
+        for obj in chain(session.new, session.dirty, session.deleted):
+            key = _storefront_change_key(obj)
+            if key is not None:
+                pending.add(key)
+
+    @event.listens_for(session_factory, "after_rollback")
+    def discard_storefront_changes(session):
+        session.info.pop(_PENDING_KEY, None)
+
+    @event.listens_for(session_factory, "after_commit")
+    def queue_changed_storefronts(session):
+        pending = session.info.pop(_PENDING_KEY, None)
+        if pending:
+            storefront_rebuilds.add(pending)
@@ -0,0 +1,23 @@
+from typing import Optional
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from database.models.users_model import User
+
+# Los correos se guardan en minúsculas y se buscan por lower(email), que es lo que indexa
+# uq_users_email_lower: "Ana@Mail.com" y "ana@mail.com" son la misma cuenta.
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+def get_user_by_email(db: Session, email: str) -> Optional[User]:
+    return db.execute(
+        select(User).where(func.lower(User.email) == normalize_email(email))
+    ).scalars().first()
+
+# Restricciones que rechazan un correo repetido (el índice y la restricción única original)
+EMAIL_CONSTRAINTS = ("uq_users_email_lower", "users_email_key")
+
+def is_duplicate_email(error: IntegrityError) -> bool:
+    """Si el error es por un correo ya registrado (y no, p. ej., por un municipio inexistente)."""
+    diag = getattr(error.orig, "diag", None)
+    return getattr(diag, "constraint_name", None) in EMAIL_CONSTRAINTS
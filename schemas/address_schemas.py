@@ -1,6 +1,7 @@
-from pydantic import BaseModel
+from pydantic import AliasChoices, BaseModel, Field, field_validator
 from typing import List, Optional
 from database.models.address_model import EntityTypeEnum
+from core.reference_data import reference_data
 
 # Esquemas de departamento
 class DepartmentCreateSchema(BaseModel):
@@ -34,6 +35,12 @@ class MunicipalityResponseSchema(BaseModel):
     class Config:
         from_attributes = True
 
+class DepartmentListResponseSchema(BaseModel):
+    department_list: List[DepartmentResponseSchema]
+
+class MunicipalityListResponseSchema(BaseModel):
+    municipality_list: List[MunicipalityResponseSchema]
+
 # Esquemas de address
 class AddressBaseSchema(BaseModel):
     alias: str
@@ -64,7 +71,17 @@ class AddressUpdateSchema(BaseModel):
 # Esquema para respuesta
 class AddressResponseSchema(AddressBaseSchema):
     id: int
-    municipality: MunicipalityResponseSchema
+    # Se resuelve desde municipality_id con los datos de referencia, sin cargar la relación
+    municipality: Optional[MunicipalityResponseSchema] = Field(
+        None, validation_alias=AliasChoices("municipality_id", "municipality")
+    )
+
+    @field_validator("municipality", mode="before")
+    @classmethod
+    def resolve_municipality(cls, value):
+        if isinstance(value, int):
+            return reference_data.municipality(value)
+        return value
 
     class Config:
         from_attributes = True
@@ -1,5 +1,8 @@
-from pydantic import BaseModel, UUID4, HttpUrl
-from typing import Optional
+from datetime import date, datetime
+from decimal import Decimal
+from pydantic import BaseModel, UUID4, HttpUrl, computed_field
+from typing import List, Optional
+from core.media import variant_urls
 
 # Esquemas de BusinessAdmin
 class BusinessAdminBase(BaseModel):
@@ -10,5 +13,50 @@ class BusinessAdminResponse(BusinessAdminBase):
     id: UUID4
     user_id: UUID4
 
+    @computed_field
+    @property
+    def logo_image_variants(self) -> Optional[dict[str, str]]:
+        # URLs por tamaño (sm, md, lg) si el logo se subió a /uploads/images
+        return variant_urls(str(self.logo_image)) if self.logo_image else None
+
+    class Config:
+        from_attributes = True
+
+
+# Tablero de ventas: contadores comunes de los agregados por día y por hora
+class SalesCounters(BaseModel):
+    delivered_orders: int
+    canceled_orders: int
+    revenue: Decimal
+    items_sold: int
+
+    @computed_field
+    @property
+    def average_ticket(self) -> Decimal:
+        # Ticket promedio de los pedidos entregados
+        if not self.delivered_orders:
+            return Decimal("0.00")
+        return (self.revenue / self.delivered_orders).quantize(Decimal("0.01"))
+
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class DailySalesResponse(SalesCounters):
+    day: date
+
+class HourlySalesResponse(SalesCounters):
+    hour: datetime
+
+class TopProductResponse(BaseModel):
+    product_name: str
+    quantity: int
+    revenue: Decimal
+
+    class Config:
+        from_attributes = True
+
+# Resumen de un rango de días: totales, serie diaria y productos más vendidos
+class SalesDashboardResponse(BaseModel):
+    totals: SalesCounters
+    days: List[DailySalesResponse]
+    top_products: List[TopProductResponse]
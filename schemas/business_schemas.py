@@ -1,5 +1,7 @@
-from pydantic import BaseModel, EmailStr, UUID4
+from pydantic import AliasChoices, BaseModel, EmailStr, Field, UUID4, computed_field, field_validator
 from typing import List, Optional
+from core.media import variant_urls
+from core.reference_data import reference_data
 
 
 # Esquema para BusinessImage
@@ -15,6 +17,12 @@ class BusinessImageCreate(BusinessImageBase):
 class BusinessImageResponse(BusinessImageBase):
     id: int
 
+    @computed_field
+    @property
+    def image_variants(self) -> Optional[dict[str, str]]:
+        # URLs por tamaño (sm, md, lg) si la imagen se subió a /uploads/images
+        return variant_urls(self.image_url)
+
     class Config:
         from_attributes = True
 
@@ -68,10 +76,21 @@ class BusinessCreate(BusinessBase):
 
 class BusinessResponse(BusinessBase):
     id: UUID4
-    type_business: Optional[TypeBusinessResponse]
+    # Desde un modelo se lee type_business_id y se resuelve con los datos de referencia,
+    # sin cargar la relación; desde un snapshot ya serializado se lee type_business
+    type_business: Optional[TypeBusinessResponse] = Field(
+        None, validation_alias=AliasChoices("type_business_id", "type_business")
+    )
     business_images: List[BusinessImageResponse] = []
     is_favorite: Optional[bool] = None
 
+    @field_validator("type_business", mode="before")
+    @classmethod
+    def resolve_type_business(cls, value):
+        if isinstance(value, int):
+            return reference_data.type_business(value)
+        return value
+
     class Config:
         from_attributes = True
 
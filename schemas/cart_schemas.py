@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Literal, Optional
 from uuid import UUID
 from decimal import Decimal
 from datetime import datetime
@@ -61,3 +61,19 @@ class CartItemResponse(CartItemBase):
 
     class Config:
         from_attributes = True
+
+# Esquema para una operación del lote de cambios del carrito
+class CartOperation(BaseModel):
+    op: Literal["add", "set", "remove"]  # add suma unidades, set fija la cantidad, remove quita el producto
+    product_id: UUID
+    quantity: Optional[int] = Field(None, ge=1)
+
+    @model_validator(mode="after")
+    def check_quantity(self):
+        if self.op != "remove" and self.quantity is None:
+            raise ValueError(f"La operación '{self.op}' requiere quantity")
+        return self
+
+# Esquema para aplicar varias operaciones al carrito en una sola petición
+class CartBatchRequest(BaseModel):
+    operations: List[CartOperation] = Field(..., min_length=1, max_length=100)
@@ -1,5 +1,6 @@
-from pydantic import BaseModel, UUID4, HttpUrl
-from typing import Optional
+from datetime import datetime
+from pydantic import BaseModel, Field, UUID4, HttpUrl
+from typing import List, Optional
 
 
 # Esquemas de Driver
@@ -14,4 +15,27 @@ class DriverResponse(DriverBase):
     user_id: UUID4
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+# Punto GPS enviado por la aplicación del repartidor
+class LocationPoint(BaseModel):
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
+    heading: Optional[float] = Field(None, ge=0, lt=360)  # Rumbo en grados
+    speed: Optional[float] = Field(None, ge=0)  # Velocidad en m/s
+    accuracy: Optional[float] = Field(None, ge=0)  # Precisión en metros
+    recorded_at: datetime  # Hora del dispositivo
+
+# Lote de puntos acumulados desde el último envío (solo se guarda el más reciente)
+class LocationBatch(BaseModel):
+    points: List[LocationPoint] = Field(..., min_length=1, max_length=100)
+
+class LocationBatchResponse(BaseModel):
+    accepted: int
+
+class DriverLocationResponse(LocationPoint):
+    driver_id: UUID4
+
+    class Config:
+        from_attributes = True
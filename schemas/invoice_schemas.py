@@ -1 +1,32 @@
+from pydantic import BaseModel
+from typing import List, Literal, Optional
+from uuid import UUID
+from decimal import Decimal
+from datetime import datetime
 
+InvoiceStatus = Literal["PENDING", "PAID", "OVERDUE"]
+
+# Esquema de respuesta para BusinessInvoice
+class InvoiceResponse(BaseModel):
+    id: int
+    business_id: UUID
+    invoice_date: datetime
+    due_date: datetime
+    status: InvoiceStatus
+    period_start: Optional[datetime] = None
+    period_end: Optional[datetime] = None
+    order_count: int
+    total_amount: Decimal
+    commission_amount: Decimal
+    service_fee: Optional[Decimal] = None
+    notes: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+# Página de un listado de facturas
+class InvoicePageResponse(BaseModel):
+    items: List[InvoiceResponse]
+    limit: int
+    offset: int
+    has_more: bool  # Hay más facturas después de esta página
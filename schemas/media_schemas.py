@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+
+
+# Imagen subida a /uploads/images
+class UploadedImageResponse(BaseModel):
+    sha256: str
+    size: int
+    url: str  # Original; es el valor que se guarda en product_image_url, image_url o logo_image
+    urls: dict[str, str]  # Miniaturas WebP por tamaño (sm, md, lg)
+    thumbnails_ready: bool  # False mientras se generan en segundo plano
+    deduplicated: bool  # La misma imagen ya se había subido antes
@@ -77,4 +77,32 @@ class OrderItemResponse(OrderItemBase):
     id: UUID
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# Página de un listado de pedidos
+class OrderPageResponse(BaseModel):
+    items: List[OrderResponse]
+    limit: int
+    offset: int
+    has_more: bool  # Hay más pedidos después de esta página
+
+
+# Proyección reducida de un pedido para listados (sin items)
+class OrderSummaryResponse(BaseModel):
+    id: UUID
+    status: OrderStatusEnum
+    payment_status: PaymentStatusEnum
+    total: Decimal
+    created_at: datetime
+    item_count: int
+
+    class Config:
+        from_attributes = True
+
+
+# Página de un listado de pedidos en su vista reducida
+class OrderSummaryPageResponse(BaseModel):
+    items: List[OrderSummaryResponse]
+    limit: int
+    offset: int
+    has_more: bool
@@ -1,8 +1,9 @@
 from __future__ import annotations  # Importar para Forward References
 from decimal import Decimal
-from pydantic import BaseModel, UUID4
+from pydantic import BaseModel, UUID4, computed_field
 from typing import Optional, List
 
+from core.media import variant_urls
 from schemas.business_schemas import BusinessResponse
 
 # Esquema para Categorias
@@ -101,6 +102,12 @@ class ProductResponse(ProductBase):
     is_favorite: Optional[bool] = None
     options: List[OptionResponse] = []
 
+    @computed_field
+    @property
+    def product_image_variants(self) -> Optional[dict[str, str]]:
+        # URLs por tamaño (sm, md, lg) si la imagen se subió a /uploads/images
+        return variant_urls(self.product_image_url)
+
     class Config:
         from_attributes = True
 
@@ -0,0 +1,41 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import OperationalError
+from core.config import secret
+
+# Los carritos en memoria bastan para los tests (ver repositories/cart_store.py)
+secret.setdefault("CART_STORE_URL", "memory://")
+
+pytest_plugins = ["tests.fixtures"]
+
+
+@pytest.fixture(scope="session")
+def client():
+    """La aplicación completa sobre la base de datos de DATABASE_URL; sin ella se omite el test."""
+    from database.session import engine
+
+    if engine.dialect.name != "postgresql":
+        pytest.skip("Los tests con base de datos necesitan PostgreSQL")
+    try:
+        from main import app
+    except OperationalError as e:
+        pytest.skip(f"La base de datos no está disponible: {e.orig}")
+    return TestClient(app)
+
+
+@pytest.fixture
+def limited_client():
+    """
+    Solo el limitador y las rutas que protege. Las peticiones sin cuerpo válido se responden
+    con 422 antes de llegar a la base de datos, así que no hace falta una.
+    """
+    from api.v1.routes.auth_routes import router as auth_routes
+    from api.v1.routes.product_routes import router as products_router
+    from core.rate_limit import RateLimitMiddleware
+
+    app = FastAPI()
+    app.add_middleware(RateLimitMiddleware)
+    app.include_router(auth_routes)
+    app.include_router(products_router)
+    return TestClient(app)
@@ -0,0 +1,47 @@
+"""
+Fixtures de pytest para vigilar el acceso a la base de datos y los límites de peticiones.
+Las carga tests/conftest.py (pytest_plugins); solo se instalan con requirements-dev.txt.
+"""
+import pytest
+from core.nplusone import assert_max_queries, detector
+from core.rate_limit import MemoryBackend, RedisBackend, limiter
+
+
+@pytest.fixture
+def query_budget():
+    """
+    Devuelve un context manager que falla si el bloque supera su presupuesto de sentencias:
+
+        def test_get_carts(client, query_budget):
+            with query_budget(3):
+                client.get(f"/carts/carts/{user_id}")
+    """
+    return assert_max_queries
+
+
+@pytest.fixture
+def nplusone_raise():
+    """Activa el detector de N+1 en modo "raise" durante el test."""
+    previous = detector.mode
+    detector.mode = "raise"
+    yield detector
+    detector.mode = previous
+
+
+@pytest.fixture
+def rate_limits():
+    """Cubetas vacías en memoria para el test; los límites no se arrastran entre tests."""
+    previous = limiter.backend
+    limiter.backend = MemoryBackend()
+    yield limiter
+    limiter.backend = previous
+
+
+@pytest.fixture
+def redis_rate_limits():
+    """El limitador sobre un Redis falso local (fakeredis con soporte Lua) para probar el script."""
+    fakeredis = pytest.importorskip("fakeredis")
+    previous = limiter.backend
+    limiter.backend = RedisBackend(fakeredis.FakeRedis())
+    yield limiter
+    limiter.backend = previous
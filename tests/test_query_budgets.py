@@ -0,0 +1,29 @@
+from uuid import uuid4
+
+
+def test_user_carts(client, query_budget):
+    # Los ids de la tabla y los carritos del almacén: sin carritos no se hidrata nada
+    with query_budget(1):
+        response = client.get(f"/carts/carts/{uuid4()}")
+    assert response.status_code == 200
+    assert response.json() == []
+
+
+def test_order_detail(client, query_budget):
+    # Pedido e items en una sola consulta (get_order_detail)
+    with query_budget(1):
+        response = client.get(f"/orders/{uuid4()}")
+    assert response.status_code == 404
+
+
+def test_business_detail(client, query_budget):
+    # Versión del snapshot para los validadores y el negocio
+    with query_budget(2):
+        response = client.get(f"/businesses/{uuid4()}")
+    assert response.status_code == 404
+
+
+def test_business_orders_summary(client, query_budget):
+    with query_budget(1):
+        response = client.get(f"/orders/business/{uuid4()}", params={"view": "summary"})
+    assert response.status_code == 404
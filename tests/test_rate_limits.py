@@ -0,0 +1,39 @@
+import pytest
+from core.rate_limit import limiter
+
+
+def _burst(method: str, path: str, key: str) -> int:
+    return next(rule.burst for rule in limiter.rules_for(method, path) if rule.key == key)
+
+
+@pytest.mark.parametrize("backend", ["rate_limits", "redis_rate_limits"])
+def test_sign_in_is_limited_per_ip(request, backend, limited_client):
+    request.getfixturevalue(backend)
+    for _ in range(_burst("POST", "/auth/signIn", "ip")):
+        assert limited_client.post("/auth/signIn", json={}).status_code == 422
+
+    response = limited_client.post("/auth/signIn", json={})
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+
+
+def test_buckets_are_per_ip(rate_limits, limited_client):
+    for _ in range(_burst("POST", "/auth/request-password-reset", "ip")):
+        limited_client.post("/auth/request-password-reset", json={})
+    assert limited_client.post("/auth/request-password-reset", json={}).status_code == 429
+
+    # Otra IP (el cliente de pruebas se conecta como "testclient") tiene su propia cubeta
+    rate_limits.trusted_proxies = 1
+    try:
+        response = limited_client.post(
+            "/auth/request-password-reset", json={}, headers={"X-Forwarded-For": "203.0.113.7"}
+        )
+    finally:
+        rate_limits.trusted_proxies = 0
+    assert response.status_code == 422
+
+
+def test_unlimited_routes_pass(rate_limits, limited_client):
+    burst = _burst("POST", "/auth/signIn", "ip")
+    for _ in range(burst + 1):
+        assert limited_client.post("/auth/signUp", json={}).status_code != 429
@@ -0,0 +1,61 @@
+from decimal import Decimal
+from typing import Iterable, Tuple
+
+TAX_RATE = Decimal("0.15")  # Tasa de impuestos
+DELIVERY_FEE = Decimal("50.00")  # Tarifa fija de envío
+
+
+def calculate_cart_totals(
+    lines: Iterable[Tuple[int, Decimal, Decimal]],
+    tax_rate: Decimal = TAX_RATE,
+    delivery_fee: Decimal = DELIVERY_FEE,
+) -> dict:
+    """
+    Calcula los totales de un carrito.
+    :param lines: Tuplas (cantidad, precio unitario, descuento unitario) de cada item.
+    """
+    subtotal = Decimal("0.00")
+    discount_total = Decimal("0.00")
+    for quantity, price, discount in lines:
+        subtotal += quantity * (price or Decimal("0.00"))
+        discount_total += quantity * (discount or Decimal("0.00"))
+
+    return totals_from_sums(subtotal, discount_total, tax_rate, delivery_fee)
+
+
+def totals_from_sums(
+    subtotal: Decimal,
+    discount_total: Decimal,
+    tax_rate: Decimal = TAX_RATE,
+    delivery_fee: Decimal = DELIVERY_FEE,
+) -> dict:
+    """Totales del carrito a partir de las sumas de precios y descuentos de sus líneas."""
+    effective_subtotal = subtotal - discount_total
+    return {
+        "subtotal": subtotal,
+        "discount_total": discount_total,
+        "taxes": effective_subtotal * tax_rate,
+        "delivery_fee": delivery_fee,
+        "total": effective_subtotal + delivery_fee,
+    }
+
+
+def apply_quantity_delta(
+    totals: dict,
+    quantity_delta: int,
+    price: Decimal,
+    discount: Decimal,
+    tax_rate: Decimal = TAX_RATE,
+) -> dict:
+    """
+    Actualiza en O(1) los totales de un carrito cuando la cantidad de una línea cambia en
+    `quantity_delta` unidades (negativo al quitar). Da el mismo resultado que recalcular
+    con calculate_cart_totals.
+    """
+    totals["subtotal"] += quantity_delta * (price or Decimal("0.00"))
+    totals["discount_total"] += quantity_delta * (discount or Decimal("0.00"))
+
+    effective_subtotal = totals["subtotal"] - totals["discount_total"]
+    totals["taxes"] = effective_subtotal * tax_rate
+    totals["total"] = effective_subtotal + totals["delivery_fee"]
+    return totals
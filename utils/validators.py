@@ -1,9 +1,11 @@
 import re
 from fastapi import HTTPException
 
+# Se compila una sola vez al importar el módulo
+PHONE_NUMBER_REGEX = re.compile(r'^[389]\d{3}[-\s]?\d{4}$')
+
 def validate_phone_number(phone_number: str) -> bool:
     """Valida si un número es válido en Honduras (sin código +504)."""
-    regex = re.compile(r'^[389]\d{3}[-\s]?\d{4}$')
-    if not regex.match(phone_number):
+    if not PHONE_NUMBER_REGEX.match(phone_number):
         raise HTTPException(status_code=400, detail="Número de teléfono inválido para Honduras.")
     return True